@@ -0,0 +1,99 @@
+"""Audio LSB Analyzer for PCM WAV submissions.
+
+Reads the low bits of every sample straight from the memory-mapped data
+chunk (located by :func:`.spectrogram.locate_pcm_data`): in little-endian
+PCM the first byte of a sample holds its least significant bits whatever the
+sample width, so no sample has to be decoded. The LSB streams of each
+channel, and of all channels interleaved in file order, are unpacked 1 and 2
+bits per sample and scanned for file signatures and text by
+:mod:`aperisolve.utils.lsb`.
+
+Only the start of a stream is scanned and only the first
+``PLANE_WIDTH * MAX_PLANE_ROWS`` samples of a channel are drawn, so run time
+does not grow with the clip length.
+"""
+
+import wave
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from aperisolve.utils.lsb import NOTHING_FOUND, SCAN_BITS, scan_stream
+
+from .base_analyzer import SubprocessAnalyzer
+from .spectrogram import MAX_CHANNELS, channel_title, locate_pcm_data
+
+# LSB plane images: one sample per pixel, row-major in time order.
+PLANE_WIDTH = 512
+MAX_PLANE_ROWS = 1024
+
+_ERROR_MSG = "Not an integer PCM WAV file."
+_PLANE_CAP_NOTE = "LSB planes show the first {shown} of {total} samples per channel."
+
+
+class AudioLsbAnalyzer(SubprocessAnalyzer):
+    """Analyzer for LSB-embedded data in the samples of a PCM WAV."""
+
+    name = "audio_lsb"
+    display_order = 16
+    accepts = frozenset({"wav"})
+
+    def _save_plane(self, low: np.ndarray, index: int) -> str:
+        """Draw the LSBs of one channel as a 1-bit image; return its URL."""
+        shown = low[: PLANE_WIDTH * MAX_PLANE_ROWS] & 1
+        rows = -(-len(shown) // PLANE_WIDTH)
+        plane = np.zeros(rows * PLANE_WIDTH, dtype=np.uint8)
+        plane[: len(shown)] = shown
+        packed = np.packbits(plane.reshape(rows, PLANE_WIDTH), axis=1)
+        img_name = f"audio_lsb_plane_{index + 1}.png"
+        Image.frombytes("1", (PLANE_WIDTH, rows), packed.tobytes()).save(
+            self.output_dir / img_name,
+        )
+        return "/image/" + str(Path(self.output_dir.name) / img_name)
+
+    def get_results(self, password: str | None = None) -> dict[str, Any]:
+        """Scan the sample LSBs of a WAV for hidden files and text."""
+        _ = password
+        try:
+            layout = locate_pcm_data(self.input_img)
+        except (wave.Error, OSError):
+            return {"status": "error", "error": _ERROR_MSG}
+        if layout is None:
+            return {"status": "error", "error": "No audio frames."}
+
+        frame_bytes = layout.sampwidth * layout.n_channels
+        data = np.memmap(
+            self.input_img,
+            dtype=np.uint8,
+            mode="r",
+            offset=layout.offset,
+            shape=(layout.size,),
+        )
+        # Byte 0 of each little-endian sample; 8-bit samples are unsigned,
+        # but their offset of 128 leaves the low bits unchanged.
+        low = data.reshape(layout.size // frame_bytes, layout.n_channels, layout.sampwidth)[..., 0]
+        n_frames = len(low)
+
+        channels = range(min(layout.n_channels, MAX_CHANNELS))
+        findings: list[str] = []
+        for c in channels:
+            findings += scan_stream(low[:, c], channel_title(c, layout.n_channels))
+        if layout.n_channels > 1:
+            scan_frames = -(-SCAN_BITS // layout.n_channels)
+            findings += scan_stream(low[:scan_frames].reshape(-1), "Interleaved")
+
+        result: dict[str, Any] = {
+            "status": "ok",
+            "output": findings or [NOTHING_FOUND],
+            "images": {
+                "LSB plane": [self._save_plane(low[:, c], c) for c in channels],
+            },
+        }
+        if n_frames > PLANE_WIDTH * MAX_PLANE_ROWS:
+            result["note"] = _PLANE_CAP_NOTE.format(
+                shown=PLANE_WIDTH * MAX_PLANE_ROWS,
+                total=n_frames,
+            )
+        return result
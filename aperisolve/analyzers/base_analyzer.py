@@ -2,15 +2,26 @@
 
 import asyncio
 import fcntl
+import gzip
 import json
+import subprocess
 import threading
 from abc import ABC
+from collections.abc import Iterator
 from pathlib import Path
-from shutil import rmtree
 from subprocess import CompletedProcess
-from typing import Any, ClassVar, overload
-
-from aperisolve.config import SUBPROCESS_TIMEOUT
+from typing import IO, Any, ClassVar, overload
+
+from aperisolve.archives import archive_suffix
+from aperisolve.blobstore import (
+    MANIFEST_SUFFIX,
+    link_bundle,
+    manifest_key,
+    store_bundle,
+    store_tree,
+    write_manifest,
+)
+from aperisolve.config import OUTPUT_INLINE_BYTES, OUTPUT_PREVIEW_LINES, SUBPROCESS_TIMEOUT
 
 _thread_lock = threading.Lock()
 
@@ -18,6 +29,18 @@ _thread_lock = threading.Lock()
 # drained (so the child never blocks on a full pipe) but discarded, keeping
 # adversarial tool output from ballooning memory and results.json.
 MAX_CAPTURED_OUTPUT = 1_000_000
+# Where an output too large for results.json is kept, gzipped (see
+# ``SubprocessAnalyzer.offload_output``).
+FULL_OUTPUT_SUFFIX = ".output.json.gz"
+# Read size for ``stream_command``'s stdout chunks.
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def _drain_capped(stream: IO[bytes], sink: bytearray) -> None:
+    """Read ``stream`` to EOF, keeping at most ``MAX_CAPTURED_OUTPUT`` bytes."""
+    while chunk := stream.read(STREAM_CHUNK_SIZE):
+        sink += chunk[: max(0, MAX_CAPTURED_OUTPUT - len(sink))]
+
 
 # All concrete analyzer classes, registered automatically on class creation.
 # Use aperisolve.analyzers.registry to consume this (it imports every module).
@@ -31,13 +54,15 @@ class SubprocessAnalyzer(ABC):
     is enough to register it — no other file needs to change:
 
     - ``name``: tool name, used as the ``results.json`` key and download URL.
-    - ``has_archive``: the tool extracts files zipped into ``<name>.7z``.
+    - ``has_archive``: the tool extracts files, archived into ``<name>.zip``.
     - ``needs_password``: the tool receives the submission password.
     - ``deep_only``: only run when the user requests a deep analysis.
     - ``display_order``: frontend rendering position (lower renders first).
     - ``register``: opt-out flag for templates/abstract intermediates.
     - ``accepts``: file-type gate — empty runs on any file; else runs iff
       ``accepts & detected.tags`` is non-empty (see ``aperisolve.filetype``).
+    - ``needs_embedded``: outside deep analysis, only run when the signature
+      scan found a file embedded in the upload (see ``aperisolve.utils.carving``).
     """
 
     name: ClassVar[str]
@@ -53,6 +78,9 @@ class SubprocessAnalyzer(ABC):
     # File-type gate. Empty = file-agnostic (runs on ANY upload). Otherwise runs
     # iff (accepts & detected.tags) is non-empty. See aperisolve/filetype.py.
     accepts: ClassVar[frozenset[str]] = frozenset()
+    # Carvers that only pay off when something is embedded: skipped in normal
+    # analyses unless the worker tagged the upload "embedded".
+    needs_embedded: ClassVar[bool] = False
 
     input_img: Path
     output_dir: Path
@@ -142,16 +170,125 @@ class SubprocessAnalyzer(ABC):
 
         return asyncio.run(_run())
 
+    def stream_command(
+        self,
+        cmd: list[str],
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """Run a subprocess command and yield its stdout as it is produced.
+
+        For tools whose stdout is bulk data to consume (e.g. decoded audio)
+        rather than text to keep: nothing is buffered beyond one chunk, and
+        every chunk but the last is exactly ``chunk_size`` bytes. stderr is
+        drained and capped like in ``run_command``. The run is bounded by
+        ``SUBPROCESS_TIMEOUT`` (``TimeoutError``); a non-zero exit raises
+        ``RuntimeError`` once stdout is exhausted. Closing the generator
+        early kills the process.
+        """
+        process = subprocess.Popen(  # noqa: S603
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if process.stdout is None or process.stderr is None:
+            msg = "Subprocess pipes were not created"
+            raise RuntimeError(msg)
+        stderr = bytearray()
+        drain = threading.Thread(target=_drain_capped, args=(process.stderr, stderr), daemon=True)
+        drain.start()
+        timed_out = threading.Event()
+
+        def _kill() -> None:
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(SUBPROCESS_TIMEOUT, _kill)
+        timer.start()
+        try:
+            while chunk := process.stdout.read(chunk_size):
+                yield chunk
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            drain.join()
+            process.stdout.close()
+            process.stderr.close()
+        if timed_out.is_set():
+            msg = f"Command timed out after {SUBPROCESS_TIMEOUT}s: {cmd[0]}"
+            raise TimeoutError(msg)
+        if returncode != 0:
+            error = stderr.decode("utf-8", errors="replace").strip()
+            msg = f"{cmd[0]} exited with status {returncode}: {error}"
+            raise RuntimeError(msg)
+
     def generate_archive(self, extracted_dir: Path | None = None) -> str:
-        """Zip the extracted files and remove the directory."""
+        """Make the extracted files downloadable; return what the archiver reported.
+
+        The files move into the blob store (see ``aperisolve.blobstore``) and
+        stay in ``extracted_dir`` as references, listed by
+        ``<name>.manifest.json``. By default that is all: ``/download``
+        assembles the ZIP when someone asks for it (see
+        ``aperisolve.archives``). With ``ARCHIVE_FORMAT=7z`` the 7z archive
+        is built here, once per set of files never archived before.
+        """
         if extracted_dir is None:
             extracted_dir = self.get_extracted_dir()
-        zip_data = self.run_command(["7z", "a", f"../{self.name}.7z", "*"], cwd=extracted_dir)
-        rmtree(extracted_dir)
+        manifest = store_tree(extracted_dir)
+        write_manifest(self.output_dir / f"{self.name}{MANIFEST_SUFFIX}", manifest)
+        if archive_suffix() != ".7z":
+            return ""
+        key = manifest_key(manifest)
+        archive = self.output_dir / f"{self.name}.7z"
+        if link_bundle(key, archive):
+            return ""
+        archive.unlink(missing_ok=True)
+        zip_data = self.run_command(["7z", "a", f"../{archive.name}", "*"], cwd=extracted_dir)
+        if zip_data.returncode == 0:
+            store_bundle(key, archive)
         return zip_data.stderr
 
+    def offload_output(self, result: dict[str, Any]) -> None:
+        """Move an output over ``OUTPUT_INLINE_BYTES`` out of ``result`` into its own file.
+
+        The gzipped output goes to ``<name>.output.json.gz``, served by
+        ``/output``. ``result`` keeps its first ``OUTPUT_PREVIEW_LINES`` lines
+        (or table rows) and a ``full_output`` entry with the URL and size.
+        """
+        output = result.get("output")
+        if not isinstance(output, str | list | dict):
+            return
+        encoded = json.dumps(output).encode()
+        if len(encoded) <= OUTPUT_INLINE_BYTES:
+            return
+
+        full_file = self.output_dir / f"{self.name}{FULL_OUTPUT_SUFFIX}"
+        tmp_file = full_file.with_name(f".{full_file.name}.tmp")
+        tmp_file.write_bytes(gzip.compress(encoded, compresslevel=6))
+        tmp_file.replace(full_file)
+
+        if isinstance(output, str):
+            lines = output.splitlines()
+            preview = "\n".join(lines[:OUTPUT_PREVIEW_LINES])
+            result["output"] = preview[:OUTPUT_INLINE_BYTES]
+        elif isinstance(output, list):
+            lines = output
+            result["output"] = output[:OUTPUT_PREVIEW_LINES]
+        else:
+            lines = list(output)
+            result["output"] = dict(list(output.items())[:OUTPUT_PREVIEW_LINES])
+        result["full_output"] = {
+            "url": f"/output/{self.output_dir.name}/{self.name}",
+            "lines": len(lines),
+            "bytes": len(encoded),
+        }
+
     def update_result(self, result: dict[str, Any]) -> None:
         """Thread-safe and process-safe JSON update using lock file and atomic replace."""
+        self.offload_output(result)
         json_file = self.output_dir / "results.json"
         new_data = {self.name: result}
         lock_file = json_file.with_suffix(json_file.suffix + ".lock")
@@ -10,6 +10,7 @@ class BinwalkAnalyzer(SubprocessAnalyzer):
 
     name = "binwalk"
     has_archive = True
+    needs_embedded = True
     display_order = 50
 
     def __init__(self, input_img: Path, output_dir: Path) -> None:
@@ -0,0 +1,59 @@
+"""Carving Analyzer: embedded files found by the in-process signature scan.
+
+Lists every validated signature of the upload (see
+:mod:`aperisolve.utils.carving`) with its offset, and extracts each file
+found after offset 0 into the downloadable archive. The scan is the one the
+worker already ran to decide whether binwalk and foremost are worth
+starting, so this analyzer costs no second pass over the upload.
+"""
+
+import mmap
+from typing import Any
+
+from aperisolve.utils.carving import MAX_CARVES, extents, scan_file
+
+from .base_analyzer import SubprocessAnalyzer
+
+NOTHING_FOUND = "No known file signature found."
+_CAP_NOTE = "Only the first {cap} signatures are listed."
+
+
+class CarvingAnalyzer(SubprocessAnalyzer):
+    """Analyzer listing and extracting embedded files without a subprocess."""
+
+    name = "carving"
+    has_archive = True
+    display_order = 45
+
+    def get_results(self, password: str | None = None) -> dict[str, Any]:
+        """Report the signatures of the upload and carve the embedded files."""
+        _ = password
+        carves = scan_file(self.input_img)
+        if not carves:
+            return {"status": "ok", "output": NOTHING_FOUND}
+
+        total = self.input_img.stat().st_size
+        sizes = extents(carves, total)
+        table = {
+            f"0x{carve.offset:X} ({carve.offset})": f"{carve.description}, {size} bytes"
+            for carve, size in zip(carves, sizes, strict=True)
+        }
+        result: dict[str, Any] = {"status": "ok", "output": table}
+        if len(carves) >= MAX_CARVES:
+            result["note"] = _CAP_NOTE.format(cap=MAX_CARVES)
+
+        # The carve at offset 0 is the upload itself.
+        embedded = [(c, size) for c, size in zip(carves, sizes, strict=True) if c.offset > 0]
+        if embedded:
+            extracted_dir = self.get_extracted_dir()
+            extracted_dir.mkdir(parents=True, exist_ok=True)
+            with (
+                self.input_img.open("rb") as handle,
+                mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data,
+            ):
+                for carve, size in embedded:
+                    out = extracted_dir / f"{carve.offset:X}.{carve.kind}"
+                    out.write_bytes(data[carve.offset : carve.offset + size])
+            self.generate_archive(extracted_dir)
+            result["download"] = f"/download/{self.output_dir.name}/{self.name}"
+        return result
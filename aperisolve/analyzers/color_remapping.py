@@ -7,12 +7,13 @@ import numpy as np
 from PIL import Image
 
 from .base_analyzer import SubprocessAnalyzer
-from .pil_utils import PALETTE_NOTE, load_image_array
+from .pil_utils import PALETTE_NOTE, client_render_spec, load_image_array
 
 RGB_CHANNEL_COUNT = 3
 RGBA_CHANNEL_COUNT = 4
 RANDOM_REMAPPING_COUNT = 8
 GRAYSCALE_DIMENSIONS = 2
+OPAQUE_ALPHA = 255
 
 
 class ColorRemappingAnalyzer(SubprocessAnalyzer):
@@ -64,13 +65,43 @@ class ColorRemappingAnalyzer(SubprocessAnalyzer):
 
         return remapped_img
 
+    def _remap_palette(self, indices: np.ndarray, palette: np.ndarray) -> dict[str, Any]:
+        """Remap a palette image by drawing a random colour per palette entry.
+
+        Each output reuses the index data under a new palette: O(256) work
+        per remap, and entries sharing a colour in the original (a classic
+        hiding spot) come out distinguishable.
+        """
+        indexed = Image.fromarray(indices, mode="P")
+        alpha = palette[:, 3]
+        transparency = alpha.tobytes() if (alpha != OPAQUE_ALPHA).any() else None
+        image_json = []
+        rng = np.random.default_rng()
+        for i in range(RANDOM_REMAPPING_COUNT):
+            indexed.putpalette(rng.integers(0, 256, size=(256, 3), dtype=np.uint8).tobytes())
+            img_name = f"color_remapping_{i:02d}.png"
+            if transparency is None:
+                indexed.save(self.output_dir / img_name)
+            else:
+                indexed.save(self.output_dir / img_name, transparency=transparency)
+            image_json.append("/image/" + str(Path(self.output_dir.name) / img_name))
+        return {
+            "status": "ok",
+            "images": {"Color Remapping": image_json},
+            "note": PALETTE_NOTE,
+        }
+
     def get_results(self, password: str | None = None) -> dict[str, Any]:
         """Analyze an image submission using color remapping."""
         _ = password
-        loaded = load_image_array(self.input_img)
+        spec = client_render_spec(self.input_img, self.output_dir.name)
+        if spec is not None:
+            return {"status": "ok", "client_render": {**spec, "count": RANDOM_REMAPPING_COUNT}}
+        loaded = load_image_array(self.input_img, keep_palette=True)
         if loaded.error is not None or loaded.array is None:
             return loaded.error or {"status": "error", "error": "Image could not be loaded."}
-        converted = loaded.converted
+        if loaded.palette is not None:
+            return self._remap_palette(loaded.array, loaded.palette)
         img_np, _channels = self._normalize_image(loaded.array)
 
         image_json = []
@@ -89,13 +120,9 @@ class ColorRemappingAnalyzer(SubprocessAnalyzer):
             image_json.append("/image/" + str(dl_path))
             remapped_img.save(out_path)
 
-        output = {
+        return {
             "status": "ok",
             "images": {
                 "Color Remapping": image_json,
             },
         }
-        if converted:
-            output["note"] = PALETTE_NOTE
-
-        return output
@@ -1,16 +1,66 @@
 """Bits Decomposer Analyzer for Image Submissions."""
 
+from contextlib import ExitStack
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 from PIL import Image
 
+from aperisolve.utils.png_writer import StreamingPNGWriter
+
 from .base_analyzer import SubprocessAnalyzer
-from .pil_utils import PALETTE_NOTE, load_image_array
+from .pil_utils import (
+    PALETTE_NOTE,
+    client_render_spec,
+    iter_strips,
+    load_image_array,
+    open_streaming,
+)
 
 RGB_CHANNEL_THRESHOLD = 3
-GRAYSCALE_DIMENSIONS = 2
+PALETTE_CHANNELS = ("Red", "Green", "Blue", "Alpha")
+OPAQUE = 255
+
+# Channel labels per decoded mode; anything else is converted to the closest.
+MODE_CHANNELS = {
+    "L": ("Grayscale",),
+    "LA": ("Grayscale", "Alpha"),
+    "RGB": ("Red", "Green", "Blue"),
+    "RGBA": ("Red", "Green", "Blue", "Alpha"),
+}
+# Single-channel integer modes (16-bit PNGs, 32-bit TIFFs) and their bytes per
+# sample. They are streamed as they are, not converted (which would clamp them
+# to 8 bits): their planes are the low byte of each sample.
+INTEGER_MODES = {"I": 4, "I;16": 2, "I;16B": 2, "I;16L": 2, "I;16N": 2}
+# Decoded bytes per strip. The frame itself is decoded whole (and copied once
+# if its mode needs converting), but every plane is written strip by strip, so
+# the planes add only a few strips of temporaries — not the dozens of
+# full-size arrays a whole-array pass would allocate.
+STRIP_BYTES = 4 << 20
+# Superimposed planes are 3-bit (R, G, B) pixels, stored as 4-bit palette
+# indices r | g << 1 | b << 2 under this 8-colour palette.
+SUPERIMPOSED_PALETTE = bytes(
+    ((i >> c) & 1) * 255 for i in range(1 << RGB_CHANNEL_THRESHOLD) for c in range(3)
+)
+NIBBLE_DEPTH = 4
+
+
+def _pack_nibbles(indices: np.ndarray) -> np.ndarray:
+    """Pack a (rows, width) array of 4-bit values two pixels per byte."""
+    if indices.shape[1] % 2:
+        indices = np.pad(indices, ((0, 0), (0, 1)))
+    return (indices[:, 0::2] << NIBBLE_DEPTH) | indices[:, 1::2]
+
+
+def _stream_mode(img: Image.Image) -> Image.Image:
+    """Return ``img`` in a mode the strip decomposer handles."""
+    if img.mode in MODE_CHANNELS or img.mode in INTEGER_MODES:
+        return img
+    bands = img.getbands()
+    if len(bands) >= RGB_CHANNEL_THRESHOLD:
+        return img.convert("RGBA" if "A" in bands else "RGB")
+    return img.convert("LA" if "A" in bands else "L")
 
 
 class DecomposerAnalyzer(SubprocessAnalyzer):
@@ -20,59 +70,120 @@ class DecomposerAnalyzer(SubprocessAnalyzer):
     display_order = 10
     accepts = frozenset({"image"})
 
-    def get_results(self, password: str | None = None) -> dict[str, Any]:
-        """Analyze an image submission using bits decomposition."""
-        _ = password
-        loaded = load_image_array(self.input_img)
-        if loaded.error is not None or loaded.array is None:
-            return loaded.error or {"status": "error", "error": "Image could not be loaded."}
-        converted = loaded.converted
-        img_np = loaded.array
-
-        # Handle grayscale, RGB, RGBA, etc.
-        channels = 1 if len(img_np.shape) == GRAYSCALE_DIMENSIONS else img_np.shape[2]
-
-        channel_names = ["Red", "Green", "Blue", "Alpha"] if channels > 1 else ["Grayscale"]
-
-        image_json = {}
-
-        # Add Superimposed RGB bit planes
-        if channels >= RGB_CHANNEL_THRESHOLD:
-            superimposed_json = []
+    def _save_indexed(self, indexed: Image.Image, lut: np.ndarray, img_name: str) -> str:
+        """Save ``indexed`` under a (256, 3) palette ``lut``; return its image URL.
+
+        Every palette-derived plane is the same index data under a different
+        palette, so each output costs an O(256) palette swap plus the encode.
+        """
+        indexed.putpalette(lut.astype(np.uint8).tobytes())
+        indexed.save(self.output_dir / img_name)
+        return self._plane_url(img_name)
+
+    def _decompose_palette(self, indices: np.ndarray, palette: np.ndarray) -> dict[str, Any]:
+        """Bit planes of a palette image, computed on its indices and entries.
+
+        ``Index`` planes are taken over the raw index array; the colour planes
+        apply each bit to the 256 palette entries instead of to every pixel.
+        """
+        indexed = Image.fromarray(indices, mode="P")
+        entry_ids = np.arange(len(palette), dtype=np.uint8)
+        channels = PALETTE_CHANNELS if (palette[:, 3] != OPAQUE).any() else PALETTE_CHANNELS[:3]
+        image_json: dict[str, list[str]] = {"Superimposed": []}
+        for bit in range(8):
+            bits = ((palette[:, :3] >> bit) & 1) * 255
+            image_json["Superimposed"].append(
+                self._save_indexed(indexed, bits, f"superimposed_bit_{bit}.png"),
+            )
+        for c, channel_label in enumerate(channels):
+            image_json[channel_label] = []
             for bit in range(8):
-                bit_mask = 1 << bit
-                rgb_planes = [((img_np[..., c] & bit_mask) >> bit) * 255 for c in range(3)]
-                rgb_image = np.stack(rgb_planes, axis=-1).astype(np.uint8)
-                rgb_img = Image.fromarray(rgb_image, mode="RGB")
-                img_name = f"superimposed_bit_{bit}.png"
-                out_path = self.output_dir / img_name
-                dl_path = Path(self.output_dir.name) / img_name
-                superimposed_json.append("/image/" + str(dl_path))
-                rgb_img.save(out_path)
-
-            image_json["Superimposed"] = superimposed_json
-
-        # Process individual channels
-        for c in range(channels):
-            channel_data = img_np[..., c] if channels > 1 else img_np
-            channel_label = channel_names[c]
-            channel_json = []
-            for bit in range(8):
-                bit_mask = 1 << bit
-                bit_plane = ((channel_data & bit_mask) >> bit) * 255
-                bit_img = Image.fromarray(bit_plane.astype(np.uint8), mode="L")
-                img_name = f"{channel_label}_bit_{bit}.png"
-                out_path = self.output_dir / img_name
-                dl_path = Path(self.output_dir.name) / img_name
-                channel_json.append("/image/" + str(dl_path))
-                bit_img.save(out_path)
-            image_json[channel_label] = channel_json
-
-        output = {
+                gray = np.repeat((((palette[:, c] >> bit) & 1) * 255)[:, None], 3, axis=1)
+                image_json[channel_label].append(
+                    self._save_indexed(indexed, gray, f"{channel_label}_bit_{bit}.png"),
+                )
+        image_json["Index"] = []
+        for bit in range(8):
+            gray = np.repeat((((entry_ids >> bit) & 1) * 255)[:, None], 3, axis=1)
+            image_json["Index"].append(self._save_indexed(indexed, gray, f"Index_bit_{bit}.png"))
+        return {"status": "ok", "images": image_json, "note": PALETTE_NOTE}
+
+    def _plane_url(self, img_name: str) -> str:
+        return "/image/" + str(Path(self.output_dir.name) / img_name)
+
+    def _decompose_strips(self, img: Image.Image) -> dict[str, Any]:
+        """Bit planes of a non-palette image, extracted and encoded strip by strip.
+
+        Channel planes are 1-bit grayscale PNGs and superimposed planes 4-bit
+        palette PNGs, both written incrementally by ``StreamingPNGWriter``.
+        """
+        img = _stream_mode(img)
+        labels = MODE_CHANNELS.get(img.mode, MODE_CHANNELS["L"])
+        width, height = img.size
+        sample_bytes = INTEGER_MODES.get(img.mode, 1)
+        strip_rows = max(1, STRIP_BYTES // (width * len(labels) * sample_bytes))
+        image_json: dict[str, list[str]] = {}
+        with ExitStack() as stack:
+            superimposed = []
+            if len(labels) >= RGB_CHANNEL_THRESHOLD:
+                names = [f"superimposed_bit_{bit}.png" for bit in range(8)]
+                image_json["Superimposed"] = [self._plane_url(name) for name in names]
+                superimposed = [
+                    stack.enter_context(
+                        StreamingPNGWriter(
+                            self.output_dir / name,
+                            width,
+                            height,
+                            bit_depth=NIBBLE_DEPTH,
+                            palette=SUPERIMPOSED_PALETTE,
+                        ),
+                    )
+                    for name in names
+                ]
+            planes = []
+            for label in labels:
+                names = [f"{label}_bit_{bit}.png" for bit in range(8)]
+                image_json[label] = [self._plane_url(name) for name in names]
+                planes.append(
+                    [
+                        stack.enter_context(
+                            StreamingPNGWriter(self.output_dir / name, width, height, bit_depth=1),
+                        )
+                        for name in names
+                    ],
+                )
+
+            for strip in iter_strips(img, strip_rows):
+                channels = strip.reshape(strip.shape[0], width, -1)
+                for bit in range(8):
+                    bits = (channels >> bit) & 1
+                    for c, channel_writers in enumerate(planes):
+                        channel_writers[bit].write_rows(np.packbits(bits[..., c], axis=1))
+                    if superimposed:
+                        rgb = bits[..., 0] | (bits[..., 1] << 1) | (bits[..., 2] << 2)
+                        superimposed[bit].write_rows(_pack_nibbles(rgb))
+
+        return {
             "status": "ok",
             "images": image_json,
         }
-        if converted:
-            output["note"] = PALETTE_NOTE
 
-        return output
+    def get_results(self, password: str | None = None) -> dict[str, Any]:
+        """Analyze an image submission using bits decomposition."""
+        _ = password
+        spec = client_render_spec(self.input_img, self.output_dir.name)
+        if spec is not None:
+            return {"status": "ok", "client_render": spec}
+        with open_streaming(self.input_img) as opened:
+            if opened.error is not None or opened.image is None:
+                return opened.error or {"status": "error", "error": "Image could not be loaded."}
+            if opened.image.mode != "P":
+                try:
+                    return self._decompose_strips(opened.image)
+                except (OSError, ValueError) as exc:
+                    # Truncated or corrupt pixel data: expected input (issue #192).
+                    return {"status": "error", "error": f"Image could not be decoded: {exc}"}
+        loaded = load_image_array(self.input_img, keep_palette=True)
+        if loaded.error is not None or loaded.array is None or loaded.palette is None:
+            return loaded.error or {"status": "error", "error": "Image could not be loaded."}
+        return self._decompose_palette(loaded.array, loaded.palette)
@@ -12,6 +12,7 @@ class ForemostAnalyzer(SubprocessAnalyzer):
 
     name = "foremost"
     has_archive = True
+    needs_embedded = True
     display_order = 60
 
     def __init__(self, input_img: Path, output_dir: Path) -> None:
@@ -1,12 +1,143 @@
-"""Identify Analyzer for Image Submissions."""
+"""Identify Analyzer for Image Submissions.
+
+Reports what GraphicsMagick's ``identify -verbose`` reports (format,
+geometry, depth, embedded text properties, per-channel statistics and the
+number of unique colours) without its subprocess or its text dump: the
+header comes from Pillow, and the statistics are computed with NumPy. Integer
+channels of up to 16 bits are reduced through histograms summed over slices
+of ``SLICE_PIXELS`` pixels, and 8-bit colours are counted slice by slice
+through a bitmap, so temporaries stay at one slice beside the decoded image.
+Float channels and wider colours go through whole-array NumPy reductions. The
+output is a table, with the 8-bit histograms alongside.
+
+Formats Pillow cannot decode, truncated or corrupt pixel data, and images
+beyond the decoder's size limit still go through ``identify -verbose``.
+"""
 
 from pathlib import Path
+from typing import Any
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
 
 from .base_analyzer import SubprocessAnalyzer
+from .pil_utils import load_image_array
+
+BAND_NAMES = {
+    "R": "Red",
+    "G": "Green",
+    "B": "Blue",
+    "A": "Alpha",
+    "L": "Gray",
+    "1": "Gray",
+    "I": "Gray",
+    "F": "Gray",
+    "C": "Cyan",
+    "M": "Magenta",
+    "Y": "Yellow",
+    "K": "Black",
+}
+# Above this, a header value (ICC profile, EXIF block, XMP packet) is listed by
+# size only; exiftool decodes those.
+MAX_PROPERTY_LENGTH = 512
+BYTE_BINS = 256
+# Unsigned channels up to 16 bits are reduced through their histogram.
+MAX_HISTOGRAM_ITEMSIZE = 2
+# 8-bit pixels of up to 4 channels are packed into one uint32 to be counted;
+# packed into at most 24 bits, through a bitmap rather than a sort.
+MAX_PACKED_CHANNELS = 4
+MAX_BITMAP_BITS = 24
+# Pixels reduced per step; bincount and packing copy one slice at a time.
+SLICE_PIXELS = 1 << 20
+
+
+def _describe_value(value: object) -> str:
+    """Render a Pillow ``info`` value as a table cell."""
+    if isinstance(value, bytes):
+        if len(value) > MAX_PROPERTY_LENGTH:
+            return f"{len(value)} bytes"
+        return value.decode("latin-1")
+    text = str(value)
+    return text if len(text) <= MAX_PROPERTY_LENGTH else f"{len(text)} characters"
+
+
+def header_table(img: Image.Image) -> dict[str, str]:
+    """Describe an opened (not yet decoded) image from its header."""
+    table = {
+        "Format": f"{img.format} ({img.format_description})",
+        "Geometry": f"{img.width}x{img.height}",
+        "Mode": img.mode,
+    }
+    frames = getattr(img, "n_frames", 1)
+    if frames > 1:
+        table["Frames"] = str(frames)
+    if img.mode == "P":
+        table["Palette"] = f"{len(img.getpalette() or []) // 3} entries"
+    for key, value in img.info.items():
+        table[f"Property {key}"] = _describe_value(value)
+    return table
+
+
+def _channels(array: np.ndarray) -> np.ndarray:
+    """Return the pixels as a (pixels, channels) array of numbers."""
+    if array.dtype == np.bool_:
+        array = array.view(np.uint8)
+    return array.reshape(array.shape[0] * array.shape[1], -1)
+
+
+def channel_statistics(channel: np.ndarray) -> tuple[dict[str, float], np.ndarray | None]:
+    """Return min, max, mean and standard deviation of a channel, and its histogram.
+
+    Integer channels are reduced through their histogram, summed over
+    ``SLICE_PIXELS`` slices. The histogram is returned for 8-bit channels.
+    """
+    if channel.dtype.kind == "u" and channel.dtype.itemsize <= MAX_HISTOGRAM_ITEMSIZE:
+        counts = np.zeros(1 << (8 * channel.dtype.itemsize), dtype=np.int64)
+        for start in range(0, channel.size, SLICE_PIXELS):
+            counts += np.bincount(channel[start : start + SLICE_PIXELS], minlength=len(counts))
+        values = np.arange(len(counts), dtype=np.float64)
+        present = np.flatnonzero(counts)
+        mean = float(counts @ values) / channel.size
+        variance = float(counts @ (values - mean) ** 2) / channel.size
+        stats = {
+            "min": float(present[0]),
+            "max": float(present[-1]),
+            "mean": mean,
+            "std": variance**0.5,
+        }
+        return stats, counts if channel.dtype.itemsize == 1 else None
+    stats = {
+        "min": float(channel.min()),
+        "max": float(channel.max()),
+        "mean": float(channel.mean(dtype=np.float64)),
+        "std": float(channel.std(dtype=np.float64)),
+    }
+    return stats, None
+
+
+def unique_colors(pixels: np.ndarray) -> int:
+    """Count the distinct pixel values of a (pixels, channels) array."""
+    bits = 8 * pixels.shape[1]
+    if pixels.dtype == np.uint8 and bits <= MAX_BITMAP_BITS:
+        seen = np.zeros(1 << bits, dtype=np.bool_)
+        for start in range(0, pixels.shape[0], SLICE_PIXELS):
+            seen[_pack(pixels[start : start + SLICE_PIXELS])] = True
+        return int(np.count_nonzero(seen))
+    if pixels.dtype == np.uint8 and pixels.shape[1] <= MAX_PACKED_CHANNELS:
+        return len(np.unique(_pack(pixels)))
+    return len(np.unique(pixels, axis=0))
+
+
+def _pack(pixels: np.ndarray) -> np.ndarray:
+    """Pack up to four 8-bit channels of each pixel into one uint32."""
+    packed = np.zeros(pixels.shape[0], dtype=np.uint32)
+    for index in range(pixels.shape[1]):
+        packed |= pixels[:, index].astype(np.uint32) << (8 * index)
+    return packed
 
 
 class IdentifyAnalyzer(SubprocessAnalyzer):
-    """Analyzer for GraphicMagick identify command."""
+    """Analyzer reporting image properties and statistics, like GraphicsMagick identify."""
 
     name = "identify"
     display_order = 100
@@ -21,3 +152,40 @@ class IdentifyAnalyzer(SubprocessAnalyzer):
         """Process the stdout into a list of lines."""
         _ = stderr
         return [line for line in stdout.split("\n") if line.strip()]
+
+    def get_results(self, password: str | None = None) -> dict[str, Any]:
+        """Describe the image in-process, or with GraphicsMagick when Pillow cannot."""
+        try:
+            with Image.open(self.input_img) as img:
+                table = header_table(img)
+                # load_image_array decodes palette images to RGB.
+                bands = ("R", "G", "B") if img.mode == "P" else img.getbands()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+            return super().get_results(password)
+        try:
+            loaded = load_image_array(self.input_img)
+        except (OSError, ValueError):
+            # Truncated or corrupt pixel data, which the header did not show.
+            return super().get_results(password)
+        if loaded.array is None:
+            return super().get_results(password)
+
+        pixels = _channels(loaded.array)
+        depth = 1 if loaded.array.dtype == np.bool_ else 8 * loaded.array.dtype.itemsize
+        table["Depth"] = f"{depth} bits per channel"
+        names = [BAND_NAMES.get(band, band) for band in bands][: pixels.shape[1]]
+        histograms: dict[str, list[int]] = {}
+        for index, name in enumerate(names):
+            stats, histogram = channel_statistics(pixels[:, index])
+            table[name] = (
+                f"min {stats['min']:g}, max {stats['max']:g}, "
+                f"mean {stats['mean']:.2f}, std dev {stats['std']:.2f}"
+            )
+            if histogram is not None:
+                histograms[name] = histogram.tolist()
+        table["Colors"] = str(unique_colors(pixels))
+
+        result: dict[str, Any] = {"status": "ok", "output": table}
+        if histograms:
+            result["histogram"] = histograms
+        return result
@@ -16,9 +16,9 @@ class PCRTAnalyzer(SubprocessAnalyzer):
     display_order = 90
     accepts = frozenset({"png"})
 
-    def _write_repaired_data(self, data: bytes) -> str:
+    def _write_repaired_data(self, data: bytes, prefix: str = "pcrt_recovered") -> str:
         """Write recovered image."""
-        img_name = f"pcrt_recovered_{self.input_img.stem}.png"
+        img_name = f"{prefix}_{self.input_img.stem}.png"
         output_path = self.output_dir / img_name
         saved_img_url = "/image/" + str(Path(self.output_dir.name) / img_name)
         with output_path.open("wb") as f:
@@ -61,6 +61,12 @@ class PCRTAnalyzer(SubprocessAnalyzer):
                 result["note"] = "PNG was repaired and saved"
                 result["png_images"] = [url]
 
+            # Save the rows that decode when the IDAT stream itself is damaged
+            if png.partial_data:
+                url = self._write_repaired_data(png.partial_data, "pcrt_partial")
+                result.setdefault("png_images", []).append(url)
+                result["note"] = result.get("note", "") + " | Partial image recovered"
+
             # Save extra data if found after IEND
             if extra_data:
                 self._write_extra_data(extra_data)
@@ -1,12 +1,20 @@
 """Shared image loading for the PIL/NumPy-based analyzers."""
 
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any, NamedTuple
 
 import numpy as np
 from PIL import Image, UnidentifiedImageError
 
-PALETTE_NOTE = "Image contains a color palette and was converted to RGB for processing."
+from aperisolve.config import CLIENT_RENDERING
+
+PALETTE_NOTE = (
+    "Image contains a color palette: bit planes and remaps were computed on the palette "
+    "indices and entries, without converting to RGB."
+)
+PALETTE_SIZE = 256
 
 # Hard ceiling on decoded size: a ~1 MB highly-compressible PNG can decode to
 # hundreds of MB, and the decomposer then materializes dozens of full-size
@@ -16,21 +24,70 @@ PALETTE_NOTE = "Image contains a color palette and was converted to RGB for proc
 MAX_IMAGE_PIXELS = 64_000_000
 
 
+# Client-side rendering (CLIENT_RENDERING=1) hands the original upload to the
+# browser instead of writing PNGs. Only lossless formats whose pixels a canvas
+# reproduces bit-exactly qualify: JPEG decoders differ in their IDCT rounding
+# (low bit planes would disagree with the server), canvases premultiply alpha
+# (destroying RGB under transparent pixels), and palettes need the server's
+# index-aware path. Very large images stay server-side to spare the client.
+CLIENT_RENDER_FORMATS = frozenset({"PNG", "BMP"})
+CLIENT_RENDER_MODES = {"L": ["Grayscale"], "RGB": ["Red", "Green", "Blue"]}
+MAX_CLIENT_RENDER_PIXELS = 16_000_000
+
+
 class LoadedImage(NamedTuple):
     """Decoded image array, or a ready-to-store error result."""
 
     array: np.ndarray | None
-    converted: bool
+    error: dict[str, Any] | None
+    # keep_palette only: (256, 4) RGBA palette entries, ``array`` holding the
+    # raw indices. Unused entries are zero; alpha comes from tRNS (255 if none).
+    palette: np.ndarray | None = None
+
+
+class StreamedImage(NamedTuple):
+    """Opened (not yet decoded) image for strip-wise reads, or an error result."""
+
+    image: Image.Image | None
     error: dict[str, Any] | None
 
 
 def _error(message: str) -> LoadedImage:
-    return LoadedImage(array=None, converted=False, error={"status": "error", "error": message})
+    return LoadedImage(array=None, error={"status": "error", "error": message})
+
 
+def _too_large(img: Image.Image, max_pixels: int) -> str | None:
+    if img.width * img.height > max_pixels:
+        return (
+            f"Image dimensions {img.width}x{img.height} exceed the "
+            f"{max_pixels // 1_000_000} megapixel processing limit."
+        )
+    return None
 
-def load_image_array(path: Path) -> LoadedImage:
+
+def _palette_rgba(img: Image.Image) -> np.ndarray:
+    """Return a P image's palette as a (256, 4) uint8 RGBA table."""
+    palette = np.zeros((PALETTE_SIZE, 4), dtype=np.uint8)
+    entries = np.frombuffer(bytes(img.getpalette("RGB") or []), dtype=np.uint8)
+    entries = entries[: PALETTE_SIZE * 3].reshape(-1, 3)
+    palette[: len(entries), :3] = entries
+    palette[:, 3] = 255
+    transparency = img.info.get("transparency")
+    if isinstance(transparency, bytes):
+        alpha = np.frombuffer(transparency[:PALETTE_SIZE], dtype=np.uint8)
+        palette[: len(alpha), 3] = alpha
+    elif isinstance(transparency, int) and 0 <= transparency < PALETTE_SIZE:
+        palette[transparency, 3] = 0
+    return palette
+
+
+def load_image_array(path: Path, *, keep_palette: bool = False) -> LoadedImage:
     """Load an image as a NumPy array, converting palette images to RGB.
 
+    With ``keep_palette``, palette images are returned as their index array
+    plus the RGBA palette instead, so callers can work on the indices (where
+    palette stego hides) and on the 256 entries rather than every pixel.
+
     Corrupt/polyglot uploads are expected input, not an exception worth a
     Sentry report (issue #192), so decode failures come back as an error
     result the analyzer can store as-is. Decompression bombs likewise: they
@@ -38,19 +95,81 @@ def load_image_array(path: Path) -> LoadedImage:
     """
     try:
         with Image.open(path) as img:
-            if img.width * img.height > MAX_IMAGE_PIXELS:
-                return _error(
-                    f"Image dimensions {img.width}x{img.height} exceed the "
-                    f"{MAX_IMAGE_PIXELS // 1_000_000} megapixel processing limit.",
-                )
-            converted = False
+            too_large = _too_large(img, MAX_IMAGE_PIXELS)
+            if too_large:
+                return _error(too_large)
+            palette = None
             decoded = img
-            if img.mode == "P":
+            if img.mode == "P" and keep_palette:
+                palette = _palette_rgba(img)
+            elif img.mode == "P":
                 decoded = img.convert("RGB")
-                converted = True
             array = np.array(decoded)
     except UnidentifiedImageError:
         return _error("Pillow cannot decode this file as an image.")
     except Image.DecompressionBombError:
         return _error("Image rejected: decoded size would be a decompression bomb.")
-    return LoadedImage(array=array, converted=converted, error=None)
+    return LoadedImage(array=array, error=None, palette=palette)
+
+
+@contextmanager
+def open_streaming(path: Path) -> Iterator[StreamedImage]:
+    """Open ``path`` for :func:`iter_strips`, capped at ``MAX_IMAGE_PIXELS``.
+
+    Same error contract as :func:`load_image_array`: undecodable files and
+    oversized headers yield an error result instead of raising.
+    """
+    try:
+        img = Image.open(path)
+    except UnidentifiedImageError:
+        yield StreamedImage(None, _error("Pillow cannot decode this file as an image.").error)
+        return
+    except Image.DecompressionBombError:
+        message = "Image rejected: decoded size would be a decompression bomb."
+        yield StreamedImage(None, _error(message).error)
+        return
+    with img:
+        too_large = _too_large(img, MAX_IMAGE_PIXELS)
+        if too_large:
+            yield StreamedImage(None, _error(too_large).error)
+        else:
+            yield StreamedImage(img, None)
+
+
+def iter_strips(img: Image.Image, rows: int) -> Iterator[np.ndarray]:
+    """Yield ``img`` top to bottom as arrays of at most ``rows`` rows each.
+
+    Pillow decodes the whole frame on the first crop (PNG and JPEG are not
+    row-addressable through its API); only the arrays handed out are per strip.
+    """
+    for top in range(0, img.height, rows):
+        yield np.asarray(img.crop((0, top, img.width, min(top + rows, img.height))))
+
+
+def client_render_spec(path: Path, submission_hash: str) -> dict[str, Any] | None:
+    """Describe ``path`` for in-browser rendering, or None to render server-side.
+
+    Reads the header only. The spec carries the original's URL, its channel
+    labels and the submission's ``/transform`` base, which the frontend uses
+    as the server-rendered fallback.
+    """
+    if not CLIENT_RENDERING:
+        return None
+    try:
+        with Image.open(path) as img:
+            fmt, mode, width, height = img.format, img.mode, img.width, img.height
+    except (UnidentifiedImageError, OSError):
+        return None
+    if (
+        fmt not in CLIENT_RENDER_FORMATS
+        or mode not in CLIENT_RENDER_MODES
+        or width * height > MAX_CLIENT_RENDER_PIXELS
+    ):
+        return None
+    return {
+        "source": f"/image/{path.name}",
+        "transform": f"/transform/{submission_hash}",
+        "channels": CLIENT_RENDER_MODES[mode],
+        "width": width,
+        "height": height,
+    }
@@ -8,6 +8,8 @@ subclass registration, so adding an analyzer only requires creating its file
 import importlib
 import pkgutil
 
+from aperisolve.utils.carving import EMBEDDED_TAG
+
 from .base_analyzer import REGISTRY, SubprocessAnalyzer
 
 _SKIPPED_MODULES = frozenset({"base_analyzer", "registry"})
@@ -42,6 +44,8 @@ def get_analyzers(
     file-type tags (see :mod:`aperisolve.filetype`); when provided, an analyzer
     is skipped unless it is file-agnostic (empty ``accepts``) or its ``accepts``
     intersects ``tags``. ``tags=None`` disables the gate (legacy behavior).
+    Outside deep analyses, ``needs_embedded`` analyzers also need the
+    ``EMBEDDED_TAG`` tag.
     """
     result: list[type[SubprocessAnalyzer]] = []
     for cls in discover_analyzers():
@@ -49,12 +53,14 @@ def get_analyzers(
             continue
         if tags is not None and cls.accepts and not (cls.accepts & tags):
             continue
+        if cls.needs_embedded and not deep and tags is not None and EMBEDDED_TAG not in tags:
+            continue
         result.append(cls)
     return result
 
 
 def archive_tools() -> frozenset[str]:
-    """Names of analyzers producing a downloadable ``<name>.7z`` archive."""
+    """Names of analyzers producing a downloadable ``<name>.zip`` archive."""
     return frozenset(cls.name for cls in discover_analyzers() if cls.has_archive)
 
 
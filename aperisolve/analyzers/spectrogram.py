@@ -1,8 +1,24 @@
 """Spectrogram/Waveform Analyzer for audio submissions.
 
-Pure-Python (NumPy + Pillow) audio visualiser. PCM WAV is decoded directly
-with the stdlib :mod:`wave`; every other container (mp3/flac/ogg/m4a) and any
-non-PCM WAV is transcoded to a temporary PCM WAV with ``ffmpeg`` first.
+Pure-Python (NumPy + Pillow) audio visualiser. The data chunk of a PCM WAV
+is memory-mapped directly; every other container (mp3/flac/ogg/m4a, and the
+first audio track of a video) and any non-PCM WAV is decoded by ``ffmpeg``
+to raw 16-bit PCM read from its stdout, after an ``ffprobe`` call for the
+channel count. Nothing is written to disk.
+
+Samples are streamed in blocks of ``_BLOCK_FRAMES`` frames through an
+incremental STFT whose columns are max-pooled down to plot resolution, and
+through a likewise pooled min/max envelope for the waveform. Peak memory is
+therefore fixed by the plot size, not the clip length, and every clip renders
+in full whatever its duration.
+
+Every STFT column is also appended, quantized to half-dB uint8 levels, to
+``spectrogram-zoom.npy``; the ``/spectrogram`` tile route
+(:mod:`aperisolve.spectrogram_tiles`) cuts deep-zoom views out of it on
+demand, so fine time/frequency detail is available without rendering huge
+images up front. The store is capped at ``ZOOM_MAX_BYTES``: once full, its
+columns are max-pooled in pairs in place and later columns are pooled to
+match, so it keeps covering the whole clip at a coarser time step.
 
 Channels are preserved end to end (ffmpeg keeps the source channel layout), so
 the analyzer renders **one annotated spectrogram per channel** plus a single
@@ -13,15 +29,21 @@ carries a time (s) X axis and a normalised amplitude Y axis with a zero
 baseline. All axis text is rasterised into the PNG, so nothing here needs
 translating.
 
-Like the other NumPy analyzers there is no wall-clock guard, so run time is
-bounded solely by the ``MAX_CONTENT_LENGTH`` upload cap (1 MB by default).
+Like the other NumPy analyzers there is no wall-clock guard, so run time
+(linear in the clip length) is bounded solely by the ``MAX_CONTENT_LENGTH``
+upload cap (1 MB by default).
 """
 
+import functools
+import io
+import json
 import math
 import struct
 import wave
+from collections.abc import Iterator
 from pathlib import Path
-from typing import Any, NamedTuple
+from types import TracebackType
+from typing import Any, NamedTuple, Self
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
@@ -29,9 +51,20 @@ from PIL import Image, ImageDraw, ImageFont
 from .base_analyzer import SubprocessAnalyzer
 
 # --- Decoding -------------------------------------------------------------
-# Extensions the stdlib ``wave`` reader can open directly (fast path).
+# Extensions whose PCM data chunk is memory-mapped directly (fast path).
 _WAV_SUFFIXES = frozenset({".wav", ".wave"})
-# Sample widths in bytes (stdlib ``wave`` reports these via getsampwidth()).
+# RIFF/WAVE header layout: format tags for plain and extensible PCM, and the
+# fmt chunk sizes carrying the basic fields and the extensible sub-format.
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_FMT_BASIC_SIZE = 16
+_FMT_EXTENSIBLE_SIZE = 40
+_RIFF_HEADER_SIZE = 12
+_CHUNK_HEADER = struct.Struct("<4sI")
+# Frames decoded per block. Every stage below consumes blocks, so this (not
+# the clip length) bounds the float32 temporaries.
+_BLOCK_FRAMES = 1 << 16
+# Sample widths in bytes.
 _WIDTH_U8 = 1
 _WIDTH_I16 = 2
 _WIDTH_I24 = 3
@@ -45,7 +78,10 @@ _SPAN_24 = 0x100_0000
 # NOTE: channels are intentionally NOT collapsed (no ``-ac 1``); a stereo source
 # stays stereo so each channel gets its own spectrogram.
 _FFMPEG_RATE = 22050
+# ffmpeg emits signed 16-bit little-endian samples on its stdout.
+_FFMPEG_WIDTH = _WIDTH_I16
 _ERROR_MSG = "Could not decode audio (ffmpeg unavailable or unsupported format)."
+_NO_AUDIO_MSG = "No audio stream found."
 
 # --- Spectrogram DSP ------------------------------------------------------
 # Larger FFT than before (was 1024) for finer frequency resolution; the hop is a
@@ -56,13 +92,35 @@ HOP = N_FFT // 4
 DB_FLOOR = -80.0
 EPSILON = 1e-12
 U8_MAX = 255.0
-# Cap on STFT columns. The 1 MB upload cap already bounds this well below the
-# limit for realistic audio; the cap only defends against a pathological
-# high-rate/8-bit clip that would otherwise render a very wide image. When it
-# bites, the time axis is labelled with the truncated span and a note is added.
-MAX_COLUMNS = 8192
+# STFT columns kept for the heatmap. Longer clips are max-pooled down to
+# this many (so short bursts stay visible); the heatmap is resampled to
+# _PLOT_W pixels anyway, so twice that loses nothing the plot can show.
+_POOL_COLUMNS = 1800
+# Min/max buckets kept for the waveform envelope, pooled the same way.
+_ENVELOPE_BUCKETS = 7200
 # Cap on rendered channels; extra channels are noted but not drawn.
 MAX_CHANNELS = 6
+# STFT frames transformed per batched rFFT call: bounds the complex
+# temporaries to ~_STFT_BLOCK x N_FFT per channel.
+_STFT_BLOCK = 512
+_WINDOW = np.hanning(N_FFT).astype(np.float32)
+
+# --- Deep-zoom store ------------------------------------------------------
+# Levels are absolute (dB full scale, level 0 = ZOOM_DB_FLOOR) rather than
+# relative to the clip's peak, so columns can be written as they are
+# computed; the per-channel peak level is recorded alongside.
+ZOOM_NAME = "spectrogram-zoom.npy"
+ZOOM_META_NAME = "spectrogram-zoom.json"
+ZOOM_DB_STEP = 0.5
+ZOOM_DB_FLOOR = -127.5
+# Store size per clip, all channels together: ~6 minutes of mono 44.1 kHz
+# audio at one column per STFT hop. Longer clips halve the time resolution
+# as often as needed to fit.
+ZOOM_MAX_BYTES = 32 << 20
+# Tiles are TILE_SIZE pixels square; zoom level z splits both axes in 2**z.
+TILE_SIZE = 256
+# Bytes reserved for the .npy header, written once the column count is known.
+_NPY_HEADER_SIZE = 128
 
 # --- Plot geometry (pixels) ----------------------------------------------
 _PLOT_W = 900
@@ -112,7 +170,6 @@ _WAVE_BG = 255
 _WAVE_COLOR = (46, 160, 67)
 
 # Notes surfaced to the UI when a limit bites.
-_TRUNCATION_NOTE = "Spectrogram shows first {shown:.1f} s of {total:.1f} s."
 _CHANNEL_CAP_NOTE = "Showing the first {cap} of {total} channels."
 
 _LUT_MAX_INDEX = 255
@@ -159,14 +216,38 @@ def _build_lut() -> np.ndarray:
 _VIRIDIS_LUT = _build_lut()
 
 
+class PcmStream(NamedTuple):
+    """Source metadata plus a lazy iterator of ``(frames, n_channels)`` blocks."""
+
+    blocks: Iterator[np.ndarray]
+    framerate: int
+    n_channels: int
+    sampwidth: int
+    via_ffmpeg: bool = False
+
+
+class PcmLayout(NamedTuple):
+    """Where the data chunk of a PCM WAV lives, and how its frames are laid out."""
+
+    offset: int
+    size: int
+    framerate: int
+    n_channels: int
+    sampwidth: int
+
+
 class DecodedAudio(NamedTuple):
-    """Decoded per-channel signal plus source metadata, or a stored error.
+    """Plot-resolution summary of a decoded clip, or a stored error.
 
-    ``channels`` has shape ``(n_samples, n_channels)``; a mono mixdown is just
-    ``channels.mean(axis=1)``.
+    ``heatmaps`` is uint8 ``(channels, freq_bins, columns)``, ready to colour
+    map; ``envelope`` holds the normalised per-bucket maxima and minima of the
+    mono mixdown.
     """
 
-    channels: np.ndarray | None = None
+    heatmaps: np.ndarray | None = None
+    envelope: tuple[np.ndarray, np.ndarray] | None = None
+    zoom_columns: int = 0
+    zoom_frames: int = 0
     framerate: int = 0
     n_channels: int = 0
     sampwidth: int = 0
@@ -199,7 +280,7 @@ def _error_result() -> dict[str, Any]:
     return {"status": "error", "error": _ERROR_MSG}
 
 
-def _pcm_to_channels(raw: bytes, sampwidth: int, n_channels: int) -> np.ndarray:
+def _pcm_to_channels(raw: bytes | np.ndarray, sampwidth: int, n_channels: int) -> np.ndarray:
     """Decode interleaved little-endian PCM bytes to ``(n_samples, n_channels)``.
 
     Handles 8-bit (unsigned), 16/32-bit (signed) and 24-bit (manually
@@ -209,7 +290,7 @@ def _pcm_to_channels(raw: bytes, sampwidth: int, n_channels: int) -> np.ndarray:
     """
     frame_bytes = sampwidth * n_channels
     raw = raw[: (len(raw) // frame_bytes) * frame_bytes]
-    if not raw:
+    if len(raw) == 0:
         return np.zeros((0, n_channels), dtype=np.float32)
 
     if sampwidth == _WIDTH_U8:
@@ -233,6 +314,398 @@ def _pcm_to_channels(raw: bytes, sampwidth: int, n_channels: int) -> np.ndarray:
     return samples.reshape(-1, n_channels).astype(np.float32)
 
 
+def _read_fmt(data: bytes) -> tuple[int, int, int]:
+    """Return (n_channels, framerate, sampwidth) of a PCM ``fmt `` chunk body.
+
+    Raises ``wave.Error`` for anything but integer PCM (plain or
+    WAVE_FORMAT_EXTENSIBLE), so the caller can fall back to ffmpeg.
+    """
+    if len(data) < _FMT_BASIC_SIZE:
+        msg = "Truncated fmt chunk"
+        raise wave.Error(msg)
+    tag, n_channels, framerate, _, block_align, bits = struct.unpack_from("<HHIIHH", data)
+    if tag == _WAVE_FORMAT_EXTENSIBLE and len(data) >= _FMT_EXTENSIBLE_SIZE:
+        # The sub-format GUID starts with the plain format tag.
+        (tag,) = struct.unpack_from("<H", data, 24)
+    sampwidth = (bits + 7) // 8
+    if tag != _WAVE_FORMAT_PCM or block_align != sampwidth * n_channels:
+        msg = "Non-PCM WAV compression"
+        raise wave.Error(msg)
+    return n_channels, framerate, sampwidth
+
+
+def _pipe_blocks(chunks: Iterator[bytes], n_channels: int) -> Iterator[np.ndarray]:
+    """Yield float32 blocks of raw s16le PCM chunks read from a pipe."""
+    for chunk in chunks:
+        yield _pcm_to_channels(chunk, _FFMPEG_WIDTH, n_channels)
+
+
+def _memmap_blocks(
+    path: Path,
+    offset: int,
+    size: int,
+    sampwidth: int,
+    n_channels: int,
+) -> Iterator[np.ndarray]:
+    """Yield float32 blocks of a memory-mapped PCM data chunk."""
+    data = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(size,))
+    step = _BLOCK_FRAMES * sampwidth * n_channels
+    for start in range(0, size, step):
+        yield _pcm_to_channels(data[start : start + step], sampwidth, n_channels)
+
+
+def locate_pcm_data(path: Path) -> PcmLayout | None:
+    """Locate the PCM data chunk of a WAV file.
+
+    The RIFF chunks are walked by hand rather than with :mod:`wave`, which
+    can only copy frames out. Returns None for a WAV without audio frames and
+    raises ``wave.Error`` if it is not PCM.
+    """
+    file_size = path.stat().st_size
+    fmt: tuple[int, int, int] | None = None
+    with path.open("rb") as handle:
+        riff = handle.read(_RIFF_HEADER_SIZE)
+        if len(riff) < _RIFF_HEADER_SIZE or riff[:4] != b"RIFF" or riff[8:] != b"WAVE":
+            msg = "Not a RIFF/WAVE file"
+            raise wave.Error(msg)
+        while header := handle.read(_CHUNK_HEADER.size):
+            if len(header) < _CHUNK_HEADER.size:
+                break
+            chunk_id, chunk_size = _CHUNK_HEADER.unpack(header)
+            if chunk_id == b"fmt ":
+                fmt = _read_fmt(handle.read(chunk_size))
+                handle.seek(chunk_size & 1, 1)
+            elif chunk_id == b"data" and fmt is not None:
+                n_channels, framerate, sampwidth = fmt
+                # Streamed WAVs leave the size unset (0 or 0xFFFFFFFF): clamp.
+                offset = handle.tell()
+                frame_bytes = sampwidth * n_channels
+                size = min(chunk_size or file_size, file_size - offset)
+                size -= size % frame_bytes
+                if size <= 0 or framerate == 0:
+                    return None
+                return PcmLayout(offset, size, framerate, n_channels, sampwidth)
+            else:
+                handle.seek(chunk_size + (chunk_size & 1), 1)
+    msg = "No fmt/data chunk"
+    raise wave.Error(msg)
+
+
+def open_pcm_wav(path: Path) -> PcmStream | None:
+    """Stream the PCM data chunk of a WAV file memory-mapped (see ``locate_pcm_data``)."""
+    layout = locate_pcm_data(path)
+    if layout is None:
+        return None
+    blocks = _memmap_blocks(path, layout.offset, layout.size, layout.sampwidth, layout.n_channels)
+    return PcmStream(blocks, layout.framerate, layout.n_channels, layout.sampwidth)
+
+
+class _MaxPool:
+    """Running max-pool of a stream of rows into at most ``capacity`` rows.
+
+    Input rows are merged ``factor`` at a time. When the buffer fills up,
+    neighbouring rows are merged pairwise and ``factor`` doubles, so memory
+    stays fixed however long the stream runs and every input row ends up in
+    exactly one output row. While the stream fits, rows pass through as-is.
+    """
+
+    def __init__(self, capacity: int, shape: tuple[int, ...]) -> None:
+        """Allocate the pooled buffer; ``capacity`` must be even."""
+        self.capacity = capacity
+        self.factor = 1
+        self.size = 0
+        self._rows = np.empty((capacity, *shape), dtype=np.float32)
+        self._partial: np.ndarray | None = None
+        self._partial_count = 0
+
+    @property
+    def empty(self) -> bool:
+        """Whether no row was pushed yet."""
+        return self.size == 0 and self._partial is None
+
+    def _halve(self) -> None:
+        rows = self._rows[: self.size]
+        half = self.size // 2
+        np.maximum(rows[0::2], rows[1::2], out=self._rows[:half])
+        self.size = half
+        self.factor *= 2
+
+    def _fill_partial(self, rows: np.ndarray) -> np.ndarray:
+        """Merge leading rows into the pending group; return the rest."""
+        take = min(self.factor - self._partial_count, len(rows))
+        merged = rows[:take].max(axis=0)
+        if self._partial is None:
+            self._partial = merged
+        else:
+            np.maximum(self._partial, merged, out=self._partial)
+        self._partial_count += take
+        if self._partial_count == self.factor:
+            if self.size == self.capacity:
+                # The group becomes the first half of a doubled one.
+                self._halve()
+            else:
+                self._rows[self.size] = self._partial
+                self.size += 1
+                self._partial = None
+                self._partial_count = 0
+        return rows[take:]
+
+    def push(self, rows: np.ndarray) -> None:
+        """Pool ``rows`` (shape ``(n, *shape)``) into the buffer."""
+        while len(rows):
+            if self._partial is not None:
+                rows = self._fill_partial(rows)
+                continue
+            if self.size == self.capacity:
+                self._halve()
+            groups = min(len(rows) // self.factor, self.capacity - self.size)
+            if not groups:
+                rows = self._fill_partial(rows)
+                continue
+            span = groups * self.factor
+            pooled = rows[:span].reshape(groups, self.factor, *rows.shape[1:]).max(axis=1)
+            self._rows[self.size : self.size + groups] = pooled
+            self.size += groups
+            rows = rows[span:]
+
+    def pooled(self) -> np.ndarray:
+        """Return the pooled rows, the trailing partial group included."""
+        if self._partial is None:
+            return self._rows[: self.size]
+        return np.concatenate([self._rows[: self.size], self._partial[np.newaxis]])
+
+
+def max_zoom(columns: int, bins: int) -> int:
+    """Deepest zoom level at which a tile still covers at least one column or bin."""
+    return max(0, math.ceil(math.log2(max(columns, bins) / TILE_SIZE)))
+
+
+def zoom_palette(peak: int) -> bytes:
+    """Viridis palette mapping stored zoom levels to the plots' dB scale.
+
+    Like the plots, 0 dB is the channel's own ``peak`` level and everything
+    ``DB_FLOOR`` below it is dark.
+    """
+    relative_db = (np.arange(256) - peak) * ZOOM_DB_STEP
+    norm = np.clip((relative_db - DB_FLOOR) / (0.0 - DB_FLOOR), 0.0, 1.0)
+    return _VIRIDIS_LUT[(norm * U8_MAX).astype(np.uint8)].tobytes()
+
+
+class _ZoomWriter:
+    """Append quantized STFT columns to a ``(columns, channels, bins)`` uint8 .npy.
+
+    The header is written last, over space reserved up front, so columns go
+    straight to disk whatever the (unknown in advance) clip length. Each
+    stored column is the maximum of ``pool`` consecutive STFT columns;
+    ``pool`` doubles whenever the store would outgrow ``ZOOM_MAX_BYTES``.
+    """
+
+    def __init__(self, path: Path, n_channels: int, sampwidth: int) -> None:
+        """Open ``path`` for ``n_channels`` channels of ``sampwidth``-byte samples."""
+        self.path = path
+        self.columns = 0
+        self.frames = 0
+        self.pool = 1
+        self.peaks = np.zeros(n_channels, dtype=np.uint8)
+        self._bins = N_FFT // 2 + 1
+        self._column_bytes = n_channels * self._bins
+        # Even, so halving never leaves a stored column unpaired.
+        self._max_columns = max(2, ZOOM_MAX_BYTES // self._column_bytes & ~1)
+        # Running maximum of the STFT columns of a not yet complete pool.
+        self._partial = np.zeros((n_channels, self._bins), dtype=np.uint8)
+        self._partial_count = 0
+        # rFFT magnitude of a full-scale sine under the Hann window.
+        self._reference = 2.0 ** (sampwidth * 8 - 1) * float(_WINDOW.sum()) / 2.0
+        self._handle = path.open("w+b")
+        self._handle.write(bytes(_NPY_HEADER_SIZE))
+
+    def __enter__(self) -> Self:
+        """Return the writer itself."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Finish the store, or drop it if the block raised."""
+        if exc_type is None:
+            self.close()
+        else:
+            self._handle.close()
+            self.path.unlink(missing_ok=True)
+
+    def append(self, mag: np.ndarray) -> None:
+        """Quantize and store ``(frames, channels, bins)`` magnitudes."""
+        if not len(mag):
+            return
+        dbfs = 20.0 * np.log10(mag / self._reference + EPSILON)
+        levels = np.clip(np.round((dbfs - ZOOM_DB_FLOOR) / ZOOM_DB_STEP), 0, U8_MAX)
+        levels = levels.astype(np.uint8)
+        np.maximum(self.peaks, levels.max(axis=(0, 2)), out=self.peaks)
+        self.frames += len(levels)
+        pos = 0
+        while pos < len(levels):
+            if self.columns == self._max_columns:
+                self._halve()
+            if self._partial_count or len(levels) - pos < self.pool:
+                take = min(self.pool - self._partial_count, len(levels) - pos)
+                np.maximum(self._partial, levels[pos : pos + take].max(axis=0), out=self._partial)
+                self._partial_count += take
+                pos += take
+                if self._partial_count == self.pool:
+                    self._flush_partial()
+                continue
+            n = min((len(levels) - pos) // self.pool, self._max_columns - self.columns)
+            block = levels[pos : pos + n * self.pool]
+            block = block.reshape(n, self.pool, *levels.shape[1:]).max(axis=1)
+            self._handle.write(block.tobytes())
+            self.columns += n
+            pos += n * self.pool
+
+    def _flush_partial(self) -> None:
+        """Store the pending pooled column and start a new one."""
+        self._handle.write(self._partial.tobytes())
+        self.columns += 1
+        self._partial.fill(0)
+        self._partial_count = 0
+
+    def _halve(self) -> None:
+        """Max-pool the stored columns in pairs, in place, and double ``pool``."""
+        chunk = 1024
+        for start in range(0, self.columns, 2 * chunk):
+            count = min(2 * chunk, self.columns - start)
+            self._handle.seek(_NPY_HEADER_SIZE + start * self._column_bytes)
+            pairs = np.frombuffer(self._handle.read(count * self._column_bytes), np.uint8)
+            pooled = pairs.reshape(count // 2, 2, self._column_bytes).max(axis=1)
+            # Pooled columns land before the ones still to be read.
+            self._handle.seek(_NPY_HEADER_SIZE + start // 2 * self._column_bytes)
+            self._handle.write(pooled.tobytes())
+        self.columns //= 2
+        self._handle.truncate(_NPY_HEADER_SIZE + self.columns * self._column_bytes)
+        self._handle.seek(0, io.SEEK_END)
+        self.pool *= 2
+
+    def close(self) -> None:
+        """Write the .npy header and the JSON sidecar the tile route reads."""
+        if self._partial_count:
+            if self.columns == self._max_columns:
+                self._halve()
+            self._flush_partial()
+        bins = self._bins
+        header = {
+            "descr": "|u1",
+            "fortran_order": False,
+            "shape": (self.columns, len(self.peaks), bins),
+        }
+        self._handle.seek(0)
+        np.lib.format.write_array_header_1_0(self._handle, header)
+        header_size = self._handle.tell()
+        self._handle.close()
+        if header_size != _NPY_HEADER_SIZE:
+            self.path.unlink(missing_ok=True)
+            msg = f"Unexpected .npy header size {header_size}"
+            raise ValueError(msg)
+        meta = {
+            "columns": self.columns,
+            "channels": len(self.peaks),
+            "bins": bins,
+            "pool": self.pool,
+            "peaks": self.peaks.tolist(),
+        }
+        (self.path.parent / ZOOM_META_NAME).write_text(json.dumps(meta), encoding="utf-8")
+
+
+class _StftStream:
+    """Incremental STFT over sample blocks, max-pooled to plot resolution.
+
+    Frames start every ``HOP`` samples from the start of the clip whatever
+    the block boundaries: the tail of each block that does not yet fill a
+    frame is carried into the next one.
+    """
+
+    def __init__(self, n_channels: int, zoom: _ZoomWriter | None = None) -> None:
+        """Start an empty stream of ``n_channels`` channels, optionally stored for zooming."""
+        self._carry = np.zeros((n_channels, 0), dtype=np.float32)
+        self._pool = _MaxPool(_POOL_COLUMNS, (n_channels, N_FFT // 2 + 1))
+        self._zoom = zoom
+
+    def _transform(self, sig: np.ndarray, n_frames: int) -> None:
+        """Pool the magnitudes of the first ``n_frames`` frames of ``sig``."""
+        frames = np.lib.stride_tricks.sliding_window_view(sig, N_FFT, axis=1)[:, ::HOP]
+        for start in range(0, n_frames, _STFT_BLOCK):
+            block = frames[:, start : min(start + _STFT_BLOCK, n_frames)]
+            mag = np.abs(np.fft.rfft(block * _WINDOW, axis=-1)).astype(np.float32, copy=False)
+            columns = mag.transpose(1, 0, 2)
+            self._pool.push(columns)
+            if self._zoom is not None:
+                self._zoom.append(columns)
+
+    def push(self, block: np.ndarray) -> None:
+        """Feed a ``(frames, n_channels)`` block of samples."""
+        sig = np.concatenate([self._carry, block.T], axis=1)
+        n_frames = (sig.shape[1] - N_FFT) // HOP + 1 if sig.shape[1] >= N_FFT else 0
+        if n_frames:
+            self._transform(sig, n_frames)
+        self._carry = np.ascontiguousarray(sig[:, n_frames * HOP :])
+
+    def heatmaps(self) -> np.ndarray:
+        """Return uint8 (channels, freq_bins, columns) heatmaps, low bins at the bottom.
+
+        Each channel is normalised to its own peak; a clip shorter than one
+        frame is zero-padded to a single column.
+        """
+        if self._pool.empty:
+            sig = np.pad(self._carry, ((0, 0), (0, N_FFT - self._carry.shape[1])))
+            self._transform(sig, 1)
+        mag = self._pool.pooled()
+        peak = mag.max(axis=(0, 2), keepdims=True)
+        db = 20.0 * np.log10(mag / (peak + EPSILON) + EPSILON)
+        norm = np.clip((db - DB_FLOOR) / (0.0 - DB_FLOOR), 0.0, 1.0)
+        idx = (norm * U8_MAX).astype(np.uint8)
+        # (columns, channels, bins) -> (channels, bins, columns).
+        return np.ascontiguousarray(idx.transpose(1, 2, 0)[:, ::-1, :])
+
+
+def _accumulate(stream: PcmStream, zoom: _ZoomWriter | None = None) -> DecodedAudio:
+    """Run every block of ``stream`` through the STFT and envelope pools."""
+    stft = _StftStream(min(stream.n_channels, MAX_CHANNELS), zoom)
+    # Pooling (max, -min) pairs with one max keeps both extremes per bucket.
+    extremes = _MaxPool(_ENVELOPE_BUCKETS, (2,))
+    n_frames = 0
+    for block in stream.blocks:
+        if not len(block):
+            continue
+        stft.push(block[:, :MAX_CHANNELS])
+        mono = block.mean(axis=1)
+        extremes.push(np.stack([mono, -mono], axis=1))
+        n_frames += len(block)
+    if n_frames == 0:
+        return DecodedAudio(error=_error_result())
+
+    pooled = extremes.pooled()
+    if stream.via_ffmpeg:
+        divisor = float(pooled.max()) or 1.0
+    else:
+        divisor = float(2 ** (stream.sampwidth * 8 - 1))
+    hi = np.clip(pooled[:, 0] / divisor, -1.0, 1.0)
+    lo = np.clip(-pooled[:, 1] / divisor, -1.0, 1.0)
+    heatmaps = stft.heatmaps()
+    return DecodedAudio(
+        heatmaps=heatmaps,
+        envelope=(hi, lo),
+        zoom_columns=zoom.columns if zoom is not None else 0,
+        zoom_frames=zoom.frames if zoom is not None else 0,
+        framerate=stream.framerate,
+        n_channels=stream.n_channels,
+        sampwidth=stream.sampwidth,
+        n_frames=n_frames,
+        via_ffmpeg=stream.via_ffmpeg,
+    )
+
+
+@functools.lru_cache(maxsize=4)
 def _load_font(size: int) -> _Font:
     """Load a scalable default font, falling back to the bitmap default.
 
@@ -309,7 +782,7 @@ def _db_axis() -> Axis:
     return Axis(DB_FLOOR, 0.0, ticks, [_fmt_num(t) for t in ticks], "dB")
 
 
-def _channel_title(index: int, n_channels: int) -> str:
+def channel_title(index: int, n_channels: int) -> str:
     """Human-readable channel name: Left/Right for stereo, else 'Channel N'."""
     if n_channels == _STEREO:
         return _STEREO_NAMES[index]
@@ -408,20 +881,25 @@ def _draw_colorbar(
     )
 
 
-def _waveform_plot(signal_norm: np.ndarray) -> np.ndarray:
-    """Render a min/max envelope of a normalised signal into the plot area."""
+def _waveform_plot(highs: np.ndarray, lows: np.ndarray | None = None) -> np.ndarray:
+    """Render a min/max envelope of a normalised signal into the plot area.
+
+    ``highs``/``lows`` are per-bucket maxima and minima (a plain signal is
+    its own). One ``reduceat`` pass per extreme gives every pixel column's
+    peak; a column narrower than one bucket (short clips) shows the bucket at
+    its start, which is exactly ``reduceat``'s rule for empty segments.
+    """
+    lows = highs if lows is None else lows
     canvas = np.full((_WAVE_PLOT_H, _PLOT_W, 3), _WAVE_BG, dtype=np.uint8)
-    n = signal_norm.size
+    n = highs.size
     if n:
-        edges = np.linspace(0, n, _PLOT_W + 1, dtype=np.int64)
-        for x in range(_PLOT_W):
-            start, end = int(edges[x]), int(edges[x + 1])
-            seg = signal_norm[start:end] if end > start else signal_norm[min(start, n - 1) :][:1]
-            hi = float(seg.max())
-            lo = float(seg.min())
-            y_hi = int((1.0 - (hi + 1.0) / 2.0) * (_WAVE_PLOT_H - 1))
-            y_lo = int((1.0 - (lo + 1.0) / 2.0) * (_WAVE_PLOT_H - 1))
-            canvas[y_hi : y_lo + 1, x] = _WAVE_COLOR
+        starts = np.linspace(0, n, _PLOT_W + 1, dtype=np.int64)[:-1]
+        hi = np.maximum.reduceat(highs, starts)
+        lo = np.minimum.reduceat(lows, starts)
+        y_hi = ((1.0 - (hi + 1.0) / 2.0) * (_WAVE_PLOT_H - 1)).astype(np.int64)
+        y_lo = ((1.0 - (lo + 1.0) / 2.0) * (_WAVE_PLOT_H - 1)).astype(np.int64)
+        rows = np.arange(_WAVE_PLOT_H)[:, None]
+        canvas[(rows >= y_hi) & (rows <= y_lo)] = _WAVE_COLOR
     return canvas
 
 
@@ -430,100 +908,89 @@ class SpectrogramAnalyzer(SubprocessAnalyzer):
 
     name = "spectrogram"
     display_order = 15
-    accepts = frozenset({"audio"})
-
-    def _decode_pcm_wav(self, path: Path) -> DecodedAudio:
-        """Decode a PCM WAV file to per-channel float32. Raises ``wave.Error`` if non-PCM."""
-        with wave.open(str(path), "rb") as wav:
-            n_channels = wav.getnchannels()
-            sampwidth = wav.getsampwidth()
-            framerate = wav.getframerate()
-            n_frames = wav.getnframes()
-            if wav.getcomptype() != "NONE":
-                msg = "Non-PCM WAV compression"
-                raise wave.Error(msg)
-            raw = wav.readframes(n_frames)
-
-        if n_frames == 0 or framerate == 0 or not raw or sampwidth == 0 or n_channels == 0:
-            return DecodedAudio(error=_error_result())
-        channels = _pcm_to_channels(raw, sampwidth, n_channels)
-        if channels.size == 0:
-            return DecodedAudio(error=_error_result())
-        return DecodedAudio(
-            channels=channels,
-            framerate=framerate,
-            n_channels=n_channels,
-            sampwidth=sampwidth,
-            n_frames=int(channels.shape[0]),
-        )
+    # Videos are analyzed through their first audio track.
+    accepts = frozenset({"audio", "video"})
 
-    def _decode_via_ffmpeg(self, tmp_wav: Path) -> DecodedAudio:
-        """Transcode any audio to a temp PCM WAV via ffmpeg, then decode it.
+    def _probe_channels(self) -> int:
+        """Return the channel count of the upload's first audio stream (0 if none)."""
+        cmd = [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "a:0",
+            "-show_entries",
+            "stream=channels",
+            "-of",
+            "json",
+            str(self.input_img),
+        ]
+        proc = self.run_command(cmd)
+        if proc.returncode != 0:
+            return 0
+        streams = json.loads(proc.stdout or "{}").get("streams") or [{}]
+        return int(streams[0].get("channels") or 0)
 
-        Channels are preserved (no ``-ac 1``): a stereo source stays stereo so
-        every channel gets its own spectrogram.
+    def _pipe_pcm(self) -> PcmStream | None:
+        """Decode any audio with ffmpeg, streaming raw PCM from its stdout.
+
+        Channels are preserved (``-ac`` is pinned to the probed count rather
+        than collapsed): a stereo source stays stereo so every channel gets
+        its own spectrogram.
         """
+        n_channels = self._probe_channels()
+        if n_channels <= 0:
+            return None
         cmd = [
             "ffmpeg",
             "-v",
             "error",
-            "-y",
             "-i",
             str(self.input_img),
+            "-map",
+            "0:a:0",
+            "-ac",
+            str(n_channels),
             "-ar",
             str(_FFMPEG_RATE),
-            str(tmp_wav),
+            "-f",
+            "s16le",
+            "-acodec",
+            "pcm_s16le",
+            "pipe:1",
         ]
-        proc = self.run_command(cmd)
-        if proc.returncode != 0 or not tmp_wav.exists():
-            return DecodedAudio(error=_error_result())
-        decoded = self._decode_pcm_wav(tmp_wav)
-        if decoded.error is not None:
-            return decoded
-        return decoded._replace(via_ffmpeg=True)
+        chunks = self.stream_command(cmd, _BLOCK_FRAMES * _FFMPEG_WIDTH * n_channels)
+        return PcmStream(
+            _pipe_blocks(chunks, n_channels),
+            _FFMPEG_RATE,
+            n_channels,
+            _FFMPEG_WIDTH,
+            via_ffmpeg=True,
+        )
 
     def _decode(self) -> DecodedAudio:
-        """Decode the upload to per-channel float32, via stdlib wave or ffmpeg."""
-        tmp_wav = self.output_dir / "_transcode.wav"
+        """Stream the upload, memory-mapped or via ffmpeg, into plot-sized summaries."""
         try:
+            stream = None
             if self.input_img.suffix.lower() in _WAV_SUFFIXES:
                 try:
-                    return self._decode_pcm_wav(self.input_img)
+                    stream = open_pcm_wav(self.input_img)
                 except wave.Error:
-                    # Non-PCM WAV (float/µ-law/A-law/EXTENSIBLE): let ffmpeg try.
-                    pass
-            return self._decode_via_ffmpeg(tmp_wav)
+                    # Non-PCM WAV (float/µ-law/A-law): let ffmpeg try.
+                    stream = None
+            if stream is None:
+                stream = self._pipe_pcm()
+            if stream is None:
+                return DecodedAudio(error={"status": "error", "error": _NO_AUDIO_MSG})
+            zoom = _ZoomWriter(
+                self.output_dir / ZOOM_NAME,
+                min(stream.n_channels, MAX_CHANNELS),
+                stream.sampwidth,
+            )
+            with zoom:
+                return _accumulate(stream, zoom)
         except (wave.Error, EOFError, OSError, ValueError, struct.error, RuntimeError):
             return DecodedAudio(error=_error_result())
-        finally:
-            if tmp_wav.exists():
-                tmp_wav.unlink()
-
-    def _compute_stft(self, signal: np.ndarray) -> tuple[np.ndarray, int, int]:
-        """Return (heatmap, columns_rendered, columns_total) for one channel.
-
-        ``heatmap`` is a contiguous uint8 array shaped (freq_bins, columns) with
-        low frequencies at the bottom, ready to colour-map. ``columns_total`` is
-        the STFT width before the ``MAX_COLUMNS`` cap, so the caller can tell
-        whether (and by how much) the time axis was truncated.
-        """
-        sig = signal.astype(np.float32)
-        if sig.size < N_FFT:
-            sig = np.pad(sig, (0, N_FFT - sig.size))
-        window = np.hanning(N_FFT).astype(np.float32)
-        frames = np.lib.stride_tricks.sliding_window_view(sig, N_FFT)[::HOP]
-        columns_total = int(frames.shape[0])
-        if columns_total > MAX_COLUMNS:
-            frames = frames[:MAX_COLUMNS]
-        columns_rendered = int(frames.shape[0])
-        spec = np.fft.rfft(frames * window, axis=1)
-        mag = np.abs(spec)
-        db = 20.0 * np.log10(mag / (mag.max() + EPSILON) + EPSILON)
-        db = np.maximum(db, DB_FLOOR)
-        norm = np.clip((db - DB_FLOOR) / (0.0 - DB_FLOOR), 0.0, 1.0)
-        idx = (norm * U8_MAX).astype(np.uint8)
-        heatmap = np.ascontiguousarray(np.flipud(idx.T))  # low frequencies at bottom
-        return heatmap, columns_rendered, columns_total
 
     def _render_spectrogram(
         self,
@@ -562,46 +1029,34 @@ class SpectrogramAnalyzer(SubprocessAnalyzer):
         draw.text((box.left, _CHANNEL_TITLE_Y), title, font=title_font, fill=_TEXT_COLOR)
         return canvas
 
-    def _save_spectrograms(
-        self,
-        channels: np.ndarray,
-        framerate: int,
-    ) -> tuple[list[str], list[str]]:
+    def _save_spectrograms(self, decoded: DecodedAudio) -> tuple[list[str], list[str]]:
         """Render one spectrogram per channel; return (image URLs, note parts)."""
-        ch_count = int(channels.shape[1])
-        n_render = min(ch_count, MAX_CHANNELS)
-        total_duration = channels.shape[0] / framerate
+        heatmaps = decoded.heatmaps
+        if heatmaps is None:
+            return [], []
+        duration = decoded.n_frames / decoded.framerate
         base = Path(self.output_dir.name)
         urls: list[str] = []
         notes: list[str] = []
-        truncated: str | None = None
-
-        for i in range(n_render):
-            heatmap, rendered, total_cols = self._compute_stft(channels[:, i])
-            displayed = total_duration * rendered / total_cols if total_cols else total_duration
+        for i, heatmap in enumerate(heatmaps):
             img = self._render_spectrogram(
                 heatmap,
-                framerate,
-                displayed,
-                _channel_title(i, ch_count),
+                decoded.framerate,
+                duration,
+                channel_title(i, decoded.n_channels),
             )
             name = f"spectrogram-{i + 1}.png"
             img.save(self.output_dir / name)
             urls.append("/image/" + str(base / name))
-            if rendered < total_cols and truncated is None:
-                truncated = _TRUNCATION_NOTE.format(shown=displayed, total=total_duration)
 
-        if truncated:
-            notes.append(truncated)
-        if ch_count > MAX_CHANNELS:
-            notes.append(_CHANNEL_CAP_NOTE.format(cap=MAX_CHANNELS, total=ch_count))
+        if decoded.n_channels > MAX_CHANNELS:
+            notes.append(_CHANNEL_CAP_NOTE.format(cap=MAX_CHANNELS, total=decoded.n_channels))
         return urls, notes
 
-    def _save_waveform(self, mono: np.ndarray, divisor: float, duration: float) -> None:
+    def _save_waveform(self, envelope: tuple[np.ndarray, np.ndarray], duration: float) -> None:
         """Compose the annotated mono waveform envelope to ``waveform.png``."""
-        signal = np.clip(mono / divisor, -1.0, 1.0)
         canvas = Image.new("RGB", (_WAVE_CANVAS_W, _WAVE_CANVAS_H), _CANVAS_BG)
-        canvas.paste(Image.fromarray(_waveform_plot(signal), "RGB"), (_MARGIN_LEFT, _MARGIN_TOP))
+        canvas.paste(Image.fromarray(_waveform_plot(*envelope), "RGB"), (_MARGIN_LEFT, _MARGIN_TOP))
         draw = ImageDraw.Draw(canvas)
         box = PlotBox(_MARGIN_LEFT, _MARGIN_TOP, _PLOT_W, _WAVE_PLOT_H)
 
@@ -619,23 +1074,31 @@ class SpectrogramAnalyzer(SubprocessAnalyzer):
         _draw_x_axis(draw, box, _time_axis(duration), label_font)
         canvas.save(self.output_dir / "waveform.png")
 
+    def _zoom_spec(self, decoded: DecodedAudio) -> dict[str, Any]:
+        """Describe the deep-zoom tiles of this submission for the frontend."""
+        covered = min(decoded.n_frames, (decoded.zoom_frames - 1) * HOP + N_FFT)
+        return {
+            "tiles": f"/spectrogram/{self.output_dir.name}",
+            "channels": [
+                channel_title(i, decoded.n_channels)
+                for i in range(min(decoded.n_channels, MAX_CHANNELS))
+            ],
+            "max_zoom": max_zoom(decoded.zoom_columns, N_FFT // 2 + 1),
+            "tile_size": TILE_SIZE,
+            "duration": round(covered / decoded.framerate, 3),
+            "nyquist": decoded.framerate / 2,
+        }
+
     def get_results(self, password: str | None = None) -> dict[str, Any]:
         """Decode the audio upload and render per-channel spectrograms + waveform."""
         _ = password
         decoded = self._decode()
-        channels = decoded.channels
-        if decoded.error is not None or channels is None:
+        if decoded.error is not None or decoded.envelope is None:
             return decoded.error or _error_result()
 
-        mono = channels.mean(axis=1).astype(np.float32)
-        spec_urls, notes = self._save_spectrograms(channels, decoded.framerate)
-
-        if decoded.via_ffmpeg:
-            divisor = float(np.max(np.abs(mono))) or 1.0
-        else:
-            divisor = float(2 ** (decoded.sampwidth * 8 - 1))
+        spec_urls, notes = self._save_spectrograms(decoded)
         duration = decoded.n_frames / decoded.framerate
-        self._save_waveform(mono, divisor, duration)
+        self._save_waveform(decoded.envelope, duration)
 
         wave_url = "/image/" + str(Path(self.output_dir.name) / "waveform.png")
         result: dict[str, Any] = {
@@ -653,6 +1116,8 @@ class SpectrogramAnalyzer(SubprocessAnalyzer):
                 "Waveform": [wave_url],
             },
         }
+        if decoded.zoom_columns:
+            result["zoom"] = self._zoom_spec(decoded)
         if notes:
             result["note"] = " ".join(notes)
         return result
@@ -13,7 +13,7 @@ class TemplateAnalyzer(SubprocessAnalyzer):
 
     register = False  # Template only: remove this line in a real analyzer.
     name = "<toolname>"
-    has_archive = True  # The tool extracts files, zipped into <toolname>.7z.
+    has_archive = True  # The tool extracts files, zipped into <toolname>.zip.
     needs_password = True  # The tool receives the submission password.
     deep_only = False  # Only run when the user requests a deep analysis.
     display_order = 1000  # Frontend rendering position (lower renders first).
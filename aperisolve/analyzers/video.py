@@ -0,0 +1,214 @@
+"""Video Analyzer for video submissions.
+
+Reports the container metadata from ``ffprobe``, then samples at most
+``MAX_FRAMES`` frames evenly over the duration. Each frame is fetched by its
+own ``ffmpeg`` run that seeks to the sample time before decoding (so only the
+group of pictures around it is decoded) and streams one raw RGB frame
+through a pipe. Nothing is written to disk but the output PNGs, and work
+scales with the frame budget, not the video length.
+
+Every sampled frame is saved, drawn as its superimposed RGB least significant
+bits, and its LSB streams are scanned for hidden files and text by
+:mod:`aperisolve.utils.lsb`. Frames are handled one at a time, so memory is
+bounded by ``MAX_FRAME_PIXELS``. Lossy codecs scramble pixel LSBs; the scan
+matters for lossless ones (FFV1, HuffYUV, raw or PNG frames), which CTF
+challenges favour for exactly that reason. The audio track is covered by the
+spectrogram analyzer, which also accepts videos.
+"""
+
+import json
+from fractions import Fraction
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from aperisolve.utils.lsb import scan_stream
+
+from .base_analyzer import SubprocessAnalyzer
+
+MAX_FRAMES = 6
+# 4K UHD; one frame plus its LSB image stay around 50 MB.
+MAX_FRAME_PIXELS = 3840 * 2160
+RGB_CHANNELS = ("Red", "Green", "Blue")
+
+_ERROR_MSG = "Could not read the video (ffprobe unavailable or unsupported format)."
+_FRAME_CAP_NOTE = "Frames larger than {cap} pixels are not sampled."
+_FRAME_ERROR_NOTE = "{failed} of {total} sampled frames could not be decoded."
+
+
+def _rate(value: str | None) -> float:
+    """Parse an ffprobe rational such as ``30000/1001`` (0 when unknown)."""
+    try:
+        return float(Fraction(value or "0"))
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def describe_stream(stream: dict[str, Any]) -> str:
+    """Summarize one ffprobe stream entry on a single line."""
+    kind = stream.get("codec_type", "unknown")
+    parts = [kind, stream.get("codec_name", "unknown codec")]
+    if kind == "video":
+        parts.append(f"{stream.get('width', '?')}x{stream.get('height', '?')}")
+        fps = _rate(stream.get("avg_frame_rate"))
+        if fps:
+            parts.append(f"{fps:.3g} fps")
+        if stream.get("disposition", {}).get("attached_pic"):
+            parts.append("cover art")
+    elif kind == "audio":
+        parts.append(f"{stream.get('sample_rate', '?')} Hz")
+        parts.append(f"{stream.get('channels', '?')} ch")
+    title = stream.get("tags", {}).get("title")
+    if title:
+        parts.append(f"title {title!r}")
+    return ", ".join(str(part) for part in parts)
+
+
+def describe_container(probe: dict[str, Any]) -> dict[str, str]:
+    """Build the metadata table: container, streams and container tags."""
+    fmt = probe.get("format", {})
+    table = {"Container": fmt.get("format_long_name") or fmt.get("format_name", "unknown")}
+    if fmt.get("duration"):
+        table["Duration"] = f"{float(fmt['duration']):.2f} s"
+    if fmt.get("bit_rate"):
+        table["Bit rate"] = f"{int(fmt['bit_rate']) // 1000} kb/s"
+    for i, stream in enumerate(probe.get("streams", [])):
+        table[f"Stream {stream.get('index', i)}"] = describe_stream(stream)
+    for key, value in fmt.get("tags", {}).items():
+        table[f"Tag {key}"] = str(value)
+    return table
+
+
+def sample_times(duration: float, n_frames: int) -> list[float]:
+    """Evenly spaced seek times, first frame included, for at most ``MAX_FRAMES``."""
+    count = MAX_FRAMES if n_frames <= 0 else min(MAX_FRAMES, n_frames)
+    if duration <= 0:
+        return [0.0]
+    return [duration * i / count for i in range(count)]
+
+
+def _video_stream(probe: dict[str, Any]) -> dict[str, Any] | None:
+    """Return the first real video stream (not cover art), if any."""
+    for stream in probe.get("streams", []):
+        if stream.get("codec_type") == "video" and not stream.get("disposition", {}).get(
+            "attached_pic",
+        ):
+            return stream
+    return None
+
+
+class VideoAnalyzer(SubprocessAnalyzer):
+    """Analyzer for container metadata and sampled frames of a video."""
+
+    name = "video"
+    display_order = 17
+    accepts = frozenset({"video"})
+
+    def _probe(self) -> dict[str, Any] | None:
+        """Return ffprobe's format and stream description (None on failure)."""
+        cmd = [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_format",
+            "-show_streams",
+            "-of",
+            "json",
+            str(self.input_img),
+        ]
+        try:
+            proc = self.run_command(cmd)
+        except OSError:
+            return None
+        if proc.returncode != 0:
+            return None
+        try:
+            return json.loads(proc.stdout or "{}")
+        except json.JSONDecodeError:
+            return None
+
+    def _grab_frame(self, stream: dict[str, Any], seconds: float) -> np.ndarray | None:
+        """Decode the frame shown at ``seconds`` as a (height, width, 3) array."""
+        width, height = int(stream["width"]), int(stream["height"])
+        cmd = [
+            "ffmpeg",
+            "-v",
+            "error",
+            # Keep the coded frame size: rotation metadata would transpose it.
+            "-noautorotate",
+            "-ss",
+            f"{seconds:.3f}",
+            "-i",
+            str(self.input_img),
+            "-map",
+            f"0:{stream['index']}",
+            "-frames:v",
+            "1",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgb24",
+            "pipe:1",
+        ]
+        frame_bytes = width * height * len(RGB_CHANNELS)
+        raw = b"".join(self.stream_command(cmd, frame_bytes))
+        if len(raw) != frame_bytes:
+            return None
+        return np.frombuffer(raw, dtype=np.uint8).reshape(height, width, len(RGB_CHANNELS))
+
+    def _image_url(self, img_name: str) -> str:
+        return "/image/" + str(Path(self.output_dir.name) / img_name)
+
+    def _analyze_frame(self, frame: np.ndarray, index: int) -> tuple[str, str, list[str]]:
+        """Save a frame and its LSB image; return both URLs and the LSB findings."""
+        frame_name = f"video_frame_{index + 1}.png"
+        lsb_name = f"video_lsb_{index + 1}.png"
+        Image.fromarray(frame, "RGB").save(self.output_dir / frame_name)
+        Image.fromarray((frame & 1) * 255, "RGB").save(self.output_dir / lsb_name)
+        # Row-major pixel order, like zsteg's "xy": interleaved, then per channel.
+        flat = frame.reshape(-1)
+        findings = scan_stream(flat, "RGB")
+        for c, channel in enumerate(RGB_CHANNELS):
+            findings += scan_stream(flat[c :: len(RGB_CHANNELS)], channel)
+        return self._image_url(frame_name), self._image_url(lsb_name), findings
+
+    def get_results(self, password: str | None = None) -> dict[str, Any]:
+        """Report container metadata and analyze a bounded sample of frames."""
+        _ = password
+        probe = self._probe()
+        if probe is None:
+            return {"status": "error", "error": _ERROR_MSG}
+        table = describe_container(probe)
+        result: dict[str, Any] = {"status": "ok", "output": table}
+
+        stream = _video_stream(probe)
+        if stream is None or "width" not in stream or "height" not in stream:
+            return result
+        if int(stream["width"]) * int(stream["height"]) > MAX_FRAME_PIXELS:
+            result["note"] = _FRAME_CAP_NOTE.format(cap=MAX_FRAME_PIXELS)
+            return result
+
+        duration = float(probe.get("format", {}).get("duration") or stream.get("duration") or 0)
+        times = sample_times(duration, int(stream.get("nb_frames") or 0))
+        images: dict[str, list[str]] = {"Frame": [], "Superimposed LSB": []}
+        failed = 0
+        for i, seconds in enumerate(times):
+            try:
+                frame = self._grab_frame(stream, seconds)
+            except (RuntimeError, TimeoutError, OSError):
+                frame = None
+            if frame is None:
+                failed += 1
+                continue
+            frame_url, lsb_url, findings = self._analyze_frame(frame, i)
+            images["Frame"].append(frame_url)
+            images["Superimposed LSB"].append(lsb_url)
+            if findings:
+                table[f"Frame {i + 1} ({seconds:.2f} s) LSB"] = "; ".join(findings)
+        if images["Frame"]:
+            result["images"] = images
+        if failed:
+            result["note"] = _FRAME_ERROR_NOTE.format(failed=failed, total=len(times))
+        return result
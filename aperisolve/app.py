@@ -1,5 +1,6 @@
 """Aperi'Solve Flask application."""
 
+import gzip
 import hashlib
 import json
 import os
@@ -19,7 +20,10 @@ from rq import Queue
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from werkzeug.wrappers.response import Response as WerkzeugResponse
 
+from .analyzers.base_analyzer import FULL_OUTPUT_SUFFIX
 from .analyzers.registry import archive_tools, tool_order
+from .archives import ALL_TOOLS, archive_file, read_manifest, stream_bundle
+from .blobstore import link_bundle, manifest_key
 from .cheatsheet import cheatsheet_bp, cheatsheet_lastmod
 from .config import (
     CLEANUP_INTERVAL_SECONDS,
@@ -50,9 +54,19 @@ from .i18n import (
     select_locale,
 )
 from .limits import is_local_request, limiter
-from .models import Image, Submission, UploadLog, cleanup_old_entries, db
+from .models import (
+    Image,
+    Submission,
+    UploadLog,
+    cleanup_old_entries,
+    db,
+    get_or_create_image,
+)
 from .pages import pages_bp
 from .site_content import promo_html
+from .spectrogram_tiles import render_tile
+from .thumbnails import needs_downscaled, preview_path, thumb_path
+from .transform import TRANSFORM_DIRNAME, TransformError, parse_transform, run_transform
 from .utils.sentry import initialize_sentry
 from .utils.utils import get_client_ip
 from .wiki import page_lastmod, translated_langs, wiki_bp, wiki_pages, wiki_tool_names
@@ -116,6 +130,8 @@ def _delete_submission_entities(
     if len(image.submissions) <= 1:
         if original_image_path.exists():
             original_image_path.unlink()
+        shutil.rmtree(RESULT_FOLDER / str(image.hash) / TRANSFORM_DIRNAME, ignore_errors=True)
+        preview_path(RESULT_FOLDER / str(image.hash)).unlink(missing_ok=True)
         db.session.delete(image)
     db.session.commit()
 
@@ -228,6 +244,9 @@ def _register_page_routes(app: Flask) -> None:
                     "/infos/",
                     "/image/",
                     "/download/",
+                    "/output/",
+                    "/transform/",
+                    "/spectrogram/",
                     "/remove/",
                     "/remove_password/",
                 )
@@ -334,28 +353,6 @@ def schedule_cleanup(app: Flask) -> None:
             sentry_sdk.capture_exception(exc)
 
 
-def _get_or_create_image(img_hash: str, new_img_path: Path, size: int) -> Image:
-    """Fetch the Image row or insert it, tolerating a concurrent insert."""
-    sub_img = Image.query.filter_by(hash=img_hash).first()
-    if sub_img is None:
-        sub_img = Image(
-            file=str(new_img_path),
-            hash=img_hash,
-            size=size,
-            upload_count=0,
-            first_submission_date=datetime.now(UTC),
-            last_submission_date=datetime.now(UTC),
-        )
-        db.session.add(sub_img)
-        try:
-            db.session.commit()
-        except IntegrityError:
-            # A concurrent identical upload won the insert race; use its row.
-            db.session.rollback()
-            sub_img = Image.query.filter_by(hash=img_hash).one()
-    return sub_img
-
-
 def _upload_image(app: Flask) -> tuple[Response, int]:
     """Handle image upload and initiate analysis."""
     # The cron service is the primary cleanup driver; this enqueue is a safety
@@ -414,7 +411,7 @@ def _upload_image(app: Flask) -> tuple[Response, int]:
         with new_img_path.open("wb") as file_obj:
             file_obj.write(image_data)
 
-    sub_img = _get_or_create_image(img_hash, new_img_path, len(image_data))
+    sub_img = get_or_create_image(img_hash, new_img_path, len(image_data))
 
     sub_img_any = cast("Any", sub_img)
     sub_img_any.upload_count = int(sub_img_any.upload_count or 0) + 1
@@ -497,6 +494,113 @@ def _build_result_response(result_path: Path) -> Response | tuple[Response, int]
     return cast("Response", response.make_conditional(request))
 
 
+# Submission statuses whose worker may still write thumbnails and previews.
+IN_PROGRESS_STATUSES = frozenset({"pending", "running"})
+# Raster formats safe to serve inline in full when a size is requested.
+# Originals may be any uploaded file (HTML, SVG...), which must never render
+# on the site's origin: those are always served as attachments.
+INLINE_IMAGE_SUFFIXES = frozenset({".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"})
+
+
+def _resolve_image(
+    hash_val: str | None,
+    img_name: str,
+    size: str | None,
+) -> tuple[Path, Path | None, bool]:
+    """Locate an /image file and its requested downscaled copy (if any).
+
+    The flag tells whether a worker may still write that copy.
+    """
+    # The original upload (/image/<name>) may be any stored file type; the
+    # derived sub-path (/image/<hash>/<name>) only ever serves images.
+    if hash_val is not None:
+        submission = Submission.query.filter_by(hash=hash_val).first_or_404()
+        image = Image.query.get_or_404(submission.image_hash)
+        output_dir = RESULT_FOLDER / str(image.hash) / str(submission.hash)
+        output_file = output_dir / Path(img_name).name
+        if output_file.suffix.lower() not in IMAGE_EXTENSIONS:
+            abort(404, description="Image not found or unsupported format")
+        downscaled = thumb_path(output_dir, output_file.name) if size == "thumb" else None
+        in_progress = submission.status in IN_PROGRESS_STATUSES
+    else:
+        image = Image.query.filter_by(hash=img_name.split(".", maxsplit=1)[0]).first_or_404()
+        output_file = Path(image.file)
+        image_dir = RESULT_FOLDER / str(image.hash)
+        downscaled = preview_path(image_dir) if size == "preview" else None
+        in_progress = any(sub.status in IN_PROGRESS_STATUSES for sub in image.submissions)
+
+    if not output_file.exists():
+        abort(404, description="Image not found or unsupported format")
+    return output_file, downscaled, in_progress
+
+
+def _send_image(
+    output_file: Path,
+    downscaled: Path | None,
+    size: str | None,
+    *,
+    in_progress: bool = False,
+) -> Response:
+    """Serve a full-size image as a download, or its downscaled copy inline."""
+    if downscaled is not None and downscaled.exists():
+        response = send_file(downscaled)
+    elif size is not None and output_file.suffix.lower() in INLINE_IMAGE_SUFFIXES:
+        response = send_file(output_file)
+        if in_progress and needs_downscaled(output_file, size):
+            # Not generated yet: the full file, but only briefly cached so the
+            # downscaled copy is picked up once the worker wrote it.
+            response.headers["Cache-Control"] = "public, max-age=60"
+            return response
+    else:
+        response = send_file(output_file, as_attachment=True)
+    # URLs are content-addressed (md5 hashes), so responses never change:
+    # the ~40 derived bit-plane images per result page cache forever.
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+def _archive_response(output_dir: Path, tool: str) -> Response:
+    """Serve the archive of ``tool``'s extracted files, assembling it if needed.
+
+    ZIPs are assembled on the first download and streamed as they are
+    written; later downloads of the same files serve the stored archive (see
+    aperisolve.archives).
+    """
+    output_file = archive_file(output_dir, tool)
+    if output_file is None:
+        tools = sorted(archive_tools()) if tool == ALL_TOOLS else [tool]
+        manifest = read_manifest(output_dir, tools, prefix=tool == ALL_TOOLS)
+        if not manifest:
+            abort(404, description="Tool output not found.")
+        key = manifest_key(manifest)
+        output_file = output_dir / f"{tool}.zip"
+        if not link_bundle(key, output_file):
+            return Response(
+                stream_bundle(key, manifest, output_file),
+                mimetype="application/zip",
+                headers={"Content-Disposition": f'attachment; filename="{tool}.zip"'},
+            )
+    return send_file(output_file, as_attachment=True)
+
+
+def _full_output_response(output_file: Path) -> Response:
+    """Serve an output offloaded from results.json, gzipped as stored when accepted.
+
+    Analyzers move outputs over ``OUTPUT_INLINE_BYTES`` into a gzipped file
+    (see ``SubprocessAnalyzer.offload_output``); clients that do not accept
+    gzip get it decompressed.
+    """
+    if not output_file.is_file():
+        abort(404, description="Tool output not found.")
+    if "gzip" in request.accept_encodings:
+        response = send_file(output_file, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(gzip.decompress(output_file.read_bytes()), mimetype="application/json")
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
 def _register_data_routes(app: Flask) -> None:
     """Register metadata, results, and download routes."""
 
@@ -541,17 +645,27 @@ def _register_data_routes(app: Flask) -> None:
     @app.route("/download/<hash_val>/<tool>")
     @limiter.limit("30 per minute; 300 per hour", exempt_when=_is_local_request)
     def download_output(hash_val: str, tool: str) -> Response:
-        """Download output of a specific analyzer for a submission hash."""
+        """Download the extracted files of an analyzer (or of all, ``all``) as an archive."""
+        if tool != ALL_TOOLS and tool not in archive_tools():
+            abort(404, description="Tool output not found.")
         submission = Submission.query.filter_by(hash=hash_val).first_or_404()
         image = Image.query.get_or_404(submission.image_hash)
-        output_dir = RESULT_FOLDER / str(image.hash) / str(submission.hash)
-        output_file = output_dir / f"{tool}.7z"
+        response = _archive_response(RESULT_FOLDER / str(image.hash) / str(submission.hash), tool)
+        response.headers["Cache-Control"] = "public, max-age=86400"
+        return response
 
-        if tool not in archive_tools() or not output_file.exists():
+    @app.route("/output/<hash_val>/<tool>")
+    @limiter.limit("120 per minute", exempt_when=_is_local_request)
+    def get_full_output(hash_val: str, tool: str) -> Response:
+        """Get the full output of an analyzer whose results only hold a preview."""
+        if tool not in app.config["TOOL_ORDER"]:
             abort(404, description="Tool output not found.")
-
-        response = send_file(output_file, as_attachment=True)
-        response.headers["Cache-Control"] = "public, max-age=86400"
+        submission = Submission.query.filter_by(hash=hash_val).first_or_404()
+        image = Image.query.get_or_404(submission.image_hash)
+        output_dir = RESULT_FOLDER / str(image.hash) / str(submission.hash)
+        response = _full_output_response(output_dir / f"{tool}{FULL_OUTPUT_SUFFIX}")
+        # Rewritten only when the submission is analyzed again.
+        response.headers["Cache-Control"] = "no-cache"
         return response
 
     @app.route("/image/<img_name>")
@@ -563,32 +677,70 @@ def _register_data_routes(app: Flask) -> None:
         """Download an image for a submission hash or by direct image filename.
 
         Usually this serves derived images generated by the decomposer analyzer.
+        ``?size=thumb`` (derived images) and ``?size=preview`` (originals) serve
+        the downscaled copies from aperisolve.thumbnails inline, falling back to
+        the full file while none exists.
         """
         if img_name is None:
             return abort(404, description="Image not found or unsupported format")
+        size = request.args.get("size")
+        if size not in {None, "thumb", "preview"}:
+            return abort(400, description="size must be 'thumb' or 'preview'")
 
-        # The original upload (/image/<name>) may be any stored file type; the
-        # derived sub-path (/image/<hash>/<name>) only ever serves images.
-        # Capture this before the else-branch reassigns hash_val below.
-        serving_original = hash_val is None
-        if hash_val is not None:
-            submission = Submission.query.filter_by(hash=hash_val).first_or_404()
-            image = Image.query.get_or_404(submission.image_hash)
-            output_dir = RESULT_FOLDER / str(image.hash) / str(submission.hash)
-            output_file = output_dir / Path(img_name).name
-        else:
-            hash_val = img_name.split(".")[0]
-            image = Image.query.filter_by(hash=hash_val).first_or_404()
-            output_file = Path(image.file)
-
-        if not output_file.exists():
-            return abort(404, description="Image not found or unsupported format")
-        if not serving_original and output_file.suffix.lower() not in IMAGE_EXTENSIONS:
-            return abort(404, description="Image not found or unsupported format")
+        output_file, downscaled, in_progress = _resolve_image(hash_val, img_name, size)
+        return _send_image(output_file, downscaled, size, in_progress=in_progress)
 
-        # URLs are content-addressed (md5 hashes), so responses never change:
-        # the ~40 derived bit-plane images per result page cache forever.
-        response = send_file(output_file, as_attachment=True)
+
+def _register_transform_routes(app: Flask) -> None:
+    """Register the on-demand Stegsolve-style transform route."""
+
+    @app.route("/transform/<hash_val>")
+    # Uncached outputs cost a decode plus a vectorized pass; the bounded pool
+    # in aperisolve.transform caps concurrency, this caps per-client volume.
+    @limiter.limit("120 per minute", exempt_when=_is_local_request)
+    def transform_image(hash_val: str) -> Response | tuple[Response, int]:
+        """Serve a Stegsolve-style transform (XOR, plane masks) of a submission's image."""
+        submission = Submission.query.filter_by(hash=hash_val).first_or_404()
+        image = Image.query.get_or_404(submission.image_hash)
+        try:
+            op = parse_transform(request.args)
+        except TransformError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+        source = Path(image.file)
+        if not source.exists():
+            abort(404, description="Image not found.")
+        cache_dir = RESULT_FOLDER / str(image.hash) / TRANSFORM_DIRNAME
+        try:
+            output_file = run_transform(source, cache_dir, op)
+        except TransformError as exc:
+            return jsonify({"error": str(exc)}), 422
+        except TimeoutError:
+            return jsonify({"error": _("Transform timed out, try again later")}), 503
+
+        # Keyed by image content and canonical op, so the bytes never change.
+        response = send_file(output_file, mimetype="image/png")
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+def _register_spectrogram_routes(app: Flask) -> None:
+    """Register the deep-zoom spectrogram tile route."""
+
+    @app.route("/spectrogram/<hash_val>/<int:channel>/<int:zoom>/<int:x>/<int:y>.png")
+    # A zoomable view fetches a handful of tiles per pan or zoom step; each
+    # is rendered once from the memory-mapped store, then cached.
+    @limiter.limit("600 per minute", exempt_when=_is_local_request)
+    def spectrogram_tile(hash_val: str, channel: int, zoom: int, x: int, y: int) -> Response:
+        """Serve one tile of a submission's zoomable spectrogram."""
+        submission = Submission.query.filter_by(hash=hash_val).first_or_404()
+        image = Image.query.get_or_404(submission.image_hash)
+        result_dir = RESULT_FOLDER / str(image.hash) / str(submission.hash)
+        tile = render_tile(result_dir, channel, zoom, x, y)
+        if tile is None:
+            abort(404, description="Tile not found.")
+
+        response = send_file(tile, mimetype="image/png")
         response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
         return response
 
@@ -706,6 +858,8 @@ def create_app() -> Flask:
     _register_page_routes(app)
     _register_submission_routes(app)
     _register_data_routes(app)
+    _register_transform_routes(app)
+    _register_spectrogram_routes(app)
     _register_management_routes(app)
     # Translatable pages are served at the root (English) and under a
     # language prefix (/fr/, /es/, ...) for indexable per-language URLs.
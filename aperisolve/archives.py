@@ -0,0 +1,179 @@
+"""Archives of extracted files, assembled when they are downloaded.
+
+Most archives are never downloaded, so analyzers no longer build them: the
+extracted files stay in the result folder, in the blob store, listed by
+``<tool>.manifest.json`` (see ``aperisolve.blobstore``). ``/download``
+streams a ZIP of them straight from the blob store, as it is written, with
+no temporary copy to build first. The ZIP is also stored as the bundle of its
+manifest, and linked into the result folder once it is complete, so only the
+first download of a set of files pays for it. ``/download/<hash>/all``
+bundles every tool's files into one ZIP, under ``<tool>/``.
+
+Extracted payloads are usually small, or already compressed (carved PNGs,
+JPEGs, ZIPs), so running 7z's LZMA over them costs a subprocess and seconds
+of CPU for almost no gain. Each entry is either stored or deflated: a fast
+deflate of the file's first 64 KiB tells whether compression would pay off.
+Entries carry a fixed timestamp, so the same files always make the same
+archive. An archive holds at most ``ARCHIVE_MAX_BYTES`` of content; the files
+past that are left out and listed in ``left-out.txt`` rather than filling the
+disk with one adversarial extraction.
+
+``ARCHIVE_FORMAT=7z`` restores the 7z archives, built by the analyzers (see
+``SubprocessAnalyzer.generate_archive``).
+"""
+
+import io
+import json
+import os
+import threading
+import zipfile
+import zlib
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from .blobstore import MANIFEST_SUFFIX, bundle_path, link_bundle, object_path
+from .config import ARCHIVE_FORMAT, ARCHIVE_MAX_BYTES
+
+ARCHIVE_SUFFIXES = {"zip": ".zip", "7z": ".7z"}
+# ``/download/<hash>/all``: every tool's files in one archive.
+ALL_TOOLS = "all"
+LEFT_OUT_NAME = "left-out.txt"
+
+_PROBE_SIZE = 1 << 16
+# Files too small for deflate to win anything after its own overhead.
+_MIN_DEFLATE_SIZE = 128
+# Deflate only when it shrinks the probe by at least 10 %.
+_DEFLATE_RATIO = 0.9
+_COPY_CHUNK = 1 << 20
+_FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def archive_suffix() -> str:
+    """Return the file suffix of the configured archive format."""
+    return ARCHIVE_SUFFIXES.get(ARCHIVE_FORMAT, ".zip")
+
+
+def archive_file(output_dir: Path, tool: str) -> Path | None:
+    """Return the archive of ``tool`` in a result folder, in whichever format it was made."""
+    for suffix in ARCHIVE_SUFFIXES.values():
+        path = output_dir / f"{tool}{suffix}"
+        if path.is_file():
+            return path
+    return None
+
+
+def read_manifest(
+    output_dir: Path,
+    tools: Iterable[str],
+    *,
+    prefix: bool = False,
+) -> dict[str, str]:
+    """Merge the manifests of ``tools`` in a result folder.
+
+    With ``prefix``, each name is put under ``<tool>/``.
+    """
+    merged: dict[str, str] = {}
+    for tool in tools:
+        try:
+            text = (output_dir / f"{tool}{MANIFEST_SUFFIX}").read_text(encoding="utf-8")
+            manifest: dict[str, str] = json.loads(text)
+        except (OSError, ValueError):
+            continue
+        for name, digest in manifest.items():
+            merged[f"{tool}/{name}" if prefix else name] = digest
+    return merged
+
+
+def compress_type(path: Path) -> int:
+    """Pick ``ZIP_DEFLATED`` for compressible files, ``ZIP_STORED`` for the rest."""
+    with path.open("rb") as handle:
+        probe = handle.read(_PROBE_SIZE)
+    if len(probe) < _MIN_DEFLATE_SIZE:
+        return zipfile.ZIP_STORED
+    if len(zlib.compress(probe, 1)) > _DEFLATE_RATIO * len(probe):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable file the ZIP is written to, drained chunk by chunk."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        """Accept writes."""
+        return True
+
+    def write(self, data: bytes | bytearray | memoryview) -> int:  # type: ignore[override]
+        """Keep ``data`` until the next drain."""
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        """Return and forget what was written since the last drain."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(
+    manifest: dict[str, str],
+    max_bytes: int = ARCHIVE_MAX_BYTES,
+) -> Iterator[bytes]:
+    """Yield a ZIP of the blobs in ``manifest`` chunk by chunk, as it is written.
+
+    Memory use does not grow with the files' size. Blobs missing from the
+    store (see ``blobstore.store_file``) are skipped.
+    """
+    sink = _Sink()
+    left_out: list[str] = []
+    total = 0
+    with zipfile.ZipFile(sink, "w") as zip_file:
+        for name, digest in manifest.items():
+            path = object_path(digest)
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            if total + size > max_bytes:
+                left_out.append(name)
+                continue
+            total += size
+            info = zipfile.ZipInfo(name, date_time=_FIXED_DATE_TIME)
+            info.compress_type = compress_type(path)
+            info.external_attr = 0o644 << 16
+            with (
+                path.open("rb") as src,
+                zip_file.open(info, "w", force_zip64=size >= zipfile.ZIP64_LIMIT) as dst,
+            ):
+                while chunk := src.read(_COPY_CHUNK):
+                    dst.write(chunk)
+                    if data := sink.drain():
+                        yield data
+        if left_out:
+            info = zipfile.ZipInfo(LEFT_OUT_NAME, date_time=_FIXED_DATE_TIME)
+            zip_file.writestr(info, f"Over the {max_bytes} bytes limit:\n" + "\n".join(left_out))
+    yield sink.drain()
+
+
+def stream_bundle(key: str, manifest: dict[str, str], archive: Path) -> Iterator[bytes]:
+    """Stream the ZIP of ``manifest``, storing it as the bundle of ``key`` on the way.
+
+    Once the whole ZIP went out, the bundle is linked to ``archive``, which
+    later downloads serve as a plain file. A download cut short stores
+    nothing.
+    """
+    stored = bundle_path(key, ".zip")
+    stored.parent.mkdir(parents=True, exist_ok=True)
+    tmp = stored.with_name(f".{stored.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp.open("wb") as cache:
+            for chunk in stream_zip(manifest):
+                cache.write(chunk)
+                yield chunk
+        tmp.replace(stored)
+        link_bundle(key, archive)
+    finally:
+        tmp.unlink(missing_ok=True)
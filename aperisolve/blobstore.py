@@ -0,0 +1,146 @@
+"""Content-addressed store for extracted files, derived images and archives.
+
+Identical payloads recur: the ZIP binwalk and foremost both carve, the file
+every re-submission extracts again, the all-black bit plane of countless
+images. The store keeps one copy of each under ``BLOB_FOLDER``, named by its
+SHA-256 (``objects/ab/ab12...``). Result folders reference it through hard
+links, so every path the routes serve stays where it was while the bytes
+exist once on disk. Blobs are shared between users, hence SHA-256 rather
+than the MD5 naming uploads: a constructed MD5 collision would let one
+upload swap another's payload.
+
+The hard links are the reference counts. Deleting a result folder
+(retention, removal) drops its references, and :func:`sweep` deletes what
+only the store still links to. No database row tracks blobs, so nothing can
+drift out of sync with the files.
+
+Archives of extracted files are stored the same way, keyed by the digest of
+their manifest (the relative names and blob digests of their content,
+``bundles/ab/ab12....zip``): a set of files archived once is never
+compressed again.
+
+Stored files are shared, so they must never be modified in place: writers
+write a new file and rename it over the old one, which only drops the
+reference.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .config import BLOB_FOLDER
+
+OBJECTS_DIRNAME = "objects"
+BUNDLES_DIRNAME = "bundles"
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    with path.open("rb") as handle:
+        return hashlib.file_digest(handle, "sha256").hexdigest()
+
+
+def manifest_key(manifest: dict[str, str]) -> str:
+    """Return the digest identifying a set of named blobs, whatever its order."""
+    canonical = json.dumps(manifest, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def object_path(digest: str) -> Path:
+    """Where the blob with this content digest is stored."""
+    return BLOB_FOLDER / OBJECTS_DIRNAME / digest[:2] / digest
+
+
+def bundle_path(key: str, suffix: str) -> Path:
+    """Where the archive of the manifest with this key is stored."""
+    return BLOB_FOLDER / BUNDLES_DIRNAME / key[:2] / f"{key}{suffix}"
+
+
+def _link_over(source: Path, dest: Path) -> None:
+    """Atomically replace ``dest`` with a hard link to ``source``."""
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.link")
+    tmp.unlink(missing_ok=True)
+    os.link(source, tmp)
+    tmp.replace(dest)
+
+
+def _share(path: Path, stored: Path) -> None:
+    """Make ``path`` a reference to ``stored``, storing ``path`` itself if it is new."""
+    stored.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(path, stored)
+    except FileExistsError:
+        pass
+    else:
+        return
+    try:
+        _link_over(stored, path)
+    except FileNotFoundError:
+        # Swept since the check above: this copy becomes the stored one.
+        os.link(path, stored)
+
+
+def store_file(path: Path) -> str:
+    """Move the content of ``path`` into the store; return its digest.
+
+    ``path`` stays readable, as a reference to the stored copy. Where links
+    are impossible (another file system, the link count limit) it simply
+    keeps its private copy.
+    """
+    digest = file_digest(path)
+    with contextlib.suppress(OSError):
+        _share(path, object_path(digest))
+    return digest
+
+
+def store_tree(directory: Path) -> dict[str, str]:
+    """Store every regular file under ``directory``; return the manifest.
+
+    The manifest maps relative POSIX paths to digests. Symbolic links (which
+    extraction tools may create) are neither followed nor stored.
+    """
+    manifest: dict[str, str] = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = Path(root) / name
+            if path.is_symlink() or not path.is_file():
+                continue
+            manifest[path.relative_to(directory).as_posix()] = store_file(path)
+    return dict(sorted(manifest.items()))
+
+
+def write_manifest(path: Path, manifest: dict[str, str]) -> None:
+    """Record which blobs a tool's output references."""
+    path.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+
+
+def link_bundle(key: str, archive: Path) -> bool:
+    """Link the stored archive of ``key`` to ``archive``; False when none is stored."""
+    try:
+        _link_over(bundle_path(key, archive.suffix), archive)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def store_bundle(key: str, archive: Path) -> None:
+    """Store a freshly built ``archive`` as the one of manifest ``key``."""
+    with contextlib.suppress(OSError):
+        _share(archive, bundle_path(key, archive.suffix))
+
+
+def sweep() -> int:
+    """Delete the stored files no result folder links to any more; return how many."""
+    removed = 0
+    for dirname in (OBJECTS_DIRNAME, BUNDLES_DIRNAME):
+        for path in (BLOB_FOLDER / dirname).glob("*/*"):
+            # A reference linked after the check survives the unlink: it is
+            # the same inode, only no longer deduplicated against.
+            with contextlib.suppress(FileNotFoundError):
+                if path.stat().st_nlink <= 1:
+                    path.unlink()
+                    removed += 1
+    return removed
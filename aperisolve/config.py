@@ -27,7 +27,7 @@ REMOVAL_MIN_AGE_SECONDS = _int_env("REMOVAL_MIN_AGE_SECONDS", 300)  # 5 minutes
 MAX_PENDING_TIME = _int_env("MAX_PENDING_TIME", 600)  # 10 minutes by default
 
 # Per-subprocess wall clock. Some analyzers run two tool subprocesses in
-# sequence (steghide info+extract, openstego's two algorithms) plus a 7z
+# sequence (steghide info+extract, openstego's two algorithms) plus an
 # archive step, so this must stay well below MAX_PENDING_TIME for the whole
 # job to fit inside JOB_TIMEOUT.
 SUBPROCESS_TIMEOUT = _int_env("SUBPROCESS_TIMEOUT", max(60, MAX_PENDING_TIME // 2))
@@ -45,6 +45,37 @@ MAX_STORE_TIME = _int_env("MAX_STORE_TIME", 259200)  # 3 days by default
 MAX_CONTENT_LENGTH = _int_env("MAX_CONTENT_LENGTH", 1048576)  # 1 MB by default
 CLEAR_AT_RESTART = _int_env("CLEAR_AT_RESTART", 0)
 
+# On-demand Stegsolve-style transforms (/transform/<hash>): threads per web
+# process computing uncached outputs, and how long a request waits for one.
+TRANSFORM_WORKERS = _int_env("TRANSFORM_WORKERS", 2)
+TRANSFORM_TIMEOUT = _int_env("TRANSFORM_TIMEOUT", 10)
+
+# Let browsers compute bit planes and colour remaps from the original upload
+# (lossless RGB/grayscale PNG and BMP only) instead of the workers writing
+# ~48 PNGs per image. Off by default; see analyzers/pil_utils.py.
+CLIENT_RENDERING = bool(_int_env("CLIENT_RENDERING", 0))
+
+# Images and audio files the tools extract are analyzed in turn, as
+# submissions of their own (see aperisolve/nested.py): how many levels deep
+# (0 disables), how many files per analysis, and the CPU seconds a whole tree
+# of nested analyses may spend before it stops spawning more.
+NESTED_MAX_DEPTH = _int_env("NESTED_MAX_DEPTH", 1)
+NESTED_MAX_FILES = _int_env("NESTED_MAX_FILES", 8)
+NESTED_CPU_SECONDS = _int_env("NESTED_CPU_SECONDS", 120)
+
+# Downloadable archives of extracted files: "zip" archives are streamed by
+# /download when first requested (see aperisolve/archives.py), "7z" ones are
+# built by the analyzers with the 7z binary. Files past ARCHIVE_MAX_BYTES of
+# content are left out of ZIP archives.
+ARCHIVE_FORMAT = getenv("ARCHIVE_FORMAT", "zip")
+ARCHIVE_MAX_BYTES = _int_env("ARCHIVE_MAX_BYTES", 64 * 1024 * 1024)
+
+# Outputs larger than this (JSON-encoded) move out of results.json, which every
+# /result poll ships, into a gzipped file per tool served by /output; the
+# results keep their first OUTPUT_PREVIEW_LINES lines (or table rows).
+OUTPUT_INLINE_BYTES = _int_env("OUTPUT_INLINE_BYTES", 64 * 1024)
+OUTPUT_PREVIEW_LINES = _int_env("OUTPUT_PREVIEW_LINES", 100)
+
 # Recognised image file extensions. No longer the upload gate (any file type is
 # accepted); this now backs the derived-image serving gate (/image/<hash>/<name>)
 # and the extension fallback in aperisolve.filetype.
@@ -60,7 +91,13 @@ SITE_BASE_URL = getenv("SITE_BASE_URL", "").rstrip("/")
 
 
 RESULT_FOLDER = Path(__file__).parent.resolve() / "results"
+# Content-addressed blobs shared by result folders through hard links, so it
+# must live on the same file system; see aperisolve/blobstore.py.
+BLOB_FOLDER = RESULT_FOLDER / "blobs"
 REMOVED_IMAGES_FOLDER = Path(__file__).parent.resolve() / "removed_images"
+# Sorted CRC index of common IHDR chunks, compiled by the image build
+# (python -m aperisolve.utils.ihdr_index); see aperisolve/utils/ihdr_index.py.
+IHDR_INDEX_FILE = Path(__file__).parent.resolve() / "ihdr_index.npy"
 
 DB_URI = getenv("DB_URI", "")
 FLASK_DEBUG = bool(getenv("FLASK_DEBUG", "0") == "1")
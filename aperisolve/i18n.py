@@ -82,13 +82,24 @@ def js_catalog() -> dict[str, str]:
         "Network error occurred": _("Network error occurred"),
         "Error:": _("Error:"),
         "Download file": _("Download file"),
+        "Download all extracted files": _("Download all extracted files"),
+        "Extracted files analyzed": _("Extracted files analyzed"),
+        "Show full output": _("Show full output"),
         "Superimposed": _("Superimposed"),
         "Red": _("Red"),
         "Green": _("Green"),
         "Blue": _("Blue"),
         "Alpha": _("Alpha"),
+        "Index": _("Index"),
         "Spectrogram": _("Spectrogram"),
         "Waveform": _("Waveform"),
+        "Zoomable spectrogram": _("Zoomable spectrogram"),
+        "Channel": _("Channel"),
+        "Zoom in": _("Zoom in"),
+        "Zoom out": _("Zoom out"),
+        "Reset view": _("Reset view"),
+        "Left": _("Left"),
+        "Right": _("Right"),
         "❌ Error during the analysis.": _("❌ Error during the analysis."),
         "Please select a file.": _("Please select a file."),
         "❌ Invalid server response: missing submission_hash.": _(
@@ -109,4 +120,14 @@ def js_catalog() -> dict[str, str]:
             "❌ The analysis is taking too long. Please reload the page to check again.",
         ),
         "Analyzed file": _("Analyzed file"),
+        "Transform": _("Transform"),
+        "Operation": _("Operation"),
+        "Single plane": _("Single plane"),
+        "Plane mask": _("Plane mask"),
+        "First plane": _("First plane"),
+        "Second plane": _("Second plane"),
+        "Hex mask per channel": _("Hex mask per channel"),
+        "Apply": _("Apply"),
+        "Transform failed": _("Transform failed"),
+        "Render on server": _("Render on server"),
     }
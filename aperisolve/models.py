@@ -1,30 +1,26 @@
 """Database models for the Aperi'Solve application."""
 
-import itertools
+import contextlib
 import shutil
-import struct
 import time
-import zlib
 from datetime import UTC, datetime, timedelta
-from typing import cast
+from pathlib import Path
 
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import (
-    BigInteger,
     Boolean,
     Column,
     DateTime,
     Float,
     Integer,
-    SmallInteger,
     String,
     and_,
     or_,
 )
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
+from aperisolve.blobstore import sweep
 from aperisolve.config import MAX_STORE_TIME, RESULT_FOLDER, STALE_SUBMISSION_CUTOFF
-from aperisolve.utils.utils import get_resolutions, get_valid_depth_color_pairs
 
 db: SQLAlchemy = SQLAlchemy()
 
@@ -66,51 +62,26 @@ class Submission(db.Model):
     image_hash = Column(String, db.ForeignKey("image.hash"), nullable=False)
 
 
-class IHDR(db.Model):
-    """IHDR CRC lookup table with direct parameter storage."""
-
-    iid = Column(Integer, primary_key=True, autoincrement=True)
-    crc = Column(BigInteger, nullable=False, index=True)
-    width = Column(Integer, nullable=False)
-    height = Column(Integer, nullable=False)
-    bit_depth = Column(SmallInteger, nullable=False)
-    color_type = Column(SmallInteger, nullable=False)
-    interlace = Column(SmallInteger, nullable=False)
-
-    def to_ihdr_bytes(self) -> bytes:
-        """Convert database record to IHDR chunk data (13 bytes)."""
-        bit_depth = cast("int", self.bit_depth)
-        color_type = cast("int", self.color_type)
-        interlace = cast("int", self.interlace)
-        return (
-            struct.pack(">I", self.width)
-            + struct.pack(">I", self.height)
-            + bytes(
-                [
-                    bit_depth,
-                    color_type,
-                    0,
-                    0,
-                    interlace,
-                ],
-            )
+def get_or_create_image(img_hash: str, new_img_path: Path, size: int) -> Image:
+    """Fetch the Image row or insert it, tolerating a concurrent insert."""
+    sub_img = Image.query.filter_by(hash=img_hash).first()
+    if sub_img is None:
+        sub_img = Image(
+            file=str(new_img_path),
+            hash=img_hash,
+            size=size,
+            upload_count=0,
+            first_submission_date=datetime.now(UTC),
+            last_submission_date=datetime.now(UTC),
         )
-
-    @staticmethod
-    def compute_crc(
-        width: int,
-        height: int,
-        bit_depth: int,
-        color_type: int,
-        interlace: int,
-    ) -> int:
-        """Compute CRC32 for IHDR chunk."""
-        ihdr_data = (
-            struct.pack(">I", width)
-            + struct.pack(">I", height)
-            + bytes([bit_depth, color_type, 0, 0, interlace])
-        )
-        return zlib.crc32(b"IHDR" + ihdr_data) & 0xFFFFFFFF
+        db.session.add(sub_img)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent identical upload won the insert race; use its row.
+            db.session.rollback()
+            sub_img = Image.query.filter_by(hash=img_hash).one()
+    return sub_img
 
 
 class UploadLog(db.Model):
@@ -125,44 +96,6 @@ class UploadLog(db.Model):
     filename = Column(String(128), nullable=True)
 
 
-def fill_ihdr_db() -> None:
-    """Populate IHDR table with common PNG configurations."""
-    try:
-        count_query = db.session.query(IHDR.iid).limit(1)
-        if db.session.execute(count_query).first() is not None:
-            return
-
-        resolutions = get_resolutions()
-        bit_color_pairs = list(get_valid_depth_color_pairs())
-        interlace_methods = [0, 1]
-        combinations = itertools.product(resolutions, bit_color_pairs, interlace_methods)
-
-        count = 0
-        previous_autoflush = db.session.autoflush
-        db.session.autoflush = False
-        try:
-            for (width, height), (bit_depth, color_type), interlace in combinations:
-                crc = IHDR.compute_crc(width, height, bit_depth, color_type, interlace)
-                db.session.add(
-                    IHDR(
-                        crc=crc,
-                        width=width,
-                        height=height,
-                        bit_depth=bit_depth,
-                        color_type=color_type,
-                        interlace=interlace,
-                    ),
-                )
-                count += 1
-                if count % 5000 == 0:
-                    db.session.commit()
-            db.session.commit()  # flush the trailing partial batch
-        finally:
-            db.session.autoflush = previous_autoflush
-    except SQLAlchemyError:
-        db.session.rollback()
-
-
 def _cleanup_submissions(now: float) -> None:
     """Delete stale pending submissions and completed ones whose results vanished."""
     stale = Submission.query.filter(
@@ -240,3 +173,6 @@ def cleanup_old_entries() -> None:
         db.session.rollback()
     _cleanup_images()
     _cleanup_upload_logs()
+    # Deleted result folders dropped their blob references; reclaim the blobs.
+    with contextlib.suppress(OSError):
+        sweep()
@@ -0,0 +1,212 @@
+"""Nested analysis of the images and audio files the tools extract.
+
+binwalk, foremost, carving and steghide regularly pull a PNG, JPEG or WAV
+out of an upload, and that file is where the next layer of the challenge
+hides. Rather than leaving users to download the archive and upload each
+file by hand, the worker submits every extracted image and audio file as a
+submission of its own, queued like an upload, and links it from the tool
+that extracted it (``"nested"`` in ``results.json``).
+
+Nested submissions are ordinary submissions: same hashing as an upload of the
+file under its extracted name (so re-uploading it by hand lands on the same
+result page), same retention. A file already submitted, by a user or by
+another nested analysis, is linked without being analyzed again.
+
+Extracted files larger than ``MAX_CONTENT_LENGTH`` are not submitted: the
+analyzers' costs are bounded by the upload cap, which nested submissions
+must not get around.
+
+Three budgets bound the tree an upload can spawn:
+
+- ``NESTED_MAX_DEPTH`` levels below the upload;
+- ``NESTED_MAX_FILES`` nested submissions per analysis;
+- ``NESTED_CPU_SECONDS`` for the whole tree: each analysis passes what is
+  left of it, after its own CPU time, to its nested submissions in equal
+  shares, and nothing is spawned once it is spent.
+"""
+
+import contextlib
+import hashlib
+import json
+import mimetypes
+import resource
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import sentry_sdk
+from redis.exceptions import RedisError
+from rq import Queue
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from .blobstore import MANIFEST_SUFFIX, object_path
+from .config import JOB_TIMEOUT, MAX_CONTENT_LENGTH, NESTED_MAX_FILES, RESULT_FOLDER
+from .filetype import FileType, detect_file_type
+from .models import Submission, db, get_or_create_image
+
+# File kinds worth a nested analysis; the others are offered as downloads only.
+NESTED_KINDS = frozenset({"image", "audio"})
+# Submission.filename is a String(128).
+_MAX_FILENAME = 128
+
+
+class Artifact(NamedTuple):
+    """One extracted file worth a nested analysis."""
+
+    tool: str
+    name: str
+    blob: Path
+    file_type: FileType
+
+
+def cpu_seconds() -> float:
+    """Return the CPU time of this process and of its finished tool subprocesses."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    tools = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + tools.ru_utime + tools.ru_stime
+
+
+def find_artifacts(result_path: Path) -> list[Artifact]:
+    """List the extracted images and audio files of a result folder, once each.
+
+    Reads the manifests ``generate_archive`` writes, so the files are taken
+    from the blob store by content: a file two tools extracted is listed
+    once, under the first tool. Files the store could not take (see
+    ``blobstore.store_file``), and files over ``MAX_CONTENT_LENGTH``, are
+    skipped.
+    """
+    seen: set[str] = set()
+    artifacts: list[Artifact] = []
+    for manifest_path in sorted(result_path.glob(f"*{MANIFEST_SUFFIX}")):
+        tool = manifest_path.name.removesuffix(MANIFEST_SUFFIX)
+        try:
+            manifest: dict[str, str] = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        for name, digest in manifest.items():
+            blob = object_path(digest)
+            if digest in seen:
+                continue
+            seen.add(digest)
+            try:
+                if blob.stat().st_size > MAX_CONTENT_LENGTH:
+                    continue
+            except OSError:
+                continue
+            file_type = detect_file_type(blob)
+            if file_type.kind in NESTED_KINDS:
+                artifacts.append(Artifact(tool, name, blob, file_type))
+    return artifacts
+
+
+def _filename(artifact: Artifact) -> str:
+    """Name the nested submission after the extracted file, with a usable extension.
+
+    Uploads require an extension; carvers name files by offset only
+    (``00000123``) or after the tool (``steghide.out``).
+    """
+    name = Path(artifact.name).name
+    suffix = Path(name).suffix.lower()
+    known = mimetypes.guess_all_extensions(artifact.file_type.mime)
+    if not suffix or (known and suffix not in known):
+        name += mimetypes.guess_extension(artifact.file_type.mime) or ".bin"
+    return name[-_MAX_FILENAME:]
+
+
+def submit_artifact(
+    queue: Queue,
+    artifact: Artifact,
+    depth: int,
+    cpu_budget: float,
+) -> str:
+    """Submit an extracted file for analysis; return its submission hash.
+
+    An existing submission of the same file is returned as it is.
+    """
+    data = artifact.blob.read_bytes()
+    filename = _filename(artifact)
+    img_hash = hashlib.md5(data, usedforsecurity=False).hexdigest()
+    submission_hash = hashlib.md5(data + filename.encode(), usedforsecurity=False).hexdigest()
+    if Submission.query.filter_by(hash=submission_hash).first() is not None:
+        return submission_hash
+
+    img_path = RESULT_FOLDER / img_hash / f"{img_hash}{Path(filename).suffix.lower()}"
+    if not img_path.exists():
+        img_path.parent.mkdir(parents=True, exist_ok=True)
+        img_path.write_bytes(data)
+    image = get_or_create_image(img_hash, img_path, len(data))
+
+    (RESULT_FOLDER / img_hash / submission_hash).mkdir(parents=True, exist_ok=True)
+    submission = Submission(
+        hash=submission_hash,
+        filename=filename,
+        deep_analysis=False,
+        status="pending",
+        image_hash=image.hash,
+    )
+    db.session.add(submission)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another analysis extracted the same file at the same time.
+        db.session.rollback()
+        return submission_hash
+
+    try:
+        queue.enqueue(
+            "aperisolve.workers.analyze_image",
+            submission_hash,
+            depth,
+            cpu_budget,
+            job_timeout=JOB_TIMEOUT,
+        )
+    except RedisError:
+        submission.status = "error"
+        db.session.commit()
+        raise
+    return submission_hash
+
+
+def _link_nested(result_path: Path, links: dict[str, list[dict[str, str]]]) -> None:
+    """Record the nested submissions under the tools that extracted their files."""
+    json_file = result_path / "results.json"
+    tmp_file = json_file.with_suffix(json_file.suffix + ".tmp")
+    results: dict[str, Any] = json.loads(json_file.read_text(encoding="utf-8"))
+    for tool, entries in links.items():
+        if tool in results:
+            results[tool]["nested"] = entries
+    tmp_file.write_text(json.dumps(results, indent=4), encoding="utf-8")
+    tmp_file.replace(json_file)
+
+
+def submit_nested(queue: Queue, result_path: Path, depth: int, cpu_budget: float) -> None:
+    """Submit the extracted images and audio files of an analysis and link them.
+
+    ``depth`` is how many more levels may be spawned and ``cpu_budget`` what
+    is left of the tree's CPU budget; nothing is submitted once either is
+    spent. Best-effort: a file that cannot be submitted is left out.
+    """
+    if depth <= 0 or cpu_budget <= 0 or not (result_path / "results.json").is_file():
+        return
+    artifacts = find_artifacts(result_path)[:NESTED_MAX_FILES]
+    if not artifacts:
+        return
+
+    share = cpu_budget / len(artifacts)
+    links: dict[str, list[dict[str, str]]] = {}
+    for artifact in artifacts:
+        try:
+            submission_hash = submit_artifact(queue, artifact, depth - 1, share)
+        except (OSError, SQLAlchemyError, RedisError) as exc:
+            with contextlib.suppress(SQLAlchemyError):
+                db.session.rollback()
+            sentry_sdk.capture_exception(exc)
+            continue
+        links.setdefault(artifact.tool, []).append(
+            {
+                "file": artifact.name,
+                "kind": artifact.file_type.kind,
+                "submission": submission_hash,
+            },
+        )
+    if links:
+        _link_nested(result_path, links)
@@ -0,0 +1,110 @@
+"""Deep-zoom spectrogram tiles rendered on demand.
+
+The spectrogram analyzer stores the STFT columns of an audio upload, max-pooled
+in time if the clip is long, as half-dB uint8 levels in
+``spectrogram-zoom.npy`` next to its plots (see
+:mod:`aperisolve.analyzers.spectrogram`). ``/spectrogram/<hash>/<channel>/
+<z>/<x>/<y>.png`` cuts that time x frequency plane into ``2**z`` by ``2**z``
+tiles of ``TILE_SIZE`` pixels, ``y = 0`` at the top (highest frequencies).
+
+Each tile max-pools its window, so a narrow tone or a thin stroke of hidden
+text survives zooming out, and is a palette PNG whose palette maps levels to
+the plots' viridis dB scale relative to the channel's peak. Tiles are cached
+under ``spectrogram-tiles/`` in the submission folder; the store is only
+memory-mapped, and read a slice of columns at a time.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from .analyzers.spectrogram import (
+    TILE_SIZE,
+    ZOOM_META_NAME,
+    ZOOM_NAME,
+    max_zoom,
+    zoom_palette,
+)
+
+TILE_DIRNAME = "spectrogram-tiles"
+# Output columns pooled per read of the store: bounds the slice in memory to
+# 1/8 of the tile's time window.
+_TILE_CHUNK = TILE_SIZE // 8
+
+
+def tile_path(result_dir: Path, channel: int, zoom: int, x: int, y: int) -> Path:
+    """Where one cached tile of a submission lives."""
+    return result_dir / TILE_DIRNAME / f"{channel}-{zoom}-{x}-{y}.png"
+
+
+def _span(index: int, parts: int, length: int) -> tuple[int, int]:
+    """Return the ``index``-th of ``parts`` near-equal, never empty slices of ``range(length)``."""
+    start = index * length // parts
+    return start, max(start + 1, (index + 1) * length // parts)
+
+
+def _pooled_window(
+    levels: np.ndarray,
+    channel: int,
+    columns: tuple[int, int],
+    bins: tuple[int, int],
+) -> np.ndarray:
+    """Max-pool a ``columns`` x ``bins`` window of the store to TILE_SIZE squared.
+
+    Windows smaller than the tile repeat their samples (``reduceat`` returns
+    the start element of an empty segment), i.e. nearest-neighbour zoom.
+    """
+    c0, c1 = columns
+    b0, b1 = bins
+    starts = c0 + np.arange(TILE_SIZE) * (c1 - c0) // TILE_SIZE
+    pooled = np.empty((TILE_SIZE, b1 - b0), dtype=np.uint8)
+    for i in range(0, TILE_SIZE, _TILE_CHUNK):
+        chunk_starts = starts[i : i + _TILE_CHUNK]
+        first = int(chunk_starts[0])
+        stop = int(starts[i + _TILE_CHUNK]) if i + _TILE_CHUNK < TILE_SIZE else c1
+        # Zoomed past one column per pixel, a chunk may end on its last start.
+        stop = max(stop, int(chunk_starts[-1]) + 1)
+        window = np.asarray(levels[first:stop, channel, b0:b1])
+        chunk_starts = chunk_starts - first
+        pooled[i : i + _TILE_CHUNK] = np.maximum.reduceat(window, chunk_starts, axis=0)
+    bin_starts = np.arange(TILE_SIZE) * (b1 - b0) // TILE_SIZE
+    return np.maximum.reduceat(pooled, bin_starts, axis=1)
+
+
+def render_tile(result_dir: Path, channel: int, zoom: int, x: int, y: int) -> Path | None:
+    """Return the cached tile PNG, rendering it first; None if it does not exist."""
+    target = tile_path(result_dir, channel, zoom, x, y)
+    if target.exists():
+        return target
+    store = result_dir / ZOOM_NAME
+    meta_file = result_dir / ZOOM_META_NAME
+    if not store.exists() or not meta_file.exists():
+        return None
+    meta = json.loads(meta_file.read_text(encoding="utf-8"))
+    columns, bins = int(meta["columns"]), int(meta["bins"])
+    if not 0 <= channel < int(meta["channels"]) or zoom > max_zoom(columns, bins):
+        return None
+    parts = 1 << zoom
+    if not (0 <= x < parts and 0 <= y < parts):
+        return None
+
+    levels = np.load(store, mmap_mode="r")
+    # Tile rows count down from the top, i.e. from the highest bin.
+    pooled = _pooled_window(
+        levels,
+        channel,
+        _span(x, parts, columns),
+        _span(parts - 1 - y, parts, bins),
+    )
+    tile = Image.fromarray(np.ascontiguousarray(pooled.T[::-1]), mode="P")
+    tile.putpalette(zoom_palette(int(meta["peaks"][channel])))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Concurrent requests for one tile never share a temp file.
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tile.save(tmp, format="PNG")
+    tmp.replace(target)
+    return target
@@ -3,11 +3,14 @@
 const TOOL_ORDER = window.TOOL_ORDER || [
   "decomposer",
   "spectrogram",
+  "audio_lsb",
+  "video",
   "color_remapping",
   "file",
   "pdfinfo",
   "pdfid",
   "exiftool",
+  "carving",
   "binwalk",
   "foremost",
   "outguess",
@@ -148,12 +151,17 @@ function updateCurrentImages() {
   currentImages = Array.from(document.querySelectorAll(".results_img img"));
 }
 
+// Tiles may show a thumbnail; the modal always shows the full-size image.
+function fullSrc(img) {
+  return img.dataset.full || img.src;
+}
+
 // Function to handle image click (open modal)
 function openImageModal(src) {
   updateCurrentImages();
   currentIndex = currentImages.findIndex((img) => img.src === src);
   if (currentIndex !== -1) {
-    modalImage.src = currentImages[currentIndex].src;
+    modalImage.src = fullSrc(currentImages[currentIndex]);
     modalImage.alt = currentImages[currentIndex].alt || "";
     modal.classList.add("modal-visible");
     modal.classList.remove("modal-hidden");
@@ -202,13 +210,13 @@ document.addEventListener("keydown", function (e) {
     // Show previous image
     if (currentIndex > 0) {
       currentIndex--;
-      modalImage.src = currentImages[currentIndex].src;
+      modalImage.src = fullSrc(currentImages[currentIndex]);
     }
   } else if (e.key === "ArrowRight") {
     // Show next image
     if (currentIndex < currentImages.length - 1) {
       currentIndex++;
-      modalImage.src = currentImages[currentIndex].src;
+      modalImage.src = fullSrc(currentImages[currentIndex]);
     }
   }
 });
@@ -226,7 +234,9 @@ function renderMainPreview(infoData) {
   const fileName = escapeHtml(rawName);
 
   if (infoData.kind === "image") {
-    return `<img src="${src}" alt="${t("Analyzed file")}"/>`;
+    // Large or non-browser formats (TIFF...) display through the worker's
+    // preview; the link keeps the untouched original one click away.
+    return `<a href="${src}" target="_blank"><img src="${src}?size=preview" alt="${t("Analyzed file")}"/></a>`;
   }
   if (infoData.kind === "video") {
     // #t=0.1 nudges the browser to render a poster frame instead of a blank box.
@@ -542,7 +552,502 @@ function renderAnalyzing() {
     `<p class="mb-0">${t("Analyzing your file…")}</p></div>`;
 }
 
-function parseResult(result) {
+// Stegsolve-style transform panel under the decomposer: builds a
+// /transform/<hash> URL from the form and shows the (server-cached) output.
+const TRANSFORM_PLANES = ["R", "G", "B", "A", "L"].flatMap((c) =>
+  [7, 6, 5, 4, 3, 2, 1, 0].map((bit) => `${c}${bit}`)
+);
+
+function transformPanel(submission_hash) {
+  const planeOptions = (selected) =>
+    TRANSFORM_PLANES.map(
+      (p) => `<option value="${p}"${p === selected ? " selected" : ""}>${p}</option>`
+    ).join("");
+  return (
+    `<h3>${t("Transform")}</h3>` +
+    `<form class="transform-form" data-hash="${escapeHtml(submission_hash)}">` +
+    `<select name="op" aria-label="${t("Operation")}">` +
+    `<option value="xor">XOR</option><option value="and">AND</option>` +
+    `<option value="or">OR</option><option value="plane">${t("Single plane")}</option>` +
+    `<option value="planes">${t("Plane mask")}</option></select>` +
+    `<select name="a" aria-label="${t("First plane")}">${planeOptions("R0")}</select>` +
+    `<select name="b" aria-label="${t("Second plane")}">${planeOptions("G0")}</select>` +
+    `<input name="mask" type="text" placeholder="010101" maxlength="8" ` +
+    `aria-label="${t("Hex mask per channel")}"/>` +
+    `<button type="submit" class="btn btn-primary">${t("Apply")}</button>` +
+    `</form><div class="transform-output"></div>`
+  );
+}
+
+document.addEventListener("submit", async function (e) {
+  const form = e.target.closest(".transform-form");
+  if (!form) return;
+  e.preventDefault();
+  const data = new FormData(form);
+  const params = new URLSearchParams({ op: data.get("op") });
+  if (params.get("op") === "planes") {
+    params.set("mask", data.get("mask"));
+  } else {
+    params.set("a", data.get("a"));
+    if (params.get("op") !== "plane") params.set("b", data.get("b"));
+  }
+  const url = `/transform/${encodeURIComponent(form.dataset.hash)}?${params}`;
+  const output = form.nextElementSibling;
+  try {
+    const response = await fetch(url);
+    if (!response.ok) {
+      const body = await response.json().catch(() => ({}));
+      output.innerHTML = `<div class="alert alert-danger mb-0" role="alert">${escapeHtml(
+        body.error || t("Transform failed")
+      )}</div>`;
+      return;
+    }
+    output.innerHTML = `<div class='results_img'><img src='${escapeHtml(url)}' alt='${escapeHtml(
+      params.toString()
+    )}'/></div>`;
+  } catch (error) {
+    output.innerHTML = `<div class="alert alert-danger mb-0" role="alert">${t("Network error occurred")}</div>`;
+    console.error("Transform error:", error);
+  }
+});
+
+// Tools whose images render full-width (see aperisolve.css) keep full-size
+// sources; every other derived image loads its worker-made thumbnail as a
+// tile, and the modal opens the full-resolution file (data-full).
+const FULL_WIDTH_TOOLS = ["spectrogram", "pcrt"];
+
+function resultImageHtml(tool, url, alt) {
+  const full = escapeHtml(url);
+  const useThumb = url.startsWith("/image/") && !FULL_WIDTH_TOOLS.includes(tool);
+  const src = useThumb ? `${full}?size=thumb` : full;
+  return `<div class='results_img'><img src='${src}' data-full='${full}' alt='${escapeHtml(
+    alt
+  )}' loading='lazy'/></div>`;
+}
+
+// Image groups ({label: [urls]}) of one analyzer, as results_img thumbnails.
+function imageGroupsHtml(tool, groups) {
+  // Channel labels come from the analyzer's own dict keys. Only the
+  // decomposer/color_remapping RGB(A) sets get the canonical
+  // Superimposed,Red,Green,Blue,(Alpha) ordering; every other analyzer
+  // (e.g. the spectrogram's {Spectrogram, Waveform}) iterates its keys
+  // as-is — which also fixes a 2-key dict previously rendering nothing.
+  const imageKeys = Object.keys(groups);
+  const RGBA = ["Superimposed", "Red", "Green", "Blue", "Alpha"];
+  const RGB = ["Superimposed", "Red", "Green", "Blue"];
+  let channels = imageKeys;
+  if (imageKeys.length === RGBA.length && RGBA.every((c) => imageKeys.includes(c))) {
+    channels = RGBA;
+  } else if (imageKeys.length === RGB.length && RGB.every((c) => imageKeys.includes(c))) {
+    channels = RGB;
+  }
+
+  let html = "";
+  for (const channel of channels) {
+    const images = groups[channel];
+    if (images) {
+      const title_h3 = capitalize(escapeHtml(channel));
+      if (title_h3 != "Color Remapping") {
+        html += `<h3>${t(title_h3)}</h3>`;
+      }
+      for (const image of images) {
+        html += resultImageHtml(tool, image, tool + " " + channel);
+      }
+    }
+  }
+  return html;
+}
+
+/**
+ * Client-side rendering (CLIENT_RENDERING=1): the decomposer and colour
+ * remapping send a "client_render" spec instead of PNGs, and the browser
+ * computes the planes/remaps from the original upload. /transform serves the
+ * same images server-side on request or when local decoding fails.
+ */
+
+const BITS = [0, 1, 2, 3, 4, 5, 6, 7];
+const clientRenderCache = new Map(); // `${tool}:${source}` -> Promise<groups>
+const decodedSources = new Map(); // source URL -> Promise<ImageData>
+const clientRenderSpecs = new Map(); // tool -> latest spec
+
+function serverRenderedGroups(tool, spec) {
+  if (tool === "color_remapping") {
+    const urls = Array.from({ length: spec.count }, (_, i) => `${spec.transform}?op=remap&seed=${i}`);
+    return { "Color Remapping": urls };
+  }
+  const groups = {};
+  const rgb = spec.channels.length === 3;
+  if (rgb) {
+    groups.Superimposed = BITS.map((bit) => {
+      const byte = (1 << bit).toString(16).padStart(2, "0");
+      return `${spec.transform}?op=planes&mask=${byte.repeat(3)}`;
+    });
+  }
+  spec.channels.forEach((label, c) => {
+    const letter = rgb ? "RGB"[c] : "L";
+    groups[label] = BITS.map((bit) => `${spec.transform}?op=plane&a=${letter}${bit}`);
+  });
+  return groups;
+}
+
+// Decode the original once per page without colour management or alpha
+// premultiplication, so canvas bytes are the file's bytes.
+function decodeSource(source) {
+  if (!decodedSources.has(source)) {
+    decodedSources.set(
+      source,
+      (async () => {
+        const blob = await (await fetch(source)).blob();
+        const bitmap = await createImageBitmap(blob, {
+          colorSpaceConversion: "none",
+          premultiplyAlpha: "none",
+        });
+        const canvas = document.createElement("canvas");
+        canvas.width = bitmap.width;
+        canvas.height = bitmap.height;
+        const ctx = canvas.getContext("2d", { willReadFrequently: true });
+        ctx.drawImage(bitmap, 0, 0);
+        return ctx.getImageData(0, 0, bitmap.width, bitmap.height);
+      })()
+    );
+  }
+  return decodedSources.get(source);
+}
+
+// Build one RGBA image with fill(srcOffset, dst, dstOffset) and return a blob URL.
+function pixelsToUrl(pixels, fill) {
+  const out = new ImageData(pixels.width, pixels.height);
+  const src = pixels.data;
+  const dst = out.data;
+  for (let i = 0; i < src.length; i += 4) {
+    fill(src, dst, i);
+    dst[i + 3] = 255;
+  }
+  const canvas = document.createElement("canvas");
+  canvas.width = pixels.width;
+  canvas.height = pixels.height;
+  canvas.getContext("2d").putImageData(out, 0, 0);
+  return new Promise((resolve, reject) =>
+    canvas.toBlob((blob) => (blob ? resolve(URL.createObjectURL(blob)) : reject(new Error("toBlob failed"))), "image/png")
+  );
+}
+
+async function clientPlanes(spec) {
+  const pixels = await decodeSource(spec.source);
+  const groups = {};
+  const rgb = spec.channels.length === 3;
+  if (rgb) {
+    groups.Superimposed = await Promise.all(
+      BITS.map((bit) =>
+        pixelsToUrl(pixels, (src, dst, i) => {
+          dst[i] = ((src[i] >> bit) & 1) * 255;
+          dst[i + 1] = ((src[i + 1] >> bit) & 1) * 255;
+          dst[i + 2] = ((src[i + 2] >> bit) & 1) * 255;
+        })
+      )
+    );
+  }
+  for (const [c, label] of spec.channels.entries()) {
+    groups[label] = await Promise.all(
+      BITS.map((bit) =>
+        pixelsToUrl(pixels, (src, dst, i) => {
+          const value = ((src[i + c] >> bit) & 1) * 255;
+          dst[i] = value;
+          dst[i + 1] = value;
+          dst[i + 2] = value;
+        })
+      )
+    );
+  }
+  return groups;
+}
+
+async function clientRemaps(spec) {
+  const pixels = await decodeSource(spec.source);
+  const urls = [];
+  for (let n = 0; n < spec.count; n++) {
+    const lut = crypto.getRandomValues(new Uint8Array(256));
+    urls.push(
+      await pixelsToUrl(pixels, (src, dst, i) => {
+        dst[i] = lut[src[i]];
+        dst[i + 1] = lut[src[i + 1]];
+        dst[i + 2] = lut[src[i + 2]];
+      })
+    );
+  }
+  return { "Color Remapping": urls };
+}
+
+async function renderClientSide(target) {
+  const tool = target.dataset.tool;
+  const spec = clientRenderSpecs.get(tool);
+  const key = `${tool}:${spec.source}`;
+  if (!clientRenderCache.has(key)) {
+    clientRenderCache.set(key, tool === "color_remapping" ? clientRemaps(spec) : clientPlanes(spec));
+  }
+  let groups;
+  try {
+    groups = await clientRenderCache.get(key);
+  } catch (error) {
+    console.error("Client-side rendering failed, using the server:", error);
+    groups = serverRenderedGroups(tool, spec);
+    clientRenderCache.set(key, Promise.resolve(groups));
+  }
+  if (!target.isConnected) return; // a newer poll re-rendered the section
+  target.innerHTML =
+    imageGroupsHtml(tool, groups) +
+    `<div><button type="button" class="btn btn-secondary btn-sm mt-2 render-on-server">` +
+    `${t("Render on server")}</button></div>`;
+}
+
+document.addEventListener("click", function (e) {
+  const button = e.target.closest(".render-on-server");
+  if (!button) return;
+  const target = button.closest(".client-render");
+  const tool = target.dataset.tool;
+  const spec = clientRenderSpecs.get(tool);
+  clientRenderCache.set(`${tool}:${spec.source}`, Promise.resolve(serverRenderedGroups(tool, spec)));
+  renderClientSide(target);
+});
+
+/**
+ * Deep-zoom spectrogram: the analyzer's "zoom" spec points at
+ * <tiles>/<channel>/<z>/<x>/<y>.png, 2^z x 2^z tiles per channel with y=0 at
+ * the top (highest frequency). The view is a window [u0,u1] x [v0,v1] of the
+ * unit square; tiles of the level matching the window's resolution are
+ * stretched into place. Views are kept per tiles URL so that re-rendering the
+ * results on every poll does not reset them.
+ */
+const spectrogramSpecs = new Map();
+const spectrogramViews = new Map();
+
+function spectrogramZoomHtml(spec) {
+  const options = spec.channels
+    .map((name, i) => `<option value="${i}">${escapeHtml(t(name))}</option>`)
+    .join("");
+  return (
+    `<h3>${t("Zoomable spectrogram")}</h3>` +
+    `<div class="spectro-zoom" data-tiles="${escapeHtml(spec.tiles)}">` +
+    `<div class="spectro-zoom-controls">` +
+    `<select class="spectro-zoom-channel" aria-label="${t("Channel")}">${options}</select>` +
+    `<button type="button" class="btn btn-secondary btn-sm" data-zoom="in" ` +
+    `aria-label="${t("Zoom in")}">+</button>` +
+    `<button type="button" class="btn btn-secondary btn-sm" data-zoom="out" ` +
+    `aria-label="${t("Zoom out")}">−</button>` +
+    `<button type="button" class="btn btn-secondary btn-sm" data-zoom="reset">${t("Reset view")}</button>` +
+    `<span class="spectro-zoom-range"></span></div>` +
+    `<div class="spectro-zoom-view"></div></div>`
+  );
+}
+
+function spectrogramView(tiles) {
+  if (!spectrogramViews.has(tiles)) {
+    spectrogramViews.set(tiles, { channel: 0, u0: 0, u1: 1, v0: 0, v1: 1 });
+  }
+  return spectrogramViews.get(tiles);
+}
+
+function renderSpectrogramView(container) {
+  const spec = spectrogramSpecs.get(container.dataset.tiles);
+  const view = spectrogramView(spec.tiles);
+  const viewport = container.querySelector(".spectro-zoom-view");
+  const width = viewport.clientWidth;
+  const height = viewport.clientHeight;
+  const spanU = view.u1 - view.u0;
+  const spanV = view.v1 - view.v0;
+  // Coarsest level whose tiles are at least as fine as the screen, per axis.
+  const needed = Math.max(
+    Math.log2(width / spec.tile_size / spanU),
+    Math.log2(height / spec.tile_size / spanV)
+  );
+  const z = Math.min(spec.max_zoom, Math.max(0, Math.ceil(needed)));
+  const n = 2 ** z;
+  const tileW = width / (n * spanU);
+  const tileH = height / (n * spanV);
+  let html = "";
+  for (let x = Math.floor(view.u0 * n); x < Math.ceil(view.u1 * n); x++) {
+    for (let y = Math.floor(view.v0 * n); y < Math.ceil(view.v1 * n); y++) {
+      const left = (x / n - view.u0) * n * tileW;
+      const top = (y / n - view.v0) * n * tileH;
+      html +=
+        `<img src="${escapeHtml(spec.tiles)}/${view.channel}/${z}/${x}/${y}.png" alt="" ` +
+        `draggable="false" style="left:${left}px;top:${top}px;width:${tileW}px;height:${tileH}px"/>`;
+    }
+  }
+  viewport.innerHTML = html;
+  const hz = (v) => Math.round((1 - v) * spec.nyquist);
+  container.querySelector(".spectro-zoom-range").textContent =
+    `${(view.u0 * spec.duration).toFixed(3)}–${(view.u1 * spec.duration).toFixed(3)} s, ` +
+    `${hz(view.v1)}–${hz(view.v0)} Hz`;
+  container.querySelector(".spectro-zoom-channel").value = String(view.channel);
+}
+
+// Scale the view by `factor` around the point (cu, cv), keeping it inside
+// the unit square and no finer than one stored sample per tile pixel.
+function zoomSpectrogram(spec, view, factor, cu, cv) {
+  const minSpan = 2 ** -spec.max_zoom;
+  const scale = (lo, hi, c) => {
+    const span = Math.min(1, Math.max(minSpan, (hi - lo) * factor));
+    const start = Math.min(1 - span, Math.max(0, c - ((c - lo) * span) / (hi - lo)));
+    return [start, start + span];
+  };
+  [view.u0, view.u1] = scale(view.u0, view.u1, cu);
+  [view.v0, view.v1] = scale(view.v0, view.v1, cv);
+}
+
+function panSpectrogram(view, du, dv) {
+  const shift = (lo, hi, d) => {
+    const start = Math.min(1 - (hi - lo), Math.max(0, lo + d));
+    return [start, start + (hi - lo)];
+  };
+  [view.u0, view.u1] = shift(view.u0, view.u1, du);
+  [view.v0, view.v1] = shift(view.v0, view.v1, dv);
+}
+
+document.addEventListener("click", function (e) {
+  const button = e.target.closest(".spectro-zoom [data-zoom]");
+  if (!button) return;
+  const container = button.closest(".spectro-zoom");
+  const spec = spectrogramSpecs.get(container.dataset.tiles);
+  const view = spectrogramView(spec.tiles);
+  if (button.dataset.zoom === "reset") {
+    Object.assign(view, { u0: 0, u1: 1, v0: 0, v1: 1 });
+  } else {
+    const factor = button.dataset.zoom === "in" ? 0.5 : 2;
+    zoomSpectrogram(spec, view, factor, (view.u0 + view.u1) / 2, (view.v0 + view.v1) / 2);
+  }
+  renderSpectrogramView(container);
+});
+
+document.addEventListener("change", function (e) {
+  const select = e.target.closest(".spectro-zoom-channel");
+  if (!select) return;
+  const container = select.closest(".spectro-zoom");
+  spectrogramView(container.dataset.tiles).channel = Number(select.value);
+  renderSpectrogramView(container);
+});
+
+document.addEventListener(
+  "wheel",
+  function (e) {
+    const viewport = e.target.closest(".spectro-zoom-view");
+    if (!viewport) return;
+    e.preventDefault();
+    const container = viewport.closest(".spectro-zoom");
+    const spec = spectrogramSpecs.get(container.dataset.tiles);
+    const view = spectrogramView(spec.tiles);
+    const rect = viewport.getBoundingClientRect();
+    const cu = view.u0 + ((e.clientX - rect.left) / rect.width) * (view.u1 - view.u0);
+    const cv = view.v0 + ((e.clientY - rect.top) / rect.height) * (view.v1 - view.v0);
+    zoomSpectrogram(spec, view, e.deltaY < 0 ? 0.8 : 1.25, cu, cv);
+    renderSpectrogramView(container);
+  },
+  { passive: false }
+);
+
+// Drag to pan; the move handler re-renders at most once per frame.
+let spectrogramDrag = null;
+
+document.addEventListener("pointerdown", function (e) {
+  const viewport = e.target.closest(".spectro-zoom-view");
+  if (!viewport) return;
+  spectrogramDrag = { viewport, x: e.clientX, y: e.clientY, pending: false };
+  viewport.setPointerCapture(e.pointerId);
+});
+
+document.addEventListener("pointermove", function (e) {
+  if (!spectrogramDrag) return;
+  const drag = spectrogramDrag;
+  const container = drag.viewport.closest(".spectro-zoom");
+  const view = spectrogramView(container.dataset.tiles);
+  const rect = drag.viewport.getBoundingClientRect();
+  panSpectrogram(
+    view,
+    ((drag.x - e.clientX) / rect.width) * (view.u1 - view.u0),
+    ((drag.y - e.clientY) / rect.height) * (view.v1 - view.v0)
+  );
+  drag.x = e.clientX;
+  drag.y = e.clientY;
+  if (!drag.pending) {
+    drag.pending = true;
+    requestAnimationFrame(() => {
+      drag.pending = false;
+      if (container.isConnected) renderSpectrogramView(container);
+    });
+  }
+});
+
+document.addEventListener("pointerup", function () {
+  spectrogramDrag = null;
+});
+
+// Images and audio files a tool extracted, analyzed in turn as submissions
+// of their own; each links to its result page.
+function nestedResultsHtml(nested) {
+  const items = nested.map(entry => {
+    const icon = entry.kind === "audio" ? "fa-music" : "fa-image";
+    return `<li><i class="fa ${icon}"></i> <a href="/${escapeHtml(entry.submission)}" ` +
+      `target="_blank">${escapeHtml(entry.file)}</a></li>`;
+  }).join("");
+  return `<div class="nested-results mt-2"><strong>${t("Extracted files analyzed")}</strong>` +
+    `<ul class="mb-0">${items}</ul></div>`;
+}
+
+// A tool's output: a string, lines of code, or a key/value table.
+function outputHtml(output) {
+  if (typeof output === "string") {
+    return `<div class="alert alert-success" role="alert">${escapeHtml(output)}</div>`;
+  }
+  if (Array.isArray(output)) {
+    if (output.length === 0) return "";
+    return `<div class="code-container position-relative mb-2"><pre class="mb-0"><code>` +
+      output.map(line => escapeHtml(line)).join('\n').trim() +
+      `</code></pre><i class="fas fa-copy copy-icon"></i></div>`;
+  }
+  if (output && typeof output === "object") {
+    let rows = "";
+    for (const key in output) {
+      rows += `<tr><td>${escapeHtml(key)}</td><td>${escapeHtml(output[key])}</td></tr>`;
+    }
+    return `<div class="table-container"><table>${rows}</table></div>`;
+  }
+  return "";
+}
+
+// Large outputs stay out of results.json: it holds their first lines and a
+// full_output URL, fetched when the user asks. Fetched outputs are kept by
+// URL so the re-renders of later polls still show them.
+const fullOutputs = new Map();
+
+function fullOutputButtonHtml(fullOutput) {
+  return `<button type="button" class="btn btn-outline-primary btn-sm mb-2 show-full-output" ` +
+    `data-url="${escapeHtml(fullOutput.url)}"><i class="fa fa-expand"></i> ` +
+    `${t("Show full output")} (${Number(fullOutput.lines)})</button>`;
+}
+
+document.addEventListener("click", function (event) {
+  const button = event.target.closest(".show-full-output");
+  if (!button) return;
+  const url = button.dataset.url;
+  button.disabled = true;
+  fetch(url)
+    .then(response => {
+      if (!response.ok) throw new Error(`${t("❌ HTTP error")} ${response.status}`);
+      return response.json();
+    })
+    .then(output => {
+      fullOutputs.set(url, output);
+      const target = button.closest(".analyzer").querySelector(".analyzer-output");
+      if (target) target.innerHTML = outputHtml(output);
+      button.remove();
+    })
+    .catch(error => {
+      button.disabled = false;
+      showDanger(error.message, false);
+    });
+});
+
+function parseResult(result, submission_hash) {
   const resultDiv = document.getElementById("result-analyzers");
   resultDiv.innerHTML = "";
 
@@ -562,79 +1067,43 @@ function parseResult(result) {
       : `<span class="analyzer-badge badge-empty"><i class="fa fa-minus"></i> ${t("No result")}</span>`;
     analyzer.innerHTML += `<div class="analyzer-header"><h2>${analyzerTitle(tool)}</h2>${badge}</div>`;
 
-    // Parse text output
-    if (typeof result[tool]["output"] === "string") {
-      const output = escapeHtml(result[tool]["output"]);
-      analyzer.innerHTML += `<div class="alert alert-success" role="alert">${output}</div>`;
-    } else if (Array.isArray(result[tool]["output"])) {
-      if (result[tool]["output"].length > 0) {
-        var code_content = `<div class="code-container position-relative mb-2">`;
-        code_content += `<pre class="mb-0"><code>`;
-        code_content += result[tool]["output"].map(line => escapeHtml(line)).join('\n').trim();
-        code_content += `</code></pre>`;
-        code_content += `<i class="fas fa-copy copy-icon"></i>`;
-        code_content += `</div>`;
-        analyzer.innerHTML += code_content;
-      }
-    } else if (typeof result[tool]["output"] === "object") {
-      var table_content = `<div class="table-container">`;
-      table_content += `<table>`;
-      for (const key in result[tool]["output"]) {
-        table_content += `<tr><td>${escapeHtml(key)}</td>`;
-        table_content += `<td>${escapeHtml(
-          result[tool]["output"][key]
-        )}</td></tr>`;
-      }
-      table_content += `</table>`;
-      table_content += `</table>`;
-      analyzer.innerHTML += table_content;
+    // Parse output (a preview, when the full output is offloaded)
+    const fullOutput = result[tool]["full_output"];
+    const fetched = fullOutput && fullOutputs.has(fullOutput.url);
+    const output = fetched ? fullOutputs.get(fullOutput.url) : result[tool]["output"];
+    analyzer.innerHTML += `<div class="analyzer-output">${outputHtml(output)}</div>`;
+    if (fullOutput && !fetched) {
+      analyzer.innerHTML += fullOutputButtonHtml(fullOutput);
     }
 
     // Parse images, downloads, ...
     if (result[tool]["status"] === "ok") {
       if ("images" in result[tool]) {
-        // Channel labels come from the analyzer's own dict keys. Only the
-        // decomposer/color_remapping RGB(A) sets get the canonical
-        // Superimposed,Red,Green,Blue,(Alpha) ordering; every other analyzer
-        // (e.g. the spectrogram's {Spectrogram, Waveform}) iterates its keys
-        // as-is — which also fixes a 2-key dict previously rendering nothing.
-        const imageKeys = Object.keys(result[tool]["images"]);
-        const RGBA = ["Superimposed", "Red", "Green", "Blue", "Alpha"];
-        const RGB = ["Superimposed", "Red", "Green", "Blue"];
-        let channels = imageKeys;
-        if (imageKeys.length === RGBA.length && RGBA.every((c) => imageKeys.includes(c))) {
-          channels = RGBA;
-        } else if (imageKeys.length === RGB.length && RGB.every((c) => imageKeys.includes(c))) {
-          channels = RGB;
-        }
+        analyzer.innerHTML += imageGroupsHtml(tool, result[tool]["images"]);
+      }
 
-        let title_h3 = "";
-        for (const channel of channels) {
-          const images = result[tool]["images"][channel];
-          if (images) {
-            title_h3 = capitalize(escapeHtml(channel));
-            if (title_h3 != "Color Remapping"){
-              analyzer.innerHTML += `<h3>${t(title_h3)}</h3>`;
-            }
-            for (const image of images) {
-              analyzer.innerHTML += `<div class='results_img'><img src='${escapeHtml(
-                image
-              )}' alt='${escapeHtml(tool + " " + channel)}' loading='lazy'/></div>`;
-            }
-          }
-        }
+      if ("client_render" in result[tool]) {
+        // Filled asynchronously by renderClientSide once the planes exist.
+        analyzer.innerHTML += `<div class="client-render" data-tool="${escapeHtml(tool)}"></div>`;
+      }
+
+      if (tool === "decomposer" && submission_hash) {
+        analyzer.innerHTML += transformPanel(submission_hash);
+      }
+
+      if ("zoom" in result[tool]) {
+        spectrogramSpecs.set(result[tool]["zoom"]["tiles"], result[tool]["zoom"]);
+        analyzer.innerHTML += spectrogramZoomHtml(result[tool]["zoom"]);
       }
 
       if ("image" in result[tool]) {
         // Parse image output
-        analyzer.innerHTML += `<div class='results_img'><img src='${escapeHtml(
-          result[tool]["image"]
-        )}' alt='${escapeHtml(tool)}' loading='lazy'/></div>`;
+        analyzer.innerHTML += resultImageHtml(tool, result[tool]["image"], tool);
       }
 
       if ("png_images" in result[tool]) {
         for (const image of result[tool]["png_images"]) {
-          analyzer.innerHTML += `<div class='results_img'><img src='${escapeHtml(image)}' alt='${escapeHtml(tool)}' loading='lazy'/></div>`;
+          analyzer.innerHTML += resultImageHtml(tool, image, tool);
         }
       }
 
@@ -644,6 +1113,10 @@ function parseResult(result) {
           result[tool]["download"]
         )}" target="_blank" class="btn btn-primary mt-2"><i class="fa fa-download"></i> ${t("Download file")}</a>`;
       }
+
+      if ("nested" in result[tool]) {
+        analyzer.innerHTML += nestedResultsHtml(result[tool]["nested"]);
+      }
     }
 
     // Render error and note inside the analyzer's own section (previously
@@ -659,6 +1132,25 @@ function parseResult(result) {
         `<div class="alert alert-info mb-0 mt-2" role="alert">` +
         `${escapeHtml(result[tool]["note"].trim())}</div>`;
     }
+
+    for (const zoomView of analyzer.querySelectorAll(".spectro-zoom")) {
+      renderSpectrogramView(zoomView);
+    }
+
+    const clientTarget = analyzer.querySelector(".client-render");
+    if (clientTarget) {
+      clientRenderSpecs.set(tool, result[tool]["client_render"]);
+      renderClientSide(clientTarget);
+    }
+  }
+
+  // One archive of every tool's extracted files, assembled by the server.
+  if (submission_hash && Object.values(result).some(entry => "download" in entry)) {
+    const all = document.createElement("div");
+    all.className = "analyzer a-download-all";
+    all.innerHTML = `<a href="/download/${escapeHtml(submission_hash)}/all" target="_blank" ` +
+      `class="btn btn-primary"><i class="fa fa-download"></i> ${t("Download all extracted files")}</a>`;
+    resultDiv.appendChild(all);
   }
 }
 
@@ -711,7 +1203,7 @@ async function pollStatus(submission_hash, startedAt, interval) {
     if ("error" in resultData) {
       showWarning(`❌ ${resultData.error}`, true);
     } else if ("results" in resultData) {
-      parseResult(resultData.results);
+      parseResult(resultData.results, submission_hash);
     }
   } else if (statusData.status === "error") {
     showDanger(t("❌ Error during the analysis."), true);
@@ -722,7 +1214,7 @@ async function pollStatus(submission_hash, startedAt, interval) {
       const resultData = await resultResp.json();
       if ("results" in resultData) {
         fetchImageInfo(submission_hash);
-        parseResult(resultData.results);
+        parseResult(resultData.results, submission_hash);
       } else {
         renderAnalyzing();
       }
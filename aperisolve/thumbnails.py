@@ -0,0 +1,139 @@
+"""Downscaled thumbnails of derived images and previews of originals.
+
+A result page shows ~40 derived images as small tiles, and the original in
+the info panel. Serving all of them at full resolution costs bandwidth and
+render time, and some originals (TIFF, exotic BMP) do not display in
+browsers at all. After the analyzers finish, the worker writes:
+
+- ``<submission>/thumbs/<name>.webp`` for each derived image larger than
+  ``THUMB_MAX_SIDE`` (served by ``/image/<hash>/<name>?size=thumb``);
+- ``<image>/preview.webp`` for originals that are too large or not
+  browser-decodable (served by ``/image/<name>?size=preview``).
+
+Routes fall back to the full-resolution file while a thumbnail is missing,
+so generating them is purely an optimization. Images that never get one
+(small tiles, small browser-format originals) are served in full, and cached
+as long as the thumbnails themselves. WebP is used when Pillow has
+it, PNG otherwise.
+"""
+
+import os
+from pathlib import Path
+
+from PIL import Image, UnidentifiedImageError, features
+
+from .analyzers.pil_utils import MAX_IMAGE_PIXELS
+from .config import IMAGE_EXTENSIONS
+
+THUMB_DIRNAME = "thumbs"
+PREVIEW_STEM = "preview"
+# Tiles render at ~25% of a ~1100px column; 512 keeps them sharp on HiDPI.
+THUMB_MAX_SIDE = 512
+PREVIEW_MAX_SIDE = 2048
+# Formats every mainstream browser displays natively; anything else always
+# gets a preview, whatever its size.
+BROWSER_FORMATS = frozenset({"PNG", "JPEG", "GIF", "WEBP"})
+THUMB_QUALITY = 80
+
+THUMB_SUFFIX = ".webp" if features.check("webp") else ".png"
+
+
+def thumb_path(result_path: Path, img_name: str) -> Path:
+    """Where the thumbnail of derived image ``img_name`` lives."""
+    return result_path / THUMB_DIRNAME / f"{img_name}{THUMB_SUFFIX}"
+
+
+def preview_path(image_dir: Path) -> Path:
+    """Where the preview of an image folder's original upload lives."""
+    return image_dir / f"{PREVIEW_STEM}{THUMB_SUFFIX}"
+
+
+def _save_downscaled(img: Image.Image, max_side: int, target: Path) -> None:
+    """Downscale ``img`` to fit ``max_side`` and atomically write ``target``."""
+    img.draft(img.mode, (max_side, max_side))  # JPEG: decode at reduced scale
+    if img.mode in {"1", "L", "I", "I;16", "F"}:
+        img = img.convert("L")
+    elif img.mode not in {"RGB", "RGBA"}:
+        img = img.convert("RGBA" if img.has_transparency_data else "RGB")
+    img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Two submissions of one image may race on its preview; never share a tmp.
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    if THUMB_SUFFIX == ".webp":
+        img.save(tmp, format="WEBP", quality=THUMB_QUALITY, method=4)
+    else:
+        img.save(tmp, format="PNG")
+    tmp.replace(target)
+
+
+def _needs_thumb(img: Image.Image) -> bool:
+    return max(img.size) > THUMB_MAX_SIDE
+
+
+def _needs_preview(img: Image.Image) -> bool:
+    return img.format not in BROWSER_FORMATS or max(img.size) > PREVIEW_MAX_SIDE
+
+
+def _open_bounded(path: Path) -> Image.Image | None:
+    """Open ``path`` lazily, or None if it is not a decodable, sane-sized image."""
+    try:
+        img = Image.open(path)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return None
+    if img.width * img.height > MAX_IMAGE_PIXELS:
+        img.close()
+        return None
+    return img
+
+
+def needs_downscaled(path: Path, size: str) -> bool:
+    """Whether the worker writes a ``size`` (``thumb`` or ``preview``) copy of ``path``.
+
+    Reads the header only.
+    """
+    img = _open_bounded(path)
+    if img is None:
+        return False
+    with img:
+        return _needs_preview(img) if size == "preview" else _needs_thumb(img)
+
+
+def generate_thumbnails(result_path: Path) -> int:
+    """Thumbnail every large derived image in ``result_path``; return how many."""
+    written = 0
+    for path in sorted(result_path.iterdir()):
+        if not path.is_file() or path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        target = thumb_path(result_path, path.name)
+        if target.exists():
+            continue
+        img = _open_bounded(path)
+        if img is None:
+            continue
+        with img:
+            if not _needs_thumb(img):
+                continue
+            try:
+                _save_downscaled(img, THUMB_MAX_SIDE, target)
+            except (OSError, ValueError):
+                continue  # truncated/odd image: the full file is still served
+        written += 1
+    return written
+
+
+def generate_preview(original: Path, image_dir: Path) -> Path | None:
+    """Write a browser-friendly preview of ``original`` when it needs one."""
+    target = preview_path(image_dir)
+    if target.exists():
+        return target
+    img = _open_bounded(original)
+    if img is None:
+        return None
+    with img:
+        if not _needs_preview(img):
+            return None
+        try:
+            _save_downscaled(img, PREVIEW_MAX_SIDE, target)
+        except (OSError, ValueError):
+            return None
+    return target
@@ -0,0 +1,244 @@
+"""Stegsolve-style image transforms evaluated on demand.
+
+``/transform/<hash>`` lets the result page XOR bit planes, combine planes
+under a mask and so on without leaving the site. Only a small allow-list of
+vectorized NumPy operations is exposed; every request is parsed into a
+:class:`TransformOp` whose canonical ``key`` names both the cached output PNG
+and the work to do, so ``xor&a=R3&b=G3`` and ``xor&a=G3&b=R3`` share one file.
+
+The upload is decoded once per image into ``transforms/decoded.npy`` and then
+memory-mapped, so repeated transforms on a large image only touch the planes
+they read. Work runs in a small bounded thread pool shared by the gunicorn
+worker; the route is rate-limited on top of that.
+"""
+
+import functools
+import os
+import re
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from .analyzers.pil_utils import load_image_array
+from .config import TRANSFORM_TIMEOUT, TRANSFORM_WORKERS
+
+# Sub-folder of RESULT_FOLDER/<image hash> holding the decoded array and the
+# cached transform outputs. Per image, not per submission: the pixels are the
+# same whatever filename or password they were uploaded with.
+TRANSFORM_DIRNAME = "transforms"
+_DECODED_NAME = "decoded.npy"
+
+# Operations taking two bit-plane operands; commutative, so operands are
+# sorted into the canonical key.
+_BINARY_OPS = {
+    "xor": np.bitwise_xor,
+    "and": np.bitwise_and,
+    "or": np.bitwise_or,
+}
+ALLOWED_OPS = frozenset({"plane", "planes", "remap", *_BINARY_OPS})
+# Seeded random LUT remaps (the colour remapping analyzer's output, on
+# demand); the seed range bounds the number of distinct cache files.
+MAX_REMAP_SEED = 255
+
+# Channel letters by decoded channel count (grayscale arrays get one axis).
+_CHANNEL_LAYOUTS = {
+    1: "L",
+    2: "LA",
+    3: "RGB",
+    4: "RGBA",
+}
+_PLANE_RE = re.compile(r"^([RGBAL])([0-7])$")
+_MASK_RE = re.compile(r"^(?:[0-9a-f]{2}){1,4}$")
+_GRAYSCALE_DIMENSIONS = 2
+_RGB_CHANNELS = 3
+
+# Decoded arrays kept memory-mapped per process; a result page only ever
+# works on one image at a time, so a handful covers concurrent users.
+_DECODED_CACHE_SIZE = 8
+
+_pool = ThreadPoolExecutor(max_workers=TRANSFORM_WORKERS, thread_name_prefix="transform")
+
+
+class TransformError(ValueError):
+    """A transform request that cannot be served (bad op or undecodable image)."""
+
+
+@dataclass(frozen=True, slots=True)
+class TransformOp:
+    """A parsed, validated transform request."""
+
+    op: str
+    operands: tuple[str, ...] = ()
+    mask: str = ""
+    seed: int | None = None
+
+    @property
+    def key(self) -> str:
+        """Canonical name of the op, used as the cache file stem."""
+        parts = [self.op, *self.operands]
+        if self.mask:
+            parts.append(self.mask)
+        if self.seed is not None:
+            parts.append(str(self.seed))
+        return "-".join(parts)
+
+
+def _parse_plane(value: str | None, name: str) -> str:
+    """Validate a ``<channel><bit>`` operand such as ``R3``."""
+    plane = (value or "").strip().upper()
+    if not _PLANE_RE.match(plane):
+        msg = f"Parameter '{name}' must be a channel letter (R, G, B, A, L) and a bit 0-7."
+        raise TransformError(msg)
+    return plane
+
+
+def parse_transform(args: Mapping[str, str]) -> TransformOp:
+    """Turn query arguments into a :class:`TransformOp`; raise on anything else."""
+    op = (args.get("op") or "").strip().lower()
+    if op not in ALLOWED_OPS:
+        msg = f"Unknown op; expected one of: {', '.join(sorted(ALLOWED_OPS))}."
+        raise TransformError(msg)
+    if op == "plane":
+        return TransformOp(op, (_parse_plane(args.get("a"), "a"),))
+    if op == "planes":
+        mask = (args.get("mask") or "").strip().lower()
+        if not _MASK_RE.match(mask):
+            msg = "Parameter 'mask' must be one hex byte per channel, e.g. 010000."
+            raise TransformError(msg)
+        return TransformOp(op, mask=mask)
+    if op == "remap":
+        seed = (args.get("seed") or "").strip()
+        if not (seed.isascii() and seed.isdigit()) or int(seed) > MAX_REMAP_SEED:
+            msg = f"Parameter 'seed' must be an integer between 0 and {MAX_REMAP_SEED}."
+            raise TransformError(msg)
+        return TransformOp(op, seed=int(seed))
+    operands = sorted((_parse_plane(args.get("a"), "a"), _parse_plane(args.get("b"), "b")))
+    return TransformOp(op, tuple(operands))
+
+
+def _decoded_path(cache_dir: Path) -> Path:
+    return cache_dir / _DECODED_NAME
+
+
+def _tmp_path(target: Path) -> Path:
+    """Per-writer temp name, so two requests racing on one key never share it."""
+    return target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _decode_to_npy(source: Path, cache_dir: Path) -> Path:
+    """Decode ``source`` once into ``decoded.npy`` (atomically) and return its path."""
+    target = _decoded_path(cache_dir)
+    if target.exists():
+        return target
+    loaded = load_image_array(source)
+    if loaded.error is not None or loaded.array is None:
+        error = (loaded.error or {}).get("error", "Image could not be loaded.")
+        raise TransformError(error)
+    array = loaded.array
+    if array.ndim == _GRAYSCALE_DIMENSIONS:
+        array = array[..., np.newaxis]
+    if array.dtype != np.uint8 or array.shape[2] not in _CHANNEL_LAYOUTS:
+        msg = "Only 8-bit images with up to four channels can be transformed."
+        raise TransformError(msg)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(target)
+    with tmp.open("wb") as handle:
+        np.save(handle, np.ascontiguousarray(array))
+    tmp.replace(target)
+    return target
+
+
+@functools.lru_cache(maxsize=_DECODED_CACHE_SIZE)
+def _open_decoded(path_str: str, mtime_ns: int) -> np.ndarray:
+    """Memory-map a decoded array, cached on (path, mtime)."""
+    _ = mtime_ns
+    return np.load(path_str, mmap_mode="r")
+
+
+def load_decoded(source: Path, cache_dir: Path) -> np.ndarray:
+    """Return the ``(h, w, channels)`` uint8 array of ``source``, decoding on first use."""
+    path = _decode_to_npy(source, cache_dir)
+    return _open_decoded(str(path), path.stat().st_mtime_ns)
+
+
+def _bit_plane(array: np.ndarray, plane: str) -> np.ndarray:
+    """Return the 0/1 plane named ``plane`` (e.g. ``R3``) as uint8."""
+    layout = _CHANNEL_LAYOUTS[array.shape[2]]
+    channel, bit = plane[0], int(plane[1])
+    if channel not in layout:
+        msg = f"Channel {channel} is not present in this image ({layout})."
+        raise TransformError(msg)
+    return (array[..., layout.index(channel)] >> bit) & 1
+
+
+def _masked_planes(array: np.ndarray, mask: str) -> Image.Image:
+    """Keep only the masked bits of each channel, lit to full intensity."""
+    masks = bytes.fromhex(mask)
+    channels = array.shape[2]
+    if len(masks) != channels:
+        layout = _CHANNEL_LAYOUTS[channels]
+        msg = f"Parameter 'mask' needs {channels} hex byte(s), one per channel ({layout})."
+        raise TransformError(msg)
+    lit = (array & np.frombuffer(masks, dtype=np.uint8)) != 0
+    if channels < _RGB_CHANNELS:
+        return Image.fromarray(lit[..., 0].astype(np.uint8) * 255, mode="L")
+    rgb = lit[..., :_RGB_CHANNELS].astype(np.uint8) * 255
+    return Image.fromarray(rgb, mode="RGB")
+
+
+def _remapped(array: np.ndarray, seed: int) -> Image.Image:
+    """Map colour channels through one seeded random LUT, keeping alpha."""
+    lut = np.random.default_rng(seed).integers(0, 256, size=256, dtype=np.uint8)
+    layout = _CHANNEL_LAYOUTS[array.shape[2]]
+    remapped = np.array(array)
+    colour = [i for i, channel in enumerate(layout) if channel != "A"]
+    remapped[..., colour] = lut[array[..., colour]]
+    if remapped.shape[2] == 1:
+        return Image.fromarray(remapped[..., 0], mode="L")
+    return Image.fromarray(remapped, mode=layout)
+
+
+def evaluate(array: np.ndarray, op: TransformOp) -> Image.Image:
+    """Evaluate ``op`` on a decoded ``(h, w, channels)`` array."""
+    if op.op == "planes":
+        return _masked_planes(array, op.mask)
+    if op.op == "remap":
+        return _remapped(array, op.seed or 0)
+    if op.op == "plane":
+        plane = _bit_plane(array, op.operands[0])
+    else:
+        first, second = (_bit_plane(array, operand) for operand in op.operands)
+        plane = _BINARY_OPS[op.op](first, second)
+    return Image.fromarray(plane * np.uint8(255), mode="L")
+
+
+def _render(source: Path, cache_dir: Path, op: TransformOp, output: Path) -> Path:
+    """Compute and atomically store one transform output."""
+    image = evaluate(load_decoded(source, cache_dir), op)
+    tmp = _tmp_path(output)
+    image.save(tmp, format="PNG")
+    tmp.replace(output)
+    return output
+
+
+def run_transform(source: Path, cache_dir: Path, op: TransformOp) -> Path:
+    """Return the cached PNG for ``op`` on ``source``, computing it in the pool if needed.
+
+    Raises :class:`TransformError` for undecodable images or operands the image
+    lacks, and :class:`TimeoutError` when the pool cannot finish in time.
+    """
+    output = cache_dir / f"{op.key}.png"
+    if output.exists():
+        return output
+    future = _pool.submit(_render, source, cache_dir, op, output)
+    try:
+        return future.result(timeout=TRANSFORM_TIMEOUT)
+    except FutureTimeoutError:
+        msg = f"Transform did not finish within {TRANSFORM_TIMEOUT}s"
+        raise TimeoutError(msg) from None
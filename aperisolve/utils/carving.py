@@ -0,0 +1,391 @@
+"""Find and size files embedded in an upload with one signature scan.
+
+The upload is memory-mapped and searched for the magic bytes of every
+supported format (PNG, JPEG, ZIP, PDF, 7z, gzip, RAR and ELF): one
+``find`` loop per magic, which runs at memory speed where a combined regex
+alternation costs the interpreter per byte, lazily merged into a single
+stream of hits in file order. Each hit is validated by parsing its header, and sized
+from the format's own structure where it records one: the PNG chunk chain
+up to IEND, the JPEG segments up to EOI, the ZIP end of central directory,
+the last PDF ``%%EOF``, the 7z start header, the end of the gzip stream or
+the ELF header tables. A file of unknown size is carved up to the next
+signature or the end of the upload. Every read is bounded by
+``MAX_CARVE_SIZE``, and all the gzip hits of one scan share a single
+``MAX_INFLATED_SIZE`` budget of inflated bytes (however many headers point at
+one deflate bomb), so the scan costs one pass over the upload plus a bounded
+parse per hit.
+
+Hits inside an already sized file of the same format (the entries of a ZIP,
+the EXIF thumbnail of a JPEG) are part of it and skipped. Whatever starts
+at offset 0 is the upload itself; anything after it is embedded, which is
+what :func:`is_embedded` reports to gate binwalk and foremost.
+"""
+
+import functools
+import heapq
+import mmap
+import re
+import struct
+import zlib
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+from typing import NamedTuple
+
+# Mirror binwalk's --size and --count extraction caps.
+MAX_CARVE_SIZE = 10 * 1024 * 1024
+MAX_CARVES = 100
+# Decompressed bytes inflated to find the ends of the gzip streams of one
+# scan, all hits together, and the input fed per step. A stream that does
+# not end within what is left is not carved.
+MAX_INFLATED_SIZE = 1 << 27
+INFLATE_SLICE = 1 << 16
+# Tag added to the file-type tags of an upload embedding other files.
+EMBEDDED_TAG = "embedded"
+
+# Bound on distinct uploads remembered by the cached entrypoint.
+_CACHE_SIZE = 256
+
+
+class Carve(NamedTuple):
+    """A validated signature: where it starts, what it is and, if known, its size."""
+
+    offset: int
+    kind: str
+    size: int | None
+    description: str
+
+
+# Uploads are scanned through a memory map; tests pass plain bytes.
+Buffer = bytes | mmap.mmap
+# What a parser returns for a valid header: the size (None when unknown)
+# and a description; None rejects the hit.
+Parsed = tuple[int | None, str] | None
+
+_PNG_SIGNATURE = 8
+_PNG_CHUNK_OVERHEAD = 12
+_IHDR_LENGTH = 13
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_JPEG_SOS = 0xDA
+_JPEG_EOI = 0xD9
+_JPEG_MIN_SEGMENT_MARKER = 0xC0
+_JPEG_PREFIX = 0xFF
+# In entropy-coded data, 0xFF is followed by a stuffed 0x00, a restart
+# marker or fill bytes; anything else is the next marker.
+_JPEG_MARKER = re.compile(rb"\xff[^\x00\xd0-\xd7\xff]")
+_ZIP_LOCAL = struct.Struct("<4sHHHHHIIIHH")
+_ZIP_EOCD = struct.Struct("<4sHHHHIIH")
+_ZIP_METHODS = frozenset({0, 1, 6, 8, 9, 12, 14, 93, 95, 98, 99})
+_ZIP_MAX_VERSION = 63
+_ZIP_MAX_NAME = 1024
+_PDF_VERSION = re.compile(rb"%PDF-(\d\.\d)")
+_PDF_EOF = b"%%EOF"
+_7Z_HEADER = struct.Struct("<6sBBIQQI")
+_GZIP_HEADER = 10
+_GZIP_RESERVED_FLAGS = 0xE0
+_GZIP_FEXTRA = 0x04
+_GZIP_FNAME = 0x08
+_GZIP_MAX_NAME = 256
+_ELF_IDENT = 16
+_ELF_HEADERS = {
+    1: struct.Struct("HHIIIIIHHHHHH"),
+    2: struct.Struct("HHIQQQIHHHHHH"),
+}
+_ELF_TYPES = {1: "relocatable", 2: "executable", 3: "shared object", 4: "core file"}
+
+
+def _parse_png(data: Buffer, offset: int) -> Parsed:
+    """Check the IHDR, then walk the chunk chain to IEND."""
+    length, ctype, width, height = struct.unpack_from(">I4sII", data, offset + _PNG_SIGNATURE)
+    if ctype != b"IHDR" or length != _IHDR_LENGTH:
+        return None
+    description = f"PNG image, {width} x {height}"
+    pos = offset + _PNG_SIGNATURE
+    end = min(len(data), offset + MAX_CARVE_SIZE)
+    while pos + _PNG_CHUNK_OVERHEAD <= end:
+        length, ctype = struct.unpack_from(">I4s", data, pos)
+        if not ctype.isalpha():
+            break
+        pos += _PNG_CHUNK_OVERHEAD + length
+        if ctype == b"IEND":
+            return min(pos, len(data)) - offset, description
+    return None, description
+
+
+def _jpeg_markers(data: Buffer, offset: int, end: int) -> Iterator[tuple[int, int]]:
+    """Yield the position and type of each JPEG marker, skipping entropy-coded data."""
+    pos = offset + 2
+    while pos + 2 <= end and data[pos] == _JPEG_PREFIX:
+        marker = data[pos + 1]
+        yield pos, marker
+        if marker == _JPEG_PREFIX:
+            pos += 1
+            continue
+        if marker == _JPEG_EOI or pos + 4 > end:
+            return
+        (length,) = struct.unpack_from(">H", data, pos + 2)
+        pos += 2 + length
+        if marker == _JPEG_SOS:
+            found = _JPEG_MARKER.search(data, pos, end)
+            if found is None:
+                return
+            pos = found.start()
+
+
+def _parse_jpeg(data: Buffer, offset: int) -> Parsed:
+    """Walk the JPEG segments to EOI."""
+    # The first segment must be well formed and followed by another marker.
+    if data[offset + 3] < _JPEG_MIN_SEGMENT_MARKER:
+        return None
+    (first,) = struct.unpack_from(">H", data, offset + 4)
+    if data[offset + 4 + first] != _JPEG_PREFIX:
+        return None
+    description = "JPEG image"
+    for pos, marker in _jpeg_markers(data, offset, min(len(data), offset + MAX_CARVE_SIZE)):
+        if marker == _JPEG_EOI:
+            return pos + 2 - offset, description
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack_from(">HH", data, pos + 5)
+            description = f"JPEG image, {width} x {height}"
+    return None, description
+
+
+def _parse_zip(data: Buffer, offset: int) -> Parsed:
+    """Check the first local file header; size from the end of central directory."""
+    fields = _ZIP_LOCAL.unpack_from(data, offset)
+    version, flags, method, name_length = fields[1], fields[2], fields[3], fields[9]
+    if version > _ZIP_MAX_VERSION or method not in _ZIP_METHODS:
+        return None
+    if not 0 < name_length <= _ZIP_MAX_NAME:
+        return None
+    start = offset + _ZIP_LOCAL.size
+    name = bytes(data[start : start + name_length]).decode("utf-8", errors="replace")
+    description = f"Zip archive, first entry {name!r}"
+    if flags & 1:
+        description += ", encrypted"
+    eocd = data.find(b"PK\x05\x06", start, offset + MAX_CARVE_SIZE)
+    if eocd < 0 or eocd + _ZIP_EOCD.size > len(data):
+        return None, description
+    comment_length = _ZIP_EOCD.unpack_from(data, eocd)[-1]
+    return min(eocd + _ZIP_EOCD.size + comment_length, len(data)) - offset, description
+
+
+def _parse_pdf(data: Buffer, offset: int) -> Parsed:
+    """Check the version; size up to the last ``%%EOF`` marker."""
+    version = _PDF_VERSION.match(data, offset)
+    if version is None:
+        return None
+    description = f"PDF document, version {version.group(1).decode()}"
+    last = data.rfind(_PDF_EOF, offset, offset + MAX_CARVE_SIZE)
+    if last < 0:
+        return None, description
+    end = last + len(_PDF_EOF)
+    for eol in (b"\r\n", b"\n", b"\r"):
+        if bytes(data[end : end + len(eol)]) == eol:
+            end += len(eol)
+            break
+    return end - offset, description
+
+
+def _parse_7z(data: Buffer, offset: int) -> Parsed:
+    """Check the start header CRC; size from the next header position."""
+    _, major, minor, crc, next_offset, next_size, _ = _7Z_HEADER.unpack_from(data, offset)
+    if zlib.crc32(bytes(data[offset + 12 : offset + _7Z_HEADER.size])) != crc:
+        return None
+    return _7Z_HEADER.size + next_offset + next_size, f"7-Zip archive, version {major}.{minor}"
+
+
+def _gzip_name(data: Buffer, offset: int, flags: int) -> str:
+    """Return the original file name stored in a gzip header, if any."""
+    if not flags & _GZIP_FNAME:
+        return ""
+    pos = offset + _GZIP_HEADER
+    if flags & _GZIP_FEXTRA:
+        (extra,) = struct.unpack_from("<H", data, pos)
+        pos += 2 + extra
+    stop = data.find(b"\0", pos, pos + _GZIP_MAX_NAME)
+    if stop < 0:
+        return ""
+    return bytes(data[pos:stop]).decode("latin-1")
+
+
+class _InflateBudget:
+    """Decompressed bytes the gzip hits of one scan may still inflate."""
+
+    def __init__(self, left: int) -> None:
+        self.left = left
+
+
+def _parse_gzip(data: Buffer, offset: int, budget: _InflateBudget | None = None) -> Parsed:
+    """Check the flags, then inflate (output discarded) to find the end of the stream.
+
+    The inflated bytes are taken from ``budget`` (shared by a scan's hits,
+    ``MAX_INFLATED_SIZE`` for this stream alone by default); a stream that
+    does not end within it is rejected.
+    """
+    if budget is None:
+        budget = _InflateBudget(MAX_INFLATED_SIZE)
+    flags = data[offset + 3]
+    if flags & _GZIP_RESERVED_FLAGS:
+        return None
+    name = _gzip_name(data, offset, flags)
+    description = f"gzip compressed data, name {name!r}" if name else "gzip compressed data"
+    inflater = zlib.decompressobj(wbits=31)
+    end = min(len(data), offset + MAX_CARVE_SIZE)
+    try:
+        for pos in range(offset, end, INFLATE_SLICE):
+            chunk = bytes(data[pos : min(pos + INFLATE_SLICE, end)])
+            while chunk and not inflater.eof:
+                budget.left -= len(inflater.decompress(chunk, INFLATE_SLICE))
+                if budget.left < 0:
+                    return None
+                chunk = inflater.unconsumed_tail
+            if inflater.eof:
+                return min(pos + INFLATE_SLICE, end) - len(inflater.unused_data) - offset, (
+                    description
+                )
+    except zlib.error:
+        return None
+    return None, description
+
+
+def _parse_rar(version: int) -> Callable[[Buffer, int], Parsed]:
+    """Return a parser for a RAR signature (the magic is the whole check)."""
+
+    def parse(data: Buffer, offset: int) -> Parsed:
+        _ = data, offset
+        return None, f"RAR archive, version {version}"
+
+    return parse
+
+
+def _parse_elf(data: Buffer, offset: int) -> Parsed:
+    """Check the identification bytes; size from the header tables."""
+    elf_class, encoding, ident_version = data[offset + 4], data[offset + 5], data[offset + 6]
+    if elf_class not in _ELF_HEADERS or encoding not in (1, 2) or ident_version != 1:
+        return None
+    header = _ELF_HEADERS[elf_class]
+    fields = struct.unpack_from(("<" if encoding == 1 else ">") + header.format, data, offset + 16)
+    e_type, e_version, phoff, shoff = fields[0], fields[2], fields[4], fields[5]
+    ehsize, phentsize, phnum, shentsize, shnum = fields[7], *fields[8:12]
+    if e_version != 1 or ehsize != _ELF_IDENT + header.size:
+        return None
+    description = (
+        f"ELF {32 * elf_class}-bit {'LSB' if encoding == 1 else 'MSB'} "
+        f"{_ELF_TYPES.get(e_type, 'file')}"
+    )
+    size = max(ehsize, phoff + phentsize * phnum, shoff + shentsize * shnum)
+    return size, description
+
+
+_SIGNATURES: tuple[tuple[bytes, str, Callable[[Buffer, int], Parsed]], ...] = (
+    (b"\x89PNG\r\n\x1a\n", "png", _parse_png),
+    (b"\xff\xd8\xff", "jpg", _parse_jpeg),
+    (b"PK\x03\x04", "zip", _parse_zip),
+    (b"%PDF-", "pdf", _parse_pdf),
+    (b"7z\xbc\xaf\x27\x1c", "7z", _parse_7z),
+    (b"\x1f\x8b\x08", "gz", _parse_gzip),
+    (b"Rar!\x1a\x07\x00", "rar", _parse_rar(4)),
+    (b"Rar!\x1a\x07\x01\x00", "rar", _parse_rar(5)),
+    (b"\x7fELF", "elf", _parse_elf),
+)
+
+
+def _positions(data: Buffer, magic: bytes, index: int) -> Iterator[tuple[int, int]]:
+    """Yield ``(offset, index)`` for every occurrence of ``magic``."""
+    pos = data.find(magic)
+    while pos >= 0:
+        yield pos, index
+        pos = data.find(magic, pos + 1)
+
+
+def _hits(data: Buffer) -> Iterator[tuple[int, int]]:
+    """Yield ``(offset, signature index)`` of every magic, in file order."""
+    return heapq.merge(
+        *(_positions(data, magic, index) for index, (magic, _, _) in enumerate(_SIGNATURES)),
+    )
+
+
+def _inside(carves: list[Carve], kind: str, offset: int) -> bool:
+    """Return whether ``offset`` lies in an already sized carve of this kind."""
+    return any(
+        carve.kind == kind and carve.size and carve.offset < offset < carve.offset + carve.size
+        for carve in carves
+    )
+
+
+def scan(data: Buffer) -> list[Carve]:
+    """Return the validated signatures of ``data`` (bytes or an mmap), in file order."""
+    budget = _InflateBudget(MAX_INFLATED_SIZE)
+    parsers = [
+        functools.partial(_parse_gzip, budget=budget) if parse is _parse_gzip else parse
+        for _, _, parse in _SIGNATURES
+    ]
+    carves: list[Carve] = []
+    for offset, index in _hits(data):
+        kind, parse = _SIGNATURES[index][1], parsers[index]
+        if _inside(carves, kind, offset):
+            continue
+        try:
+            parsed = parse(data, offset)
+        except (struct.error, IndexError):
+            # A header cut short by the end of the upload.
+            continue
+        if parsed is None:
+            continue
+        size, description = parsed
+        carves.append(Carve(offset, kind, size, description))
+        if len(carves) >= MAX_CARVES:
+            break
+    return carves
+
+
+def extents(carves: Sequence[Carve], total: int) -> list[int]:
+    """Return the number of bytes to carve for each carve of a ``total``-byte upload.
+
+    A known size is trusted up to the end of the upload; an unknown one runs
+    to the next carve or the end of the upload. Both are capped at
+    ``MAX_CARVE_SIZE``.
+    """
+    sizes = []
+    for i, carve in enumerate(carves):
+        stop = next(
+            (later.offset for later in carves[i + 1 :] if later.offset > carve.offset),
+            total,
+        )
+        size = carve.size if carve.size is not None else stop - carve.offset
+        sizes.append(min(size, total - carve.offset, MAX_CARVE_SIZE))
+    return sizes
+
+
+def is_embedded(carves: Sequence[Carve]) -> bool:
+    """Return whether any file starts after the beginning of the upload."""
+    return any(carve.offset > 0 for carve in carves)
+
+
+def scan_file_uncached(path: Path) -> tuple[Carve, ...]:
+    """Scan ``path`` through a read-only memory map."""
+    with path.open("rb") as handle:
+        if not path.stat().st_size:
+            return ()
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return tuple(scan(data))
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _scan_cached(path_str: str, mtime_ns: int, size: int) -> tuple[Carve, ...]:
+    """Return the cached scan keyed on (path, mtime, size)."""
+    _ = (mtime_ns, size)
+    return scan_file_uncached(Path(path_str))
+
+
+def scan_file(path: Path) -> tuple[Carve, ...]:
+    """Scan ``path``, memoized on (path, mtime, size); unreadable files have no carves.
+
+    The worker scans every upload to gate the external carvers, and the
+    carving analyzer reuses that result.
+    """
+    try:
+        stat = path.stat()
+        return _scan_cached(str(path), stat.st_mtime_ns, stat.st_size)
+    except (OSError, ValueError):
+        return ()
@@ -0,0 +1,309 @@
+"""Solve CRC-32 checksums for unknown 32-bit fields.
+
+For messages of a fixed length, CRC-32 is affine over GF(2):
+``crc(a ^ b ^ c) == crc(a) ^ crc(b) ^ crc(c)``. The checksum of a message
+with one unknown 32-bit big-endian field is therefore
+``crc(message with the field zeroed) ^ L(field)``, where ``L`` is a linear
+map fixed by the number of bytes after the field. ``L`` is a bijection on
+32-bit words (it multiplies by a power of ``x`` modulo the CRC polynomial),
+so exactly one field value matches any checksum. It is found by applying the
+precomputed inverse of ``L``: a 32 x 32 bit matrix, stored as the images of
+the 32 unit vectors, so a solve costs one CRC and 32 XORs at most.
+
+The field solved for can also be expressed as a function of a second field:
+it is affine in it too, so :func:`solve_u32_batch` derives the first field
+for a whole array of values of the second one with four table lookups per
+value. The same tables run forwards in :func:`crc32_u32_fields`, which
+checksums a message for whole arrays of field values at once.
+
+Inserting bytes changes the length, but stays tractable: the difference an
+insertion makes to the checksum is carried to the end of the message by
+multiplying it by ``x**(8 * n)``, as ``crc32_combine`` does
+(:func:`crc32_shift`). :func:`solve_insertions` uses that to find which
+positions of a message lost a byte, searching 32-bit differences only and
+meeting in the middle.
+"""
+
+import functools
+import itertools
+import math
+import zlib
+from collections.abc import Iterator, Sequence
+
+import numpy as np
+
+WORD_BITS = 32
+_BYTE_TABLES = 4
+
+
+def _apply(columns: tuple[int, ...], value: int) -> int:
+    """Apply the GF(2) matrix given by its column images to ``value``."""
+    out = 0
+    bit = 0
+    while value:
+        if value & 1:
+            out ^= columns[bit]
+        value >>= 1
+        bit += 1
+    return out
+
+
+@functools.cache
+def _field_images(length: int, offset: int) -> tuple[int, ...]:
+    """Linear CRC-32 part of each bit of the 32-bit field at ``offset``."""
+    zero = zlib.crc32(bytes(length))
+    images = []
+    for bit in range(WORD_BITS):
+        message = bytearray(length)
+        message[offset : offset + 4] = (1 << bit).to_bytes(4, "big")
+        images.append(zlib.crc32(message) ^ zero)
+    return tuple(images)
+
+
+@functools.cache
+def _inverse(length: int, offset: int) -> tuple[int, ...]:
+    """Return the field values whose CRC-32 linear parts are the unit vectors.
+
+    Gauss-Jordan elimination over (image, preimage) pairs: once reduced, row
+    ``bit`` maps its preimage to ``1 << bit``.
+    """
+    rows = [(image, 1 << bit) for bit, image in enumerate(_field_images(length, offset))]
+    for bit in range(WORD_BITS):
+        pivot = next(k for k in range(bit, WORD_BITS) if rows[k][0] >> bit & 1)
+        rows[bit], rows[pivot] = rows[pivot], rows[bit]
+        image, preimage = rows[bit]
+        for k in range(WORD_BITS):
+            if k != bit and rows[k][0] >> bit & 1:
+                rows[k] = (rows[k][0] ^ image, rows[k][1] ^ preimage)
+    return tuple(preimage for _, preimage in rows)
+
+
+@functools.cache
+def _transfer_tables(length: int, offset: int, vary_offset: int) -> np.ndarray:
+    """Tabulate, per byte, how a change at ``vary_offset`` moves the solution at ``offset``."""
+    inverse = _inverse(length, offset)
+    columns = tuple(_apply(inverse, image) for image in _field_images(length, vary_offset))
+    tables = np.empty((_BYTE_TABLES, 256), dtype=np.uint32)
+    for k in range(_BYTE_TABLES):
+        for byte in range(256):
+            tables[k, byte] = _apply(columns, byte << (8 * k))
+    return tables
+
+
+@functools.cache
+def _field_tables(length: int, offset: int) -> np.ndarray:
+    """Tabulate, per byte, the CRC-32 linear part of the field at ``offset``."""
+    images = _field_images(length, offset)
+    tables = np.empty((_BYTE_TABLES, 256), dtype=np.uint32)
+    for k in range(_BYTE_TABLES):
+        for byte in range(256):
+            tables[k, byte] = _apply(images, byte << (8 * k))
+    return tables
+
+
+def _zeroed(message: bytes, *offsets: int) -> bytes:
+    """Copy ``message`` with the 32-bit fields at ``offsets`` cleared."""
+    out = bytearray(message)
+    for offset in offsets:
+        out[offset : offset + 4] = bytes(4)
+    return bytes(out)
+
+
+def solve_u32(message: bytes, offset: int, crc: int) -> int:
+    """Return the big-endian 32-bit value at ``offset`` giving ``message`` this CRC-32.
+
+    The bytes currently at ``offset`` are ignored. The answer always exists
+    and is unique.
+    """
+    base = zlib.crc32(_zeroed(message, offset))
+    return _apply(_inverse(len(message), offset), crc ^ base)
+
+
+def solve_u32_batch(
+    message: bytes,
+    offset: int,
+    vary_offset: int,
+    values: np.ndarray,
+    crc: int,
+) -> np.ndarray:
+    """Solve the field at ``offset`` for each value of the field at ``vary_offset``.
+
+    Returns a uint32 array: entry ``i`` is the value that, with ``values[i]``
+    written at ``vary_offset``, gives ``message`` the CRC-32 ``crc``.
+    """
+    base = zlib.crc32(_zeroed(message, offset, vary_offset))
+    const = _apply(_inverse(len(message), offset), crc ^ base)
+    tables = _transfer_tables(len(message), offset, vary_offset)
+    values = np.asarray(values, dtype=np.uint32)
+    out = np.full(values.shape, const, dtype=np.uint32)
+    for k in range(_BYTE_TABLES):
+        out ^= tables[k][(values >> np.uint32(8 * k)) & np.uint32(0xFF)]
+    return out
+
+
+def crc32_u32_fields(message: bytes, fields: dict[int, np.ndarray]) -> np.ndarray:
+    """Return the CRC-32 of ``message`` for arrays of big-endian 32-bit field values.
+
+    ``fields`` maps offsets to value arrays, broadcast against each other;
+    the bytes currently at those offsets are ignored.
+    """
+    arrays = [np.asarray(values, dtype=np.uint32) for values in fields.values()]
+    out = np.full(
+        np.broadcast_shapes(*(a.shape for a in arrays)),
+        zlib.crc32(_zeroed(message, *fields)),
+        dtype=np.uint32,
+    )
+    for offset, values in zip(fields, arrays, strict=True):
+        tables = _field_tables(len(message), offset)
+        for k in range(_BYTE_TABLES):
+            out ^= tables[k][(values >> np.uint32(8 * k)) & np.uint32(0xFF)]
+    return out
+
+
+@functools.cache
+def _shift_images(power: int) -> tuple[int, ...]:
+    """Linear CRC-32 part of appending ``2**power`` zero bytes, per state bit."""
+    if power == 0:
+        zero = zlib.crc32(b"\0", 0)
+        return tuple(zlib.crc32(b"\0", 1 << bit) ^ zero for bit in range(WORD_BITS))
+    half = _shift_images(power - 1)
+    return tuple(_apply(half, image) for image in half)
+
+
+def crc32_shift(delta: int, nbytes: int) -> int:
+    """Carry a CRC-32 difference across ``nbytes`` more message bytes.
+
+    If two messages of equal length have checksums differing by ``delta``,
+    appending the same ``nbytes`` bytes to both leaves them differing by the
+    returned value, whatever those bytes are.
+    """
+    power = 0
+    while nbytes:
+        if nbytes & 1:
+            delta = _apply(_shift_images(power), delta)
+        nbytes >>= 1
+        power += 1
+    return delta
+
+
+@functools.cache
+def _shift_tables(nbytes: int) -> np.ndarray:
+    """Tabulate :func:`crc32_shift` by ``nbytes`` per byte of the difference."""
+    images = tuple(crc32_shift(1 << bit, nbytes) for bit in range(WORD_BITS))
+    tables = np.empty((_BYTE_TABLES, 256), dtype=np.uint32)
+    for k in range(_BYTE_TABLES):
+        for byte in range(256):
+            tables[k, byte] = _apply(images, byte << (8 * k))
+    return tables
+
+
+def _shift_array(deltas: np.ndarray, nbytes: int) -> np.ndarray:
+    """Apply :func:`crc32_shift` to a uint32 array of differences."""
+    tables = _shift_tables(nbytes)
+    out = np.zeros_like(deltas)
+    for k in range(_BYTE_TABLES):
+        out ^= tables[k][(deltas >> np.uint32(8 * k)) & np.uint32(0xFF)]
+    return out
+
+
+def insertion_search_size(n_positions: int, count: int) -> int:
+    """Return how many subset differences :func:`solve_insertions` tabulates."""
+    left = n_positions // 2
+    right = n_positions - left
+    return sum(math.comb(left, r) for r in range(min(count, left) + 1)) + sum(
+        math.comb(right, r) for r in range(min(count, right) + 1)
+    )
+
+
+def _subset_deltas(effects: Sequence[int], max_size: int) -> list[np.ndarray]:
+    """Tabulate the difference made by each subset of ``effects``, by subset size.
+
+    Entry ``r`` lists every ``r``-subset; an insertion is shifted once per
+    insertion after it in the subset. Subsets are built from the last effect
+    backwards: a subset either skips the next effect, or takes it first and
+    shifts it past the ``r - 1`` it is followed by. Both halves are kept in
+    that order, which :func:`_subset` inverts.
+    """
+    tables = [np.zeros(1, dtype=np.uint32)] + [np.zeros(0, dtype=np.uint32)] * max_size
+    for effect in reversed(effects):
+        tables = [tables[0]] + [
+            np.concatenate([tables[r], np.uint32(crc32_shift(effect, r - 1)) ^ tables[r - 1]])
+            for r in range(1, max_size + 1)
+        ]
+    return tables
+
+
+def _subset(n_effects: int, size: int, index: int) -> list[int]:
+    """Return the members of entry ``index`` of the ``size``-subsets table."""
+    members = []
+    for j in range(n_effects):
+        skipped = math.comb(n_effects - j - 1, size)
+        if index < skipped:
+            continue
+        members.append(j)
+        index -= skipped
+        size -= 1
+    return members
+
+
+def insert_at(message: bytes, positions: Sequence[int], inserted: bytes) -> bytes:
+    """Insert ``inserted`` before each of the ascending ``positions`` of ``message``."""
+    parts = []
+    done = 0
+    for position in positions:
+        parts += [message[done:position], inserted]
+        done = position
+    parts.append(message[done:])
+    return b"".join(parts)
+
+
+def solve_insertions(
+    message: bytes,
+    positions: Sequence[int],
+    count: int,
+    crc: int,
+    inserted: bytes = b"\r",
+) -> Iterator[tuple[int, ...]]:
+    """Yield the ``count``-subsets of ``positions`` where inserting ``inserted`` gives ``crc``.
+
+    Positions are message offsets, in ascending order; the byte is inserted
+    before the byte at each. Each candidate costs one CRC over a single
+    byte plus a shift, and subsets are only combined through their 32-bit
+    differences: the positions are split in two halves, every subset of
+    each half is tabulated (see :func:`insertion_search_size`), and the
+    halves are matched by sorting, equal differences included.
+
+    A CRC is all that tells subsets apart, so among C(n, count) subsets
+    about C(n, count) / 2**32 match by coincidence, and are yielded too:
+    callers bound the search well below 2**32 subsets, or check candidates
+    some other way.
+    """
+    target = crc ^ zlib.crc32(message)
+    effects = []
+    state, done = 0, 0
+    for position in positions:
+        state = zlib.crc32(message[done:position], state)
+        done = position
+        local = zlib.crc32(inserted, state) ^ state
+        effects.append(crc32_shift(local, len(message) - position))
+
+    split = len(effects) // 2
+    left, right = effects[:split], effects[split:]
+    left_deltas = _subset_deltas(left, min(count, len(left)))
+    right_deltas = _subset_deltas(right, min(count, len(right)))
+    for n_right in range(max(0, count - len(left)), min(count, len(right)) + 1):
+        # Left insertions are each followed by every right one.
+        shifted = _shift_array(left_deltas[count - n_right], n_right) ^ np.uint32(target)
+        order = np.argsort(right_deltas[n_right], kind="stable")
+        ordered = right_deltas[n_right][order]
+        first = np.searchsorted(ordered, shifted, side="left")
+        last = np.searchsorted(ordered, shifted, side="right")
+        for i in np.flatnonzero(last > first).tolist():
+            for j in order[first[i] : last[i]].tolist():
+                chosen = tuple(
+                    itertools.chain(
+                        (positions[m] for m in _subset(len(left), count - n_right, i)),
+                        (positions[split + m] for m in _subset(len(right), n_right, j)),
+                    ),
+                )
+                yield chosen
@@ -0,0 +1,125 @@
+"""Sorted CRC-32 index of common IHDR chunks, the last resort of PNG repair.
+
+Every combination of a resolution (see :func:`resolution_grid`), valid bit
+depth / colour type pair and interlace method is compiled into one
+``(4, n)`` uint32 array: the IHDR CRCs in ascending order on row 0, then
+the width, the height and the packed parameters
+(``bit_depth << 16 | color_type << 8 | interlace``) of each. The image
+build writes it to ``IHDR_INDEX_FILE``
+(``python -m aperisolve.utils.ihdr_index``); at runtime it is memory-mapped
+and row 0, which is contiguous, is binary searched with ``np.searchsorted``.
+A lookup touches a few pages of the file and no database.
+
+Without the file (a development checkout) the index is built in memory on
+first use instead.
+"""
+
+import functools
+import itertools
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from aperisolve.config import IHDR_INDEX_FILE
+
+from .crc import crc32_u32_fields
+from .utils import get_resolutions, get_valid_depth_color_pairs
+
+CRC_ROW, WIDTH_ROW, HEIGHT_ROW, PARAMS_ROW = range(4)
+INTERLACE_METHODS = (0, 1)
+# Every width and height up to this is indexed, not just common resolutions.
+DENSE_GRID_MAX = 128
+# In the CRC input: chunk type, then width, then height.
+IHDR_WIDTH_OFFSET = 4
+IHDR_HEIGHT_OFFSET = 8
+
+
+def pack_params(bit_depth: int, color_type: int, interlace: int) -> int:
+    """Pack the IHDR parameter bytes into one index word."""
+    return bit_depth << 16 | color_type << 8 | interlace
+
+
+def ihdr_bytes(width: int, height: int, params: int) -> bytes:
+    """Rebuild the 13 bytes of IHDR data of an index entry."""
+    bit_depth, color_type, interlace = params >> 16 & 0xFF, params >> 8 & 0xFF, params & 0xFF
+    return struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, interlace)
+
+
+def resolution_grid() -> np.ndarray:
+    """Return the indexed (width, height) pairs as an ``(n, 2)`` uint32 array.
+
+    The common resolutions of :func:`get_resolutions`, plus every size up to
+    ``DENSE_GRID_MAX`` on both sides (icons, sprites, QR codes).
+    """
+    side = np.arange(1, DENSE_GRID_MAX + 1, dtype=np.uint32)
+    dense = np.stack(np.meshgrid(side, side, indexing="ij"), axis=-1).reshape(-1, 2)
+    common = np.array(get_resolutions(), dtype=np.uint32)
+    return np.unique(np.concatenate([common, dense]), axis=0)
+
+
+def build_index() -> np.ndarray:
+    """Compile the IHDR corpus into the sorted ``(4, n)`` index array.
+
+    CRCs are computed in bulk: one table-driven pass over the whole
+    resolution grid per bit depth, colour type and interlace method.
+    """
+    grid = resolution_grid()
+    blocks = []
+    for (bit_depth, color_type), interlace in itertools.product(
+        get_valid_depth_color_pairs(),
+        INTERLACE_METHODS,
+    ):
+        params = pack_params(bit_depth, color_type, interlace)
+        message = b"IHDR" + ihdr_bytes(0, 0, params)
+        block = np.empty((4, len(grid)), dtype=np.uint32)
+        block[CRC_ROW] = crc32_u32_fields(
+            message,
+            {IHDR_WIDTH_OFFSET: grid[:, 0], IHDR_HEIGHT_OFFSET: grid[:, 1]},
+        )
+        block[WIDTH_ROW], block[HEIGHT_ROW] = grid[:, 0], grid[:, 1]
+        block[PARAMS_ROW] = params
+        blocks.append(block)
+    index = np.concatenate(blocks, axis=1)
+    return np.ascontiguousarray(index[:, np.argsort(index[CRC_ROW], kind="stable")])
+
+
+def write_index(path: Path = IHDR_INDEX_FILE) -> int:
+    """Build the index and save it to ``path``; return the number of entries."""
+    index = build_index()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with tmp.open("wb") as handle:
+        np.save(handle, index)
+    tmp.replace(path)
+    return index.shape[1]
+
+
+@functools.cache
+def load_index() -> np.ndarray:
+    """Memory-map the shipped index, or build it when no file was compiled."""
+    if IHDR_INDEX_FILE.exists():
+        return np.load(IHDR_INDEX_FILE, mmap_mode="r")
+    return build_index()
+
+
+def lookup(crc: int) -> list[bytes]:
+    """Return the IHDR data of every indexed configuration with this CRC."""
+    index = load_index()
+    # A uint32 key keeps the search on the mapped row, without a widened copy.
+    key = np.uint32(crc)
+    start = int(np.searchsorted(index[CRC_ROW], key, side="left"))
+    stop = int(np.searchsorted(index[CRC_ROW], key, side="right"))
+    return [
+        ihdr_bytes(int(width), int(height), int(params))
+        for width, height, params in index[WIDTH_ROW:, start:stop].T
+    ]
+
+
+def main() -> None:
+    """Compile the index file at image build time."""
+    write_index()
+
+
+if __name__ == "__main__":
+    main()
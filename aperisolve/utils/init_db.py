@@ -2,16 +2,30 @@
 
 This script is meant to be run ONCE at deploy time, never from Gunicorn or runtime code.
 If CLEAR_AT_RESTART is set, database will be reset at launch time.
+Tables no model uses any more are dropped at every run, with their data.
 """
 
 from shutil import rmtree
 
 import sentry_sdk
-from sqlalchemy import inspect
+from sqlalchemy import MetaData, Table, inspect
 
 from aperisolve.app import create_app
 from aperisolve.config import CLEAR_AT_RESTART, RESULT_FOLDER
-from aperisolve.models import db, fill_ihdr_db
+from aperisolve.models import db
+
+# Tables of removed models, left behind by earlier releases. ``ihdr`` held the
+# IHDR CRC lookup rows, now a compiled index (aperisolve/utils/ihdr_index.py).
+LEGACY_TABLES = ("ihdr",)
+
+
+def drop_legacy_tables() -> list[str]:
+    """Drop the ``LEGACY_TABLES`` that exist; return their names."""
+    existing = set(inspect(db.engine).get_table_names())
+    dropped = [name for name in LEGACY_TABLES if name in existing]
+    for name in dropped:
+        Table(name, MetaData()).drop(db.engine)
+    return dropped
 
 
 def main() -> None:
@@ -21,6 +35,7 @@ def main() -> None:
     app = create_app()
 
     with app.app_context():
+        drop_legacy_tables()
         inspector = inspect(db.engine)
         tables = inspector.get_table_names()
 
@@ -44,8 +59,6 @@ def main() -> None:
         else:
             pass
 
-        fill_ihdr_db()
-
         RESULT_FOLDER.mkdir(parents=True, exist_ok=True)
 
 
@@ -0,0 +1,89 @@
+"""LSB stream scanning shared by the sample- and pixel-domain analyzers.
+
+A stream is a 1-D array of sample (or pixel channel) bytes. Its low bits are
+unpacked 1 and 2 per byte and re-packed at every bit offset in both bit
+orders, and the start of each candidate is checked for a file signature or
+readable text, like ``zsteg`` does for images. Only the first ``SCAN_BYTES``
+of a candidate are examined, so a scan costs the same for any stream length.
+"""
+
+import re
+
+import numpy as np
+
+# Low bits taken per byte: 1 (classic LSB) and 2 (e.g. WavSteg's default).
+LSB_DEPTHS = (1, 2)
+BIT_ORDERS = {"big": "MSB first", "little": "LSB first"}
+BYTE_BITS = 8
+# Payload bytes examined per candidate stream, and the bits that takes at
+# the worst bit offset.
+SCAN_BYTES = 1024
+SCAN_BITS = SCAN_BYTES * BYTE_BITS + BYTE_BITS - 1
+# A printable run must be this long, and not one repeated pattern, to count
+# as text: silence or a constant LSB re-packs to runs like "UUUU" or "????".
+MIN_TEXT = 12
+MIN_DISTINCT_CHARS = 4
+TEXT_PREVIEW = 120
+_TEXT_RUN = re.compile(rb"[\t\n\r\x20-\x7e]{%d,}" % MIN_TEXT)
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "PNG image"),
+    (b"\xff\xd8\xff", "JPEG image"),
+    (b"GIF8", "GIF image"),
+    (b"PK\x03\x04", "ZIP archive"),
+    (b"%PDF-", "PDF document"),
+    (b"7z\xbc\xaf\x27\x1c", "7-Zip archive"),
+    (b"Rar!\x1a\x07", "RAR archive"),
+    (b"\x1f\x8b\x08", "gzip data"),
+    (b"BZh", "bzip2 data"),
+    (b"\x7fELF", "ELF executable"),
+    (b"RIFF", "RIFF (WAV/AVI) data"),
+    (b"OggS", "Ogg stream"),
+    (b"ID3", "MP3 audio"),
+)
+
+NOTHING_FOUND = "No file signature or text at the start of any LSB stream."
+
+
+def _lsb_bits(low: np.ndarray, depth: int) -> np.ndarray:
+    """Unpack the ``depth`` low bits of each sample byte, most significant first."""
+    shifts = np.arange(depth - 1, -1, -1, dtype=np.uint8)
+    return ((low[:, None] >> shifts) & 1).reshape(-1)
+
+
+def _alignments(bits: np.ndarray, order: str) -> np.ndarray:
+    """Pack ``bits`` at each of the 8 bit offsets: row ``k`` skips ``k`` bits."""
+    usable = (len(bits) - (BYTE_BITS - 1)) // BYTE_BITS * BYTE_BITS
+    if usable <= 0:
+        return np.zeros((BYTE_BITS, 0), dtype=np.uint8)
+    shifted = np.lib.stride_tricks.sliding_window_view(bits, usable)[:BYTE_BITS]
+    return np.packbits(shifted, axis=1, bitorder=order)
+
+
+def classify(data: bytes) -> str | None:
+    """Describe what ``data`` starts with: a known file type, text, or None."""
+    for magic, label in SIGNATURES:
+        if data.startswith(magic):
+            return label
+    run = _TEXT_RUN.match(data)
+    if run is None or len(set(run.group())) < MIN_DISTINCT_CHARS:
+        return None
+    text = run.group().decode("ascii")
+    suffix = "..." if len(text) > TEXT_PREVIEW else ""
+    return f"text {text[:TEXT_PREVIEW]!r}{suffix}"
+
+
+def scan_stream(low: np.ndarray, stream: str) -> list[str]:
+    """Check every depth/order/offset variant of one stream of sample bytes."""
+    findings = []
+    for depth in LSB_DEPTHS:
+        bits = _lsb_bits(low[: -(-SCAN_BITS // depth)], depth)
+        for order, order_label in BIT_ORDERS.items():
+            for offset, packed in enumerate(_alignments(bits, order)):
+                found = classify(packed.tobytes())
+                if found is not None:
+                    plural = "s" if depth > 1 else ""
+                    findings.append(
+                        f"{stream}, {depth} bit{plural}/sample, {order_label}, "
+                        f"offset {offset}: {found}",
+                    )
+    return findings
@@ -4,17 +4,15 @@ import itertools
 import math
 import re
 import struct
-import threading
-import time
 import zlib
-from typing import Any
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, NamedTuple
 
-from flask import Flask
+import numpy as np
 
-from aperisolve.config import DB_URI
-from aperisolve.models import IHDR, db
-
-from .utils import int2hex, str2hex
+from .crc import insert_at, insertion_search_size, solve_insertions, solve_u32, solve_u32_batch
+from .ihdr_index import IHDR_HEIGHT_OFFSET, IHDR_WIDTH_OFFSET, lookup
+from .utils import get_valid_depth_color_pairs, int2hex, str2hex
 
 __author__ = [
     "Zeecka",
@@ -23,42 +21,328 @@ __author__ = [
     "sherlly (https://github.com/sherlly/PCRT)",
 ]
 
-IDAT_NOT_FOUND_OFFSET = -5
+# IHDR dimensions are solved from the CRC (see aperisolve.utils.crc). A single
+# wrong field has exactly one solution over the full 32-bit range, so it is
+# only accepted below this bound: a solution for a wrongly assumed field is a
+# random word, which passes with probability 2**-16.
+MAX_PLAUSIBLE_DIMENSION = 1 << 16
+# When both dimensions are wrong, every height has one matching width: sweep
+# heights up to this bound and keep widths within it (about one spurious pair
+# per 16 sweeps).
+MAX_SWEEP_DIMENSION = 1 << 14
+
+# The concatenated IDAT stream inflates to exactly the filtered scanlines the
+# IHDR describes, which pins the dimensions down independently of the CRC.
+# Only its length is needed: output is counted in slices and discarded, and a
+# stream inflating past the cap is not measured at all.
+MAX_INFLATED_IDAT = 1 << 28
+INFLATE_SLICE = 1 << 20
+MAX_FILTER_TYPE = 4  # None, Sub, Up, Average, Paeth
+# IDAT chunk size of salvaged partial images.
+PARTIAL_IDAT_SIZE = 1 << 16
+COLOR_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# Adam7 passes as (x offset, y offset, x step, y step).
+ADAM7_PASSES = (
+    (0, 0, 8, 8),
+    (4, 0, 8, 8),
+    (0, 4, 4, 8),
+    (2, 0, 4, 4),
+    (0, 2, 2, 4),
+    (1, 0, 2, 2),
+    (0, 1, 1, 2),
+)
+
+# _fix_dos2unix() looks for the `count` newline positions that lost a carriage
+# return by meeting in the middle over CRC differences (see
+# crc.solve_insertions): every subset of each half of the newline positions is
+# tabulated. Both numbers come straight from the uploaded file, so bound the
+# tables; anything past these limits is a crafted file trying to pin a core.
+MAX_DOS2UNIX_COMBINATIONS = 1_000_000
+MAX_DOS2UNIX_INSERTIONS = 64
+# The CRC is the only check a candidate gets, and about C(n, count) / 2**32
+# wrong subsets match it by chance: past 2**24 subsets (a 1 in 256 chance of a
+# spurious match), the repair would be a guess.
+MAX_DOS2UNIX_SUBSETS = 1 << 24
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+ANCILLARY_CHUNKS = (
+    b"cHRM",
+    b"pHYs",
+    b"gAMA",
+    b"sBIT",
+    b"PLTE",
+    b"bKGD",
+    b"sTER",
+    b"hIST",
+    b"iCCP",
+    b"sPLT",
+    b"sRGB",
+    b"dSIG",
+    b"tIME",
+    b"tRNS",
+    b"oFFs",
+    b"sCAL",
+    b"fRAc",
+    b"gIFg",
+    b"gIFt",
+    b"gIFx",
+)
+TEXT_CHUNKS = (b"eXIf", b"iTXt", b"tEXt", b"zTXt")
+# Chunks check_chunks() copies from between IHDR and the first IDAT.
+COPIED_CHUNKS = frozenset(
+    {
+        b"PLTE",
+        b"tRNS",
+        b"cHRM",
+        b"gAMA",
+        b"iCCP",
+        b"sBIT",
+        b"sRGB",
+        b"bKGD",
+        b"hIST",
+        b"pHYs",
+        b"sPLT",
+    },
+)
+# Chunk types the parser resynchronises on after a corrupt length field.
+_KNOWN_TYPE = re.compile(
+    b"|".join(re.escape(t) for t in (b"IHDR", b"IDAT", b"IEND", *ANCILLARY_CHUNKS, *TEXT_CHUNKS)),
+)
+
+
+class Chunk(NamedTuple):
+    """One entry of the chunk table: where a chunk is and what it holds.
+
+    ``length`` is the declared length. ``data`` is a view of the bytes up to
+    the stored CRC, so it is shorter or longer than ``length`` when the
+    length field (or the data) is damaged.
+    """
 
-# The exhaustive width x height CRC search is pure Python and unbounded by the
-# subprocess timeout (it is not a subprocess); a crafted PNG must not be able
-# to pin a core until RQ kills the whole job.
-BRUTEFORCE_DEADLINE_SECONDS = 30
+    offset: int
+    length: int
+    type: bytes
+    data: memoryview
+    crc: bytes
+    crc_ok: bool
+
+    @property
+    def end(self) -> int:
+        """Return the offset just past the stored CRC."""
+        return self.offset + 12 + len(self.data)
+
+
+def _chunk_crc(chunk_type: bytes, data: bytes | memoryview) -> bytes:
+    """Return the CRC a chunk should store, without joining type and data."""
+    return zlib.crc32(data, zlib.crc32(chunk_type)).to_bytes(4)
 
-# _fix_dos2unix() tries every way to reinsert `count` carriage returns among the
-# newline positions: C(len(pos_list), count) CRC checks. Both numbers come
-# straight from the uploaded file, so bound the search. A genuine DOS->Unix
-# mangling only flips a handful of bytes; anything past these limits is a
-# crafted file trying to pin a core.
-MAX_DOS2UNIX_COMBINATIONS = 100_000
-MAX_DOS2UNIX_INSERTIONS = 64
-DOS2UNIX_DEADLINE_SECONDS = 2
 
-_db_app: Flask | None = None
-_db_app_lock = threading.Lock()
+def _make_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Serialize a chunk: length, type, data and CRC."""
+    return len(data).to_bytes(4) + chunk_type + data + _chunk_crc(chunk_type, data)
 
 
-def _get_db_app() -> Flask:
-    """Minimal DB-only Flask app for IHDR lookups, created once.
+def _is_chunk_type(data: bytes | memoryview, pos: int) -> bool:
+    """Tell whether the four bytes at ``pos`` are a valid chunk type (ASCII letters)."""
+    return pos + 4 <= len(data) and bytes(data[pos : pos + 4]).isalpha()
 
-    Analyzer threads have no app context (contexts are thread-local), so one
-    must be created here — but a lightweight one, not the full application
-    (Sentry, blueprints, Babel, limiter) rebuilt on every lookup.
+
+def scan_chunks(data: bytes) -> list[Chunk]:
+    """Parse every chunk of a (possibly damaged) PNG in one pass, without copies.
+
+    A length field is trusted when it lands on another chunk type (or on the
+    end of the file). Otherwise the chunk is taken to end at the next known
+    chunk type, which recovers chunks whose data gained or lost bytes; bytes
+    that start no chunk at all are skipped up to the next known type. The
+    table ends at IEND: what follows is trailing data.
+    """
+    view = memoryview(data)
+    chunks: list[Chunk] = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 12 <= len(data):
+        if not _is_chunk_type(data, pos + 4):
+            marker = _KNOWN_TYPE.search(data, pos + 4)
+            if marker is None:
+                break
+            pos = marker.start() - 4
+            continue
+        length = int.from_bytes(view[pos : pos + 4])
+        chunk_type = bytes(view[pos + 4 : pos + 8])
+        data_end = pos + 8 + length
+        if chunk_type == b"IEND":
+            if data_end + 4 > len(data):
+                data_end = pos + 8
+        elif data_end + 4 != len(data) and not _is_chunk_type(data, data_end + 8):
+            marker = _KNOWN_TYPE.search(data, pos + 8)
+            next_chunk = marker.start() - 4 if marker else len(data)
+            data_end = max(pos + 8, next_chunk - 4)
+        crc = bytes(view[data_end : data_end + 4])
+        crc_ok = _chunk_crc(chunk_type, view[pos + 8 : data_end]) == crc
+        chunks.append(Chunk(pos, length, chunk_type, view[pos + 8 : data_end], crc, crc_ok))
+        if chunk_type == b"IEND":
+            break
+        pos = data_end + 4
+    return chunks
+
+
+def raw_image_size(width: int, height: int, bit_depth: int, color_type: int, interlace: int) -> int:
+    """Return the length of the filtered scanlines (the inflated IDAT) of an image."""
+    bits_per_pixel = COLOR_CHANNELS.get(color_type, 0) * bit_depth
+    if not interlace:
+        return height * (1 + (width * bits_per_pixel + 7) // 8)
+    total = 0
+    for x0, y0, dx, dy in ADAM7_PASSES:
+        pass_width = (width - x0 + dx - 1) // dx
+        pass_height = (height - y0 + dy - 1) // dy
+        if pass_width > 0 and pass_height > 0:
+            total += pass_height * (1 + (pass_width * bits_per_pixel + 7) // 8)
+    return total
+
+
+def _inflate_slices(
+    inflater: "zlib._Decompress",
+    parts: Iterable[bytes | memoryview],
+) -> Iterator[bytes]:
+    """Inflate a zlib stream split in ``parts``, at most ``INFLATE_SLICE`` bytes at a time."""
+    # A trailing empty part drains output still held back by the slice limit.
+    for part in itertools.chain(parts, [b""]):
+        pending: bytes | memoryview = part
+        while not inflater.eof:
+            out = inflater.decompress(pending, INFLATE_SLICE)
+            yield out
+            pending = inflater.unconsumed_tail
+            if not pending and len(out) < INFLATE_SLICE:
+                break
+
+
+def inflated_size(parts: Iterable[bytes | memoryview]) -> int | None:
+    """Return how many bytes a zlib stream split in ``parts`` inflates to.
+
+    None if the stream is broken, truncated or inflates past the cap.
     """
-    global _db_app  # noqa: PLW0603
-    with _db_app_lock:
-        if _db_app is None:
-            app = Flask("aperisolve-ihdr-lookup")
-            app.config["SQLALCHEMY_DATABASE_URI"] = DB_URI
-            app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-            db.init_app(app)
-            _db_app = app
-    return _db_app
+    inflater = zlib.decompressobj()
+    total = 0
+    try:
+        for out in _inflate_slices(inflater, parts):
+            total += len(out)
+            if total > MAX_INFLATED_IDAT:
+                return None
+    except zlib.error:
+        return None
+    return total if inflater.eof else None
+
+
+def scanline_layout(
+    width: int,
+    height: int,
+    bit_depth: int,
+    color_type: int,
+    interlace: int,
+) -> list[tuple[int, int]]:
+    """Return the (rows, bytes per row with filter byte) runs of an image's scanlines."""
+    bits_per_pixel = COLOR_CHANNELS.get(color_type, 0) * bit_depth
+    passes = ADAM7_PASSES if interlace else ((0, 0, 1, 1),)
+    layout = []
+    for x0, y0, dx, dy in passes:
+        pass_width = (width - x0 + dx - 1) // dx
+        pass_height = (height - y0 + dy - 1) // dy
+        if pass_width > 0 and pass_height > 0:
+            layout.append((pass_height, 1 + (pass_width * bits_per_pixel + 7) // 8))
+    return layout
+
+
+class ScanlineCheck(NamedTuple):
+    """Outcome of :func:`check_scanlines`: rows that decode, and why the rest do not."""
+
+    good_rows: int
+    total_rows: int
+    problem: str | None
+    trailing: int
+
+
+class _RowChecker:
+    """Split inflated IDAT bytes into scanlines and check their filter bytes."""
+
+    def __init__(self, layout: list[tuple[int, int]], sink: Callable[[bytes], None] | None) -> None:
+        self.runs = iter(layout)
+        self.rows_left, self.stride = next(self.runs, (0, 0))
+        self.sink = sink
+        self.good = 0
+        self.trailing = 0
+        self.buf = bytearray()
+
+    def feed(self, data: bytes) -> str | None:
+        """Take newly inflated bytes; return a problem at the first bad row."""
+        buf = self.buf
+        buf += data
+        while self.rows_left and len(buf) >= self.stride:
+            n = min(self.rows_left, len(buf) // self.stride)
+            filters = buf[0 : n * self.stride : self.stride]
+            ok = next((i for i, f in enumerate(filters) if f > MAX_FILTER_TYPE), n)
+            if self.sink is not None and ok:
+                self.sink(bytes(buf[: ok * self.stride]))
+            self.good += ok
+            if ok < n:
+                return f"unknown filter type {filters[ok]} on scanline {self.good + 1}"
+            del buf[: n * self.stride]
+            self.rows_left -= n
+            if not self.rows_left:
+                self.rows_left, self.stride = next(self.runs, (0, 0))
+        if not self.rows_left:
+            self.trailing += len(buf)
+            buf.clear()
+        return None
+
+
+def check_scanlines(
+    parts: Iterable[bytes | memoryview],
+    layout: list[tuple[int, int]],
+    sink: Callable[[bytes], None] | None = None,
+) -> ScanlineCheck:
+    """Inflate an IDAT stream incrementally and validate every scanline's filter byte.
+
+    ``layout`` comes from :func:`scanline_layout`. Rows are checked as they
+    are inflated, ``INFLATE_SLICE`` bytes at a time, and valid rows are
+    passed to ``sink`` (filter byte included). The check stops at the first
+    corrupt row (bad deflate data or an unknown filter type), at a missing
+    row, or after ``MAX_INFLATED_IDAT`` bytes, so memory stays within one
+    slice plus one row whatever the stream inflates to. ``trailing`` counts
+    the bytes inflated past the last row (at most one slice more is
+    inflated to find out).
+    """
+    total_rows = sum(rows for rows, _ in layout)
+    rows = _RowChecker(layout, sink)
+    inflater = zlib.decompressobj()
+    inflated = 0
+    problem = None
+    try:
+        for out in _inflate_slices(inflater, parts):
+            inflated += len(out)
+            problem = rows.feed(out)
+            if problem or rows.trailing > INFLATE_SLICE or inflated > MAX_INFLATED_IDAT:
+                break
+    except zlib.error as exc:
+        problem = f"corrupt deflate data after {rows.good} scanlines ({exc})"
+    if problem is None and rows.good < total_rows:
+        if inflated > MAX_INFLATED_IDAT:
+            problem = f"only the first {rows.good} scanlines were checked (size cap)"
+        else:
+            end = "ends" if inflater.eof else "is truncated"
+            problem = f"IDAT stream {end} after {rows.good} scanlines"
+    return ScanlineCheck(rows.good, total_rows, problem, rows.trailing)
+
+
+def _divisors(n: int) -> Iterator[int]:
+    """Yield every positive divisor of ``n``."""
+    for d in range(1, math.isqrt(n) + 1):
+        if n % d == 0:
+            yield d
+            if d != n // d:
+                yield n // d
+
+
+def _width_range(row_bytes: int, bits_per_pixel: int) -> range:
+    """Widths whose scanlines (without the filter byte) take ``row_bytes`` bytes."""
+    return range(((row_bytes - 1) * 8) // bits_per_pixel + 1, (row_bytes * 8) // bits_per_pixel + 1)
 
 
 class PNG:
@@ -67,12 +351,16 @@ class PNG:
     def __init__(self, data: bytes) -> None:
         """Initialize PNG parser state for a binary payload."""
         self.data = data
+        self.chunks = scan_chunks(data)
         self.width = self.height = self.bits = self.mode = 0
         self.compression = self.filter = self.interlace = self.channel = 0
         self.txt_content: dict[bytes, list[bytes]] = {}
         self.image_content: dict[bytes, list[bytes]] = {}
         self.crcs: dict[bytes, Any] = {}
         self.repaired_data = bytearray()
+        self.copied_chunks: list[bytes] = []
+        self.idat_payload: list[bytes | memoryview] = []
+        self.partial_data: bytes | None = None
         self.logs: list[str] = []
         self.errors: list[str] = []
 
@@ -84,23 +372,26 @@ class PNG:
         """Add error message."""
         self.errors.append(msg)
 
-    def _check_format(self, data: bytes) -> bool:
-        """Check if data contains PNG signature chunks."""
-        return all(p in data for p in [b"IHDR", b"IDAT", b"IEND"])
+    def _check_format(self) -> bool:
+        """Check if the chunk table holds the critical PNG chunks."""
+        return {b"IHDR", b"IDAT", b"IEND"} <= {chunk.type for chunk in self.chunks}
+
+    def _first(self, chunk_type: bytes) -> Chunk | None:
+        """Return the first chunk of a type from the chunk table."""
+        return next((chunk for chunk in self.chunks if chunk.type == chunk_type), None)
 
     def _check_crc(self, chunk_type: bytes, chunk_data: bytes, checksum: bytes) -> bytes | None:
         """Check CRC of chunk."""
         calc_crc = struct.pack("!I", zlib.crc32(chunk_type + chunk_data))
         return calc_crc if calc_crc != checksum else None
 
-    def _find_ihdr(self, data: bytes) -> tuple[int, bytes]:
+    def _find_ihdr(self) -> tuple[int, bytes]:
         """Find IHDR chunk in PNG data."""
-        pos = data.find(b"IHDR")
-        if pos == -1:
+        chunk = self._first(b"IHDR")
+        if chunk is None:
             return -1, b""
         # IHDR chunk is always 25 bytes: 4 (length) + 4 (type) + 13 (data) + 4 (CRC)
-        # Only return the IHDR chunk itself, not everything up to IDAT
-        return pos, data[pos - 4 : pos + 21]
+        return chunk.offset + 4, self.data[chunk.offset : chunk.offset + 25]
 
     def check_header(self) -> bool:
         """Check and fix PNG header."""
@@ -118,7 +409,7 @@ class PNG:
     def get_pic_info(self, ihdr: bytes = b"") -> bool:
         """Extract picture information from IHDR chunk."""
         if not ihdr:
-            pos, ihdr_chunk = self._find_ihdr(self.data)
+            pos, ihdr_chunk = self._find_ihdr()
             if pos == -1:
                 self._error("Lost IHDR chunk")
                 return False
@@ -138,186 +429,207 @@ class PNG:
         self.interlace = int(ihdr[12])
         self.channel = {0: 1, 3: 1, 2: 3, 4: 2, 6: 4}.get(self.mode, 0)
 
-        self.txt_content, self.image_content, self.crcs = self._find_ancillary(self.data)
+        self.txt_content, self.image_content, self.crcs = self._find_ancillary()
         return True
 
     def _find_ancillary(
         self,
-        data: bytes,
     ) -> tuple[dict[bytes, list[bytes]], dict[bytes, list[bytes]], dict[bytes, Any]]:
-        """Find ancillary chunks in PNG data with an optimized single pass."""
-        ancillary = [
-            b"cHRM",
-            b"pHYs",
-            b"gAMA",
-            b"sBIT",
-            b"PLTE",
-            b"bKGD",
-            b"sTER",
-            b"hIST",
-            b"iCCP",
-            b"sPLT",
-            b"sRGB",
-            b"dSIG",
-            b"tIME",
-            b"tRNS",
-            b"oFFs",
-            b"sCAL",
-            b"fRAc",
-            b"gIFg",
-            b"gIFt",
-            b"gIFx",
-        ]
-        attach_txt = [b"eXIf", b"iTXt", b"tEXt", b"zTXt"]
-
-        # Initialize result dictionaries
-        image_content: dict[bytes, list[bytes]] = {chunk: [] for chunk in ancillary}
-        txt_content: dict[bytes, list[bytes]] = {chunk: [] for chunk in attach_txt}
-        crcs: dict[bytes, Any] = {chunk: [] for chunk in ancillary}
-
-        # Single pass through data
-        pos = 8  # Skip PNG signature
-        while pos < len(data) - 12:  # Need at least 12 bytes for chunk header
-            # Try to read chunk length
-            try:
-                length = struct.unpack("!I", data[pos : pos + 4])[0]
-                chunk_type = data[pos + 4 : pos + 8]
-
-                # Check if this is a chunk we care about
-                if chunk_type in ancillary:
-                    chunk_data = data[pos + 8 : pos + 8 + length]
-                    image_content[chunk_type].append(chunk_data)
-
-                    # Check CRC for first occurrence only
-                    if len(image_content[chunk_type]) == 1:
-                        crc_data = data[pos + 8 + length : pos + 12 + length]
-                        calc_crc = self._check_crc(chunk_type, chunk_data, crc_data)
-                        crcs[chunk_type] = (calc_crc, crc_data) if calc_crc else []
-
-                elif chunk_type in attach_txt:
-                    chunk_data = data[pos + 8 : pos + 8 + length]
-                    txt_content[chunk_type].append(chunk_data)
-
-                # Move to next chunk
-                pos += 12 + length
-            except (struct.error, IndexError):
-                # Malformed chunk, skip ahead
-                pos += 1
+        """Collect ancillary and text chunks from the chunk table."""
+        image_content: dict[bytes, list[bytes]] = {chunk: [] for chunk in ANCILLARY_CHUNKS}
+        txt_content: dict[bytes, list[bytes]] = {chunk: [] for chunk in TEXT_CHUNKS}
+        crcs: dict[bytes, Any] = {chunk: [] for chunk in ANCILLARY_CHUNKS}
+
+        for chunk in self.chunks:
+            if chunk.type in image_content:
+                image_content[chunk.type].append(bytes(chunk.data))
+                # Check CRC for first occurrence only
+                if len(image_content[chunk.type]) == 1 and not chunk.crc_ok:
+                    crcs[chunk.type] = (_chunk_crc(chunk.type, chunk.data), chunk.crc)
+            elif chunk.type in txt_content:
+                txt_content[chunk.type].append(bytes(chunk.data))
 
         return txt_content, image_content, crcs
 
     def check_chunks(self) -> bool:
-        """Copy ancillary chunks (like PLTE) from original data to repaired_data with CRC.
-
-        validation.
-        """
-        critical_ancillary = [
-            b"PLTE",
-            b"tRNS",
-            b"cHRM",
-            b"gAMA",
-            b"iCCP",
-            b"sBIT",
-            b"sRGB",
-            b"bKGD",
-            b"hIST",
-            b"pHYs",
-            b"sPLT",
-        ]
-
-        ihdr_end = len(self.repaired_data)
-        idat_pos = self.data.find(b"IDAT")
-        if idat_pos == -1:
-            return False
-
-        search_start = self.data.find(b"IHDR")
-        if search_start == -1:
+        """Copy ancillary chunks (like PLTE) found between IHDR and IDAT, fixing CRCs."""
+        types = [chunk.type for chunk in self.chunks]
+        if b"IHDR" not in types or b"IDAT" not in types:
             return False
 
-        # Skip past the IHDR chunk
-        ihdr_length = struct.unpack("!I", self.data[search_start - 4 : search_start])[0]
-        search_start = search_start + 4 + ihdr_length + 4
-
-        # Collect all ancillary chunks before IDAT
-        for chunk_type in critical_ancillary:
-            pos = search_start
-            while pos < idat_pos:
-                pos = self.data.find(chunk_type, pos, idat_pos)
-                if pos == -1:
-                    break
-
-                chunk_start = pos - 4
-                length = struct.unpack("!I", self.data[chunk_start:pos])[0]
-                chunk_data = self.data[pos + 4 : pos + 4 + length]
-                chunk_crc = self.data[pos + 4 + length : pos + 8 + length]
-
-                # Validate CRC before copying
-                if calc_crc := self._check_crc(chunk_type, chunk_data, chunk_crc):
-                    self._log(f"Warning: {chunk_type.decode()} has invalid CRC, fixing...")
-                    chunk_crc = calc_crc
-
-                # Reconstruct complete chunk with validated CRC
-                complete_chunk = struct.pack("!I", length) + chunk_type + chunk_data + chunk_crc
-                self.repaired_data[ihdr_end:ihdr_end] = complete_chunk
-                ihdr_end += len(complete_chunk)
-
-                self._log(f"Copied {chunk_type.decode()} chunk ({length} bytes)")
-                pos = pos + 4 + length + 4
+        ihdr_end = len(self.repaired_data)
+        for chunk in self.chunks[types.index(b"IHDR") + 1 : types.index(b"IDAT")]:
+            if chunk.type not in COPIED_CHUNKS:
+                continue
+            chunk_crc = chunk.crc
+            if not chunk.crc_ok:
+                self._log(f"Warning: {chunk.type.decode()} has invalid CRC, fixing...")
+                chunk_crc = _chunk_crc(chunk.type, chunk.data)
+
+            # Reconstruct complete chunk with validated CRC
+            complete_chunk = struct.pack("!I", chunk.length) + chunk.type + chunk.data + chunk_crc
+            self.repaired_data[ihdr_end:ihdr_end] = complete_chunk
+            ihdr_end += len(complete_chunk)
+            self.copied_chunks.append(complete_chunk)
+
+            self._log(f"Copied {chunk.type.decode()} chunk ({chunk.length} bytes)")
 
         return True
 
-    def _lookup_ihdr_from_db(self, chunk_type: bytes, crc: bytes) -> bytes | None:
-        """Try to recover IHDR bytes from known CRC values in the database."""
-        crc_int = struct.unpack("!I", crc)[0]
-        with _get_db_app().app_context():
-            matches = IHDR.query.filter_by(crc=crc_int).all()
-
+    def _lookup_ihdr_from_index(self, chunk_type: bytes, crc: bytes) -> bytes | None:
+        """Try to recover IHDR bytes from the index of common configurations."""
+        self._log("Looking up CRC in the IHDR index...")
+        matches = lookup(struct.unpack("!I", crc)[0])
         if not matches:
             return None
 
-        self._log(f"Found {len(matches)} matching IHDR configuration(s) in database")
-        match = matches[0]
-        test_ihdr = match.to_ihdr_bytes()
+        self._log(f"Found {len(matches)} matching IHDR configuration(s) in the index")
+        test_ihdr = matches[0]
         if self._check_crc(chunk_type, test_ihdr, crc):
-            self._log("Database match found but CRC verification failed")
+            self._log("Index match found but CRC verification failed")
             return None
 
+        width, height, bit_depth, color_type, interlace = struct.unpack(">IIBBxxB", test_ihdr)
         self._log(
-            f"Recovered IHDR: {match.width}x{match.height}, "
-            f"bit_depth={match.bit_depth}, "
-            f"color_type={match.color_type}, "
-            f"interlace={match.interlace}",
+            f"Recovered IHDR: {width}x{height}, "
+            f"bit_depth={bit_depth}, "
+            f"color_type={color_type}, "
+            f"interlace={interlace}",
         )
         return test_ihdr
 
-    def _bruteforce_ihdr_dimensions(
+    def _ihdr_candidates(
         self,
         chunk_type: bytes,
-        ihdr: bytes,
-        crc: bytes,
-    ) -> bytes | None:
-        """Fallback recovery for width and height by brute-force CRC matching."""
-        self._log("No database match found, falling back to exhaustive search...")
-        deadline = time.monotonic() + BRUTEFORCE_DEADLINE_SECONDS
-        for width in range(1, 5000):
-            if time.monotonic() > deadline:
-                self._log(
-                    f"Exhaustive search stopped after {BRUTEFORCE_DEADLINE_SECONDS}s "
-                    "without a match",
+        chunk_ihdr: bytes,
+        crc: int,
+        raw_size: int | None = None,
+    ) -> Iterator[bytes]:
+        """Yield IHDR data matching ``crc``, most plausible first.
+
+        With the stored parameter bytes, then with every valid bit depth,
+        colour type and interlace method: one dimension is solved assuming the
+        other is intact. If the inflated IDAT size is known, each height it
+        factors into (non-interlaced) is solved for its width. Last, with the
+        stored parameters only, heights are swept for pairs where both
+        dimensions were damaged.
+        """
+        width, height = struct.unpack(">II", chunk_ihdr[:8])
+        stored = chunk_ihdr[8:13]
+        tails = [stored] + [
+            bytes([depth, color, 0, 0, interlace])
+            for depth, color in get_valid_depth_color_pairs()
+            for interlace in (0, 1)
+            if bytes([depth, color, 0, 0, interlace]) != stored
+        ]
+        for tail in tails:
+            message = chunk_type + struct.pack(">II", width, height) + tail
+            solved_width = solve_u32(message, IHDR_WIDTH_OFFSET, crc)
+            if 0 < solved_width <= MAX_PLAUSIBLE_DIMENSION:
+                yield struct.pack(">II", solved_width, height) + tail
+            solved_height = solve_u32(message, IHDR_HEIGHT_OFFSET, crc)
+            if 0 < solved_height <= MAX_PLAUSIBLE_DIMENSION:
+                yield struct.pack(">II", width, solved_height) + tail
+
+        if raw_size:
+            for tail in tails:
+                bits_per_pixel = COLOR_CHANNELS.get(tail[1], 0) * tail[0]
+                if tail[4] or not bits_per_pixel:
+                    continue
+                heights = np.array(sorted(_divisors(raw_size)), dtype=np.uint32)
+                message = chunk_type + bytes(8) + tail
+                widths = solve_u32_batch(
+                    message,
+                    IHDR_WIDTH_OFFSET,
+                    IHDR_HEIGHT_OFFSET,
+                    heights,
+                    crc,
                 )
-                return None
-            for height in range(1, 5000):
-                test_ihdr = struct.pack(">I", width) + struct.pack(">I", height) + ihdr[16:21]
-                if not self._check_crc(chunk_type, test_ihdr, crc):
-                    self._log(
-                        f"Found correct dimensions via exhaustive search: {width}x{height}",
-                    )
-                    return test_ihdr
+                for solved_width, h in zip(widths.tolist(), heights.tolist(), strict=True):
+                    if solved_width in _width_range(raw_size // h - 1, bits_per_pixel):
+                        yield struct.pack(">II", solved_width, h) + tail
+
+        message = chunk_type + bytes(8) + stored
+        heights = np.arange(1, MAX_SWEEP_DIMENSION + 1, dtype=np.uint32)
+        widths = solve_u32_batch(message, IHDR_WIDTH_OFFSET, IHDR_HEIGHT_OFFSET, heights, crc)
+        hits = np.nonzero((widths > 0) & (widths <= MAX_SWEEP_DIMENSION))[0]
+        for i in sorted(hits, key=lambda i: int(widths[i]) * int(heights[i])):
+            yield struct.pack(">II", int(widths[i]), int(heights[i])) + stored
+
+    def _idat_raw_size(self) -> int | None:
+        """Return the inflated size of the concatenated IDAT payload, if measurable."""
+        idats = self._idat_chunks()
+        raw_size = inflated_size(chunk.data for chunk in idats) if idats else None
+        if raw_size is None:
+            self._log("IDAT stream could not be inflated, dimensions are checked by CRC only")
+        else:
+            self._log(f"IDAT stream inflates to {raw_size} bytes")
+        return raw_size
+
+    def _ihdr_from_raw_size(self, chunk_ihdr: bytes, raw_size: int) -> bytes | None:
+        """Fit one stored dimension to the inflated IDAT size, ignoring the CRC.
+
+        For when the CRC was tampered with too: keeps the width and derives
+        the height, else keeps the height and derives the (widest) width.
+        Non-interlaced images only.
+        """
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack(
+            ">IIBBBBB",
+            chunk_ihdr,
+        )
+        bits_per_pixel = COLOR_CHANNELS.get(color_type, 0) * bit_depth
+        if interlace or not bits_per_pixel:
+            return None
+        tail = chunk_ihdr[8:13]
+        row = raw_image_size(width, 1, bit_depth, color_type, 0)
+        if 0 < width <= MAX_PLAUSIBLE_DIMENSION and raw_size % row == 0:
+            return struct.pack(">II", width, raw_size // row) + tail
+        if 0 < height <= MAX_PLAUSIBLE_DIMENSION and raw_size % height == 0:
+            widths = _width_range(raw_size // height - 1, bits_per_pixel)
+            if widths:
+                return struct.pack(">II", widths[-1], height) + tail
         return None
 
+    def _solve_ihdr_dimensions(self, chunk_type: bytes, ihdr: bytes, crc: bytes) -> bytes | None:
+        """Recover IHDR data from its CRC (solved over GF(2)) and the IDAT size.
+
+        A CRC solution whose scanlines match the inflated IDAT size is taken
+        first; then, assuming the CRC was tampered with, one stored dimension
+        fitted to the IDAT size; then the most plausible CRC solution alone.
+        """
+        chunk_ihdr = ihdr[8:21]
+        target = int.from_bytes(crc)
+        raw_size = self._idat_raw_size()
+        how = "from its CRC"
+        recovered = None
+        if raw_size is not None:
+            recovered = next(
+                (
+                    candidate
+                    for candidate in self._ihdr_candidates(chunk_type, chunk_ihdr, target, raw_size)
+                    if raw_image_size(*struct.unpack(">IIBBxxB", candidate)) == raw_size
+                ),
+                None,
+            )
+            how = "from its CRC and the IDAT size"
+            if recovered is None:
+                recovered = self._ihdr_from_raw_size(chunk_ihdr, raw_size)
+                how = "from the IDAT size (no CRC solution fits it)"
+        if recovered is None:
+            recovered = next(self._ihdr_candidates(chunk_type, chunk_ihdr, target), None)
+            how = "from its CRC"
+        if recovered is None:
+            return None
+        width, height, bit_depth, color_type, interlace = struct.unpack(">IIBBxxB", recovered)
+        self._log(
+            f"Recovered IHDR {how}: {width}x{height}, "
+            f"bit_depth={bit_depth}, color_type={color_type}, interlace={interlace}",
+        )
+        return recovered
+
     def check_ihdr(self) -> bool:
-        """Check and repair IHDR chunk using database lookup and exhaustive fallback."""
-        pos, ihdr = self._find_ihdr(self.data)
+        """Check and repair IHDR chunk by solving its CRC, with an index fallback."""
+        pos, ihdr = self._find_ihdr()
         if pos == -1:
             self._error("Lost IHDR chunk")
             return False
@@ -330,11 +642,11 @@ class PNG:
         if calc_crc := self._check_crc(chunk_type, chunk_ihdr, crc):
             self._log(f"Error IHDR CRC found at offset {int2hex(pos + 4 + length)}")
             self._log(f"Chunk crc: {str2hex(crc)}, Correct crc: {str2hex(calc_crc)}")
-            self._log("Looking up CRC in database...")
-
-            if (recovered_ihdr := self._lookup_ihdr_from_db(chunk_type, crc)) or (
-                recovered_ihdr := self._bruteforce_ihdr_dimensions(chunk_type, ihdr, crc)
+            if (recovered_ihdr := self._solve_ihdr_dimensions(chunk_type, ihdr, crc)) or (
+                recovered_ihdr := self._lookup_ihdr_from_index(chunk_type, crc)
             ):
+                # Equal to the stored CRC unless that was tampered with too.
+                crc = struct.pack("!I", zlib.crc32(chunk_type + recovered_ihdr))
                 ihdr = ihdr[:8] + recovered_ihdr + crc
                 fixed = True
 
@@ -356,7 +668,12 @@ class PNG:
         crc: bytes,
         count: int,
     ) -> bytes | None:
-        """Fix DOS to Unix line ending conversion."""
+        """Fix DOS to Unix line ending conversion.
+
+        Finds which ``count`` newlines lost the carriage return before them
+        from the stored CRC, without rebuilding the data per candidate. A
+        CRC matched by more than one subset is not repaired.
+        """
         pos_list = []
         pos = -1
         while (pos := chunk_data.find(b"\x0a", pos + 1)) != -1:
@@ -367,100 +684,157 @@ class PNG:
         if not 0 < count <= min(len(pos_list), MAX_DOS2UNIX_INSERTIONS):
             self._log("Skipping DOS->Unix repair: insertion count out of range")
             return None
-        if math.comb(len(pos_list), count) > MAX_DOS2UNIX_COMBINATIONS:
+        subsets = math.comb(len(pos_list), count)
+        if subsets > MAX_DOS2UNIX_SUBSETS:
+            self._log(
+                f"Skipping DOS->Unix repair: too many candidates ({subsets} subsets)",
+            )
+            return None
+        search_size = insertion_search_size(len(pos_list), count)
+        if search_size > MAX_DOS2UNIX_COMBINATIONS:
             self._log(
-                f"Skipping DOS->Unix repair: search space too large (C({len(pos_list)}, {count}))",
+                f"Skipping DOS->Unix repair: search space too large ({search_size} subsets)",
             )
             return None
 
-        deadline = time.monotonic() + DOS2UNIX_DEADLINE_SECONDS
-        for pos_combo in itertools.combinations(pos_list, count):
-            if time.monotonic() > deadline:
-                self._log(
-                    f"DOS->Unix repair stopped after {DOS2UNIX_DEADLINE_SECONDS}s without a match",
-                )
-                return None
-            test_data = chunk_data
-            for i, pos in enumerate(pos_combo):
-                test_data = test_data[: pos + i] + b"\x0d" + test_data[pos + i :]
-            if not self._check_crc(chunk_type, test_data, crc):
-                return test_data
-        return None
+        offset = len(chunk_type)
+        matches = list(
+            itertools.islice(
+                solve_insertions(
+                    chunk_type + chunk_data,
+                    [offset + pos for pos in pos_list],
+                    count,
+                    int.from_bytes(crc),
+                ),
+                2,
+            ),
+        )
+        if len(matches) != 1:
+            if matches:
+                self._log("Skipping DOS->Unix repair: several subsets match the CRC")
+            return None
+        [positions] = matches
+        return insert_at(chunk_data, [pos - offset for pos in positions], b"\x0d")
+
+    def _idat_chunks(self) -> list[Chunk]:
+        """Return the IDAT chunks of the chunk table, in file order."""
+        return [chunk for chunk in self.chunks if chunk.type == b"IDAT"]
 
     def check_idat(self) -> bool:
         """Check and repair IDAT chunks."""
-        idat_begin = self.data.find(b"IDAT") - 4
-        if idat_begin == IDAT_NOT_FOUND_OFFSET:
+        idat_table = self._idat_chunks()
+        if not idat_table:
             self._error("Lost all IDAT chunks")
             return False
 
-        pos_iend = self.data.find(b"IEND")
-        pos_list = [
-            g.start()
-            for g in re.finditer(b"IDAT", self.data)
-            if pos_iend == -1 or g.start() < pos_iend
-        ]
-
-        idat_table = []
-        for i, pos1 in enumerate(pos_list):
-            if i + 1 == len(pos_list):
-                idat_table.append(
-                    self.data[pos1 - 4 : pos_iend - 4 if pos_iend != -1 else len(self.data)],
-                )
-            else:
-                idat_table.append(self.data[pos1 - 4 : pos_list[i + 1] - 4])
-
-        offset = idat_begin
         fixed = False
         for chunk in idat_table:
-            current_chunk = chunk
-            length = struct.unpack("!I", current_chunk[:4])[0]
-            chunk_type, chunk_data, crc = (
-                current_chunk[4:8],
-                current_chunk[8:-4],
-                current_chunk[-4:],
-            )
-
-            if length != len(chunk_data):
-                self._log(f"Error IDAT chunk data length at offset {int2hex(offset)}")
-                self._log(f"Length: {int2hex(length)}, Actual: {int2hex(len(chunk_data))}")
+            chunk_type, chunk_data, crc = chunk.type, chunk.data, chunk.crc
+            header = self.data[chunk.offset : chunk.offset + 8]
+            if chunk.length != len(chunk_data):
+                self._log(f"Error IDAT chunk data length at offset {int2hex(chunk.offset)}")
+                self._log(f"Length: {int2hex(chunk.length)}, Actual: {int2hex(len(chunk_data))}")
                 if fixed_data := self._fix_dos2unix(
                     chunk_type,
-                    chunk_data,
+                    bytes(chunk_data),
                     crc,
-                    abs(length - len(chunk_data)),
+                    abs(chunk.length - len(chunk_data)),
                 ):
-                    current_chunk = current_chunk[:8] + fixed_data + current_chunk[-4:]
+                    chunk_data = memoryview(fixed_data)
                     self._log("Successfully recovered IDAT chunk data (DOS->Unix fix)")
                     fixed = True
                 else:
                     self._log("Failed to fix IDAT chunk, using original")
-            elif calc_crc := self._check_crc(chunk_type, chunk_data, crc):
-                self._log(f"Error IDAT CRC at offset {int2hex(offset + 8 + length)}")
+            elif not chunk.crc_ok:
+                calc_crc = _chunk_crc(chunk_type, chunk_data)
+                self._log(f"Error IDAT CRC at offset {int2hex(chunk.end - 4)}")
                 self._log(f"Chunk crc: {str2hex(crc)}, Correct: {str2hex(calc_crc)}")
-                current_chunk = current_chunk[:-4] + calc_crc
+                crc = calc_crc
                 self._log("Successfully fixed CRC")
                 fixed = True
 
-            self.repaired_data.extend(current_chunk)
-            offset += len(chunk_data) + 12
+            self.repaired_data += header
+            self.repaired_data += chunk_data
+            self.repaired_data += crc
+            self.idat_payload.append(chunk_data)
 
-        self._log(f"IDAT chunk check complete at offset {int2hex(idat_begin)}")
+        self._log(f"IDAT chunk check complete at offset {int2hex(idat_table[0].offset)}")
         return fixed
 
+    def check_idat_stream(self) -> bool:
+        """Decode the repaired IDAT stream and salvage the rows before any damage.
+
+        Every scanline's filter byte is checked as the stream is inflated.
+        If the stream breaks, a second pass inflates the valid rows of a
+        non-interlaced image again and re-encodes them into ``partial_data``:
+        a PNG cropped above the first bad scanline. Healthy streams, by far
+        the most common, are only inflated once and never re-encoded.
+        """
+        layout = scanline_layout(self.width, self.height, self.bits, self.mode, self.interlace)
+        if not layout or self.width <= 0 or self.height <= 0:
+            self._log("IDAT stream not checked: unsupported IHDR parameters")
+            return False
+
+        result = check_scanlines(self.idat_payload, layout)
+        if result.problem is None:
+            self._log(f"IDAT stream decodes: {result.total_rows} scanlines with valid filters")
+            if result.trailing:
+                self._log(f"IDAT stream has {result.trailing} extra bytes after the last scanline")
+            return False
+
+        self._log(
+            f"IDAT stream damaged: {result.problem} "
+            f"({result.good_rows} of {result.total_rows} scanlines decode)",
+        )
+        if self.interlace or not result.good_rows:
+            return False
+        compressor = zlib.compressobj()
+        compressed: list[bytes] = []
+
+        def keep(rows: bytes) -> None:
+            compressed.append(compressor.compress(rows))
+
+        check_scanlines(self.idat_payload, [(result.good_rows, layout[0][1])], keep)
+        compressed.append(compressor.flush())
+        ihdr = struct.pack(
+            ">IIBBBBB",
+            self.width,
+            result.good_rows,
+            self.bits,
+            self.mode,
+            self.compression,
+            self.filter,
+            0,
+        )
+        idat = b"".join(compressed)
+        self.partial_data = b"".join(
+            [
+                PNG_SIGNATURE,
+                _make_chunk(b"IHDR", ihdr),
+                *self.copied_chunks,
+                *(
+                    _make_chunk(b"IDAT", idat[i : i + PARTIAL_IDAT_SIZE])
+                    for i in range(0, len(idat), PARTIAL_IDAT_SIZE)
+                ),
+                _make_chunk(b"IEND", b""),
+            ],
+        )
+        self._log(f"Recovered the first {result.good_rows} rows as a partial image")
+        return True
+
     def check_iend(self) -> tuple[bool, bytes | None]:
         """Check and repair IEND chunk."""
         standard_iend = b"\x00\x00\x00\x00IEND\xae\x42\x60\x82"
-        pos = self.data.find(b"IEND")
+        chunk = self._first(b"IEND")
         fixed = False
         extra_data = None
 
-        if pos == -1:
+        if chunk is None:
             self._log("Lost IEND chunk, adding standard IEND")
             iend = standard_iend
             fixed = True
         else:
-            iend = self.data[pos - 4 : pos + 8]
+            iend = self.data[chunk.offset : chunk.offset + 12]
             if iend != standard_iend:
                 self._log("Error IEND chunk, fixing...")
                 iend = standard_iend
@@ -468,7 +842,7 @@ class PNG:
             else:
                 self._log("Correct IEND chunk")
 
-            if extra_data := self.data[pos + 8 :]:
+            if extra_data := self.data[chunk.offset + 12 :]:
                 self._log(f"Found {len(extra_data)} bytes after IEND: {extra_data[:20]!r}")
 
         self.repaired_data.extend(iend)
@@ -477,7 +851,7 @@ class PNG:
 
     def repair(self) -> tuple[bool, bytes | None]:
         """Run full PNG repair process."""
-        if not self._check_format(self.data):
+        if not self._check_format():
             self._error("File may not be a PNG image")
             return False, None
 
@@ -486,6 +860,7 @@ class PNG:
         fixed |= self.check_ihdr()
         fixed |= self.check_chunks()
         fixed |= self.check_idat()
+        self.check_idat_stream()
         iend_fixed, extra_data = self.check_iend()
         fixed |= iend_fixed
 
@@ -0,0 +1,114 @@
+"""Incremental PNG encoder for row-at-a-time output.
+
+Pillow's ``Image.save`` needs the whole frame in memory. The decomposer
+writes dozens of planes from images far larger than its worker can hold as
+full-size temporaries, so planes are encoded strip by strip here instead:
+rows are filtered (filter type 0), fed to one ``zlib`` stream, and flushed
+as IDAT chunks whenever enough compressed data accumulates. Memory per open
+writer is the zlib state plus one chunk buffer, whatever the image size.
+"""
+
+import struct
+import zlib
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Self
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COLOR_GRAYSCALE = 0
+COLOR_PALETTE = 3
+# Compressed bytes buffered before an IDAT chunk is emitted.
+IDAT_CHUNK_SIZE = 1 << 16
+COMPRESSION_LEVEL = 6
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def row_bytes(width: int, bit_depth: int) -> int:
+    """Bytes per packed scanline of a single-sample-per-pixel image."""
+    return (width * bit_depth + 7) // 8
+
+
+class StreamingPNGWriter:
+    """Write a grayscale or palette PNG from packed scanlines, strip by strip.
+
+    ``write_rows`` takes a ``(rows, row_bytes)`` uint8 array of already
+    packed samples (see :func:`row_bytes`); the writer prepends the filter
+    byte. ``close`` checks that exactly ``height`` rows were written.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        width: int,
+        height: int,
+        *,
+        bit_depth: int = 8,
+        palette: bytes | None = None,
+    ) -> None:
+        """Open ``path`` and write the header chunks."""
+        self.path = path
+        self.width = width
+        self.height = height
+        self.stride = row_bytes(width, bit_depth)
+        self._rows_written = 0
+        self._pending = bytearray()
+        self._compressor = zlib.compressobj(COMPRESSION_LEVEL)
+        self._handle: BinaryIO = path.open("wb")
+        color_type = COLOR_GRAYSCALE if palette is None else COLOR_PALETTE
+        ihdr = struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0)
+        self._handle.write(PNG_SIGNATURE + _chunk(b"IHDR", ihdr))
+        if palette is not None:
+            self._handle.write(_chunk(b"PLTE", palette))
+
+    def __enter__(self) -> Self:
+        """Return the writer itself."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Finish the file, or delete it if the block raised."""
+        if exc_type is None:
+            self.close()
+        else:
+            self._handle.close()
+            self.path.unlink(missing_ok=True)
+
+    def write_rows(self, packed: np.ndarray) -> None:
+        """Append packed scanlines, shape ``(rows, stride)``."""
+        rows = packed.shape[0]
+        filtered = np.zeros((rows, self.stride + 1), dtype=np.uint8)
+        filtered[:, 1:] = packed
+        self._rows_written += rows
+        self._pending += self._compressor.compress(filtered.tobytes())
+        if len(self._pending) >= IDAT_CHUNK_SIZE:
+            self._flush_idat()
+
+    def _flush_idat(self) -> None:
+        if self._pending:
+            self._handle.write(_chunk(b"IDAT", bytes(self._pending)))
+            self._pending.clear()
+
+    def close(self) -> None:
+        """Flush the zlib stream and write IEND; delete a file left short of rows."""
+        if self._handle.closed:
+            return
+        try:
+            if self._rows_written != self.height:
+                self._handle.close()
+                self.path.unlink(missing_ok=True)
+                msg = f"{self.path.name}: wrote {self._rows_written} of {self.height} rows"
+                raise ValueError(msg)
+            self._pending += self._compressor.flush()
+            self._flush_idat()
+            self._handle.write(_chunk(b"IEND", b""))
+        finally:
+            self._handle.close()
@@ -1,8 +1,10 @@
 """Asynchronous worker for analyzing image submissions."""
 
 import contextlib
+import shutil
 import threading
 from pathlib import Path
+from typing import Any
 
 import sentry_sdk
 from sqlalchemy.exc import SQLAlchemyError
@@ -10,14 +12,115 @@ from sqlalchemy.exc import SQLAlchemyError
 from .analyzers.base_analyzer import SubprocessAnalyzer
 from .analyzers.registry import get_analyzers
 from .app import create_app
-from .config import RESULT_FOLDER
+from .blobstore import store_file
+from .config import IMAGE_EXTENSIONS, NESTED_CPU_SECONDS, NESTED_MAX_DEPTH, RESULT_FOLDER
 from .filetype import detect_file_type
 from .models import Image, Submission, db
+from .nested import cpu_seconds, submit_nested
+from .thumbnails import THUMB_DIRNAME, THUMB_SUFFIX, generate_preview, generate_thumbnails
+from .utils.carving import EMBEDDED_TAG, is_embedded, scan_file
 from .utils.sentry import initialize_sentry
 
 
-def analyze_image(submission_hash: str) -> None:
-    """Analyze an image submission by running multiple analysis tools concurrently."""
+def _write_downscaled(img_path: Path, result_path: Path, tags: frozenset[str]) -> None:
+    """Write tile thumbnails and the info-panel preview after the analyzers.
+
+    Routes serve the full-size files until these exist, so a failure here only
+    costs bandwidth, never results.
+    """
+    try:
+        generate_thumbnails(result_path)
+        if "image" in tags:
+            generate_preview(img_path, result_path.parent)
+    except OSError as exc:
+        sentry_sdk.capture_exception(exc)
+
+
+def _fresh_result_path(img_hash: str, submission_hash: str) -> Path:
+    """Create an empty result folder for the submission.
+
+    A re-run starts afresh: the files of a previous run may be links into the
+    blob store, which must never be written in place.
+    """
+    result_path = RESULT_FOLDER / img_hash / submission_hash
+    shutil.rmtree(result_path, ignore_errors=True)
+    result_path.mkdir(parents=True, exist_ok=True)
+    return result_path
+
+
+def _store_derived(result_path: Path) -> None:
+    """Move the derived images and their thumbnails into the blob store.
+
+    Identical images (the blank bit planes of countless uploads) then exist
+    once on disk. Best-effort like the thumbnails: the files stay in place.
+    """
+    suffixes = {*IMAGE_EXTENSIONS, THUMB_SUFFIX}
+    try:
+        for directory in (result_path, result_path / THUMB_DIRNAME):
+            if not directory.is_dir():
+                continue
+            for path in directory.iterdir():
+                if path.suffix.lower() in suffixes and path.is_file() and not path.is_symlink():
+                    store_file(path)
+    except OSError as exc:
+        sentry_sdk.capture_exception(exc)
+
+
+def _detect_tags(img_path: Path) -> frozenset[str]:
+    """Return the file-type tags of an upload, plus ``EMBEDDED_TAG`` when it embeds files.
+
+    One in-process signature scan decides whether the external carvers
+    (binwalk, foremost) have anything to find.
+    """
+    tags = detect_file_type(img_path).tags
+    if is_embedded(scan_file(img_path)):
+        tags |= {EMBEDDED_TAG}
+    return tags
+
+
+def _run_analyzer(
+    analyzer_cls: type[SubprocessAnalyzer],
+    img_path: Path,
+    result_path: Path,
+    password: str | None,
+    info: dict[str, Any],
+) -> None:
+    """Run an analyzer class (in a separate thread), reporting its errors to Sentry."""
+    try:
+        analyzer_cls.execute(img_path, result_path, password)
+    except (RuntimeError, ValueError, OSError, TypeError) as exc:
+        with sentry_sdk.push_scope() as scope:
+            scope.set_tag("analyzer", analyzer_cls.name)
+            scope.set_tag("submission_hash", info["submission_hash"])
+            # Attach the analyzed image so errors can be
+            # reproduced from the Sentry event (issue #193).
+            with contextlib.suppress(OSError):
+                scope.add_attachment(path=str(img_path))
+            scope.set_context(
+                "analyzer_info",
+                {
+                    "tool": analyzer_cls.name,
+                    "image_path": str(img_path),
+                    "result_path": str(result_path),
+                    "filename": info["filename"],
+                    "deep_analysis": info["deep_analysis"],
+                },
+            )
+            scope.fingerprint = ["analyzer-error", analyzer_cls.name]
+            sentry_sdk.capture_exception(exc)
+
+
+def analyze_image(
+    submission_hash: str,
+    nested_depth: int = NESTED_MAX_DEPTH,
+    cpu_budget: float = NESTED_CPU_SECONDS,
+) -> None:
+    """Analyze an image submission by running multiple analysis tools concurrently.
+
+    Afterwards the extracted images and audio files are submitted in turn,
+    ``nested_depth`` levels deep within ``cpu_budget`` CPU seconds (see
+    ``aperisolve.nested``); uploads start with the configured budgets.
+    """
     initialize_sentry()
     app = create_app()
     with app.app_context():
@@ -41,57 +144,45 @@ def analyze_image(submission_hash: str) -> None:
         # and the analyzer threads below must never trigger lazy loads on the
         # shared, non-thread-safe session.
         password = submission.password
-        filename = submission.filename
-        deep_analysis = bool(submission.deep_analysis)
-        img_file = str(image.file)
+        info = {
+            "submission_hash": submission_hash,
+            "filename": submission.filename,
+            "deep_analysis": bool(submission.deep_analysis),
+        }
+        img_path = Path(str(image.file))
         img_hash = str(image.hash)
         db.session.commit()
+        cpu_start = cpu_seconds()
 
         try:
-            img_path = Path(img_file)
-            result_path = RESULT_FOLDER / img_hash / submission_hash
-            result_path.mkdir(parents=True, exist_ok=True)
+            result_path = _fresh_result_path(img_hash, submission_hash)
 
             # Classify once, before spawning threads, so every analyzer shares a
             # single immutable snapshot of the detected file-type tags (no
             # per-thread re-detection, no race on the shared session/filesystem).
-            tags = detect_file_type(img_path).tags
+            tags = _detect_tags(img_path)
 
             threads: list[threading.Thread] = []
-
-            def run_analyzer(analyzer_cls: type[SubprocessAnalyzer]) -> None:
-                """Run an analyzer class in a separate thread."""
-                try:
-                    analyzer_cls.execute(img_path, result_path, password)
-                except (RuntimeError, ValueError, OSError, TypeError) as exc:
-                    with sentry_sdk.push_scope() as scope:
-                        scope.set_tag("analyzer", analyzer_cls.name)
-                        scope.set_tag("submission_hash", submission_hash)
-                        # Attach the analyzed image so errors can be
-                        # reproduced from the Sentry event (issue #193).
-                        with contextlib.suppress(OSError):
-                            scope.add_attachment(path=str(img_path))
-                        scope.set_context(
-                            "analyzer_info",
-                            {
-                                "tool": analyzer_cls.name,
-                                "image_path": str(img_path),
-                                "result_path": str(result_path),
-                                "filename": filename,
-                                "deep_analysis": deep_analysis,
-                            },
-                        )
-                        scope.fingerprint = ["analyzer-error", analyzer_cls.name]
-                        sentry_sdk.capture_exception(exc)
-
-            for analyzer_cls in get_analyzers(deep=deep_analysis, tags=tags):
-                thread = threading.Thread(target=run_analyzer, args=(analyzer_cls,))
+            for analyzer_cls in get_analyzers(deep=info["deep_analysis"], tags=tags):
+                thread = threading.Thread(
+                    target=_run_analyzer,
+                    args=(analyzer_cls, img_path, result_path, password, info),
+                )
                 threads.append(thread)
                 thread.start()
 
             for thread in threads:
                 thread.join()
 
+            _write_downscaled(img_path, result_path, tags)
+            _store_derived(result_path)
+            submit_nested(
+                app.config["REDIS_QUEUE"],
+                result_path,
+                nested_depth,
+                cpu_budget - (cpu_seconds() - cpu_start),
+            )
+
             submission.status = "completed"
         except (RuntimeError, ValueError, OSError, TypeError, SQLAlchemyError) as exc:
             sentry_sdk.capture_exception(exc)
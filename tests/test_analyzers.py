@@ -1,25 +1,32 @@
 """Smoke tests running cheap analyzers against fixture inputs."""
 
+import io
 import json
 import os
 import shutil
+import subprocess
 import wave
 from pathlib import Path
 
 import numpy as np
 import pytest
-from PIL import Image
+from PIL import Image, PngImagePlugin
 
+from aperisolve.analyzers import decomposer, identify, pil_utils, spectrogram
+from aperisolve.analyzers.audio_lsb import PLANE_WIDTH, AudioLsbAnalyzer
 from aperisolve.analyzers.color_remapping import RANDOM_REMAPPING_COUNT, ColorRemappingAnalyzer
 from aperisolve.analyzers.decomposer import DecomposerAnalyzer
 from aperisolve.analyzers.file import FileAnalyzer
+from aperisolve.analyzers.identify import IdentifyAnalyzer, channel_statistics, unique_colors
 from aperisolve.analyzers.outguess import OutguessAnalyzer
 from aperisolve.analyzers.pdfid import PdfidAnalyzer
 from aperisolve.analyzers.pdfinfo import PdfinfoAnalyzer
 from aperisolve.analyzers.pil_utils import PALETTE_NOTE
-from aperisolve.analyzers.spectrogram import SpectrogramAnalyzer
+from aperisolve.analyzers.spectrogram import SpectrogramAnalyzer, _StftStream, _waveform_plot
 from aperisolve.analyzers.strings import StringsAnalyzer
+from aperisolve.analyzers.video import MAX_FRAMES, VideoAnalyzer, describe_container, sample_times
 from aperisolve.filetype import detect_file_type
+from aperisolve.utils.lsb import classify
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 EXAMPLE_IMAGE = REPO_ROOT / "examples" / "example1.png"
@@ -54,6 +61,66 @@ def test_decomposer_produces_bit_planes(tmp_path: Path) -> None:
     assert results["decomposer"]["images"]
 
 
+@pytest.mark.parametrize("mode", ["L", "LA", "RGB", "RGBA"])
+def test_decomposer_strip_planes_match_pixels(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    mode: str,
+) -> None:
+    """Strip-wise planes equal whole-image bit extraction, across strip edges."""
+    monkeypatch.setattr(decomposer, "STRIP_BYTES", 64)
+    channels = len(mode)
+    pixels = np.random.default_rng(1).integers(0, 256, size=(23, 17, channels), dtype=np.uint8)
+    src = tmp_path / "src.png"
+    Image.fromarray(pixels[..., 0] if channels == 1 else pixels, mode).save(src)
+    DecomposerAnalyzer.execute(src, tmp_path)
+
+    entry = _read_results(tmp_path)["decomposer"]
+    assert entry["status"] == "ok", entry
+    labels = decomposer.MODE_CHANNELS[mode]
+    for c, label in enumerate(labels):
+        with Image.open(tmp_path / f"{label}_bit_3.png") as plane:
+            assert plane.mode == "1"
+            expected = ((pixels[..., c] >> 3) & 1) * 255
+            assert np.array_equal(np.asarray(plane.convert("L")), expected)
+    if channels >= 3:
+        with Image.open(tmp_path / "superimposed_bit_0.png") as plane:
+            expected = (pixels[..., :3] & 1) * 255
+            assert np.array_equal(np.asarray(plane.convert("RGB")), expected)
+
+
+def test_decomposer_16bit_planes_are_the_low_byte(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """16-bit grayscale samples are not clamped to 8 bits before decomposing."""
+    monkeypatch.setattr(decomposer, "STRIP_BYTES", 64)
+    pixels = np.random.default_rng(3).integers(0, 1 << 16, size=(8, 8), dtype=np.uint16)
+    src = tmp_path / "src.png"
+    Image.fromarray(pixels).save(src)
+    with Image.open(src) as img:
+        assert img.mode.startswith("I")
+    DecomposerAnalyzer.execute(src, tmp_path)
+
+    assert _read_results(tmp_path)["decomposer"]["status"] == "ok"
+    for bit in (0, 7):
+        with Image.open(tmp_path / f"Grayscale_bit_{bit}.png") as plane:
+            expected = ((pixels >> bit) & 1) * 255
+            assert np.array_equal(np.asarray(plane.convert("L")), expected)
+
+
+def test_decomposer_truncated_png_leaves_no_planes(tmp_path: Path) -> None:
+    """Truncated pixel data is an error result, with no half-written planes."""
+    src = tmp_path / "truncated.png"
+    _truncated_png(src)
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    DecomposerAnalyzer.execute(src, output_dir)
+
+    assert _read_results(output_dir)["decomposer"]["status"] == "error"
+    assert not list(output_dir.glob("*_bit_*.png"))
+
+
 @pytest.mark.skipif(shutil.which("file") is None, reason="file binary not installed")
 def test_file_identifies_png(tmp_path: Path) -> None:
     """The `file` analyzer identifies the fixture as a PNG."""
@@ -66,6 +133,114 @@ def test_file_identifies_png(tmp_path: Path) -> None:
     assert "PNG" in results["file"]["output"]
 
 
+def test_identify_reports_header_and_channel_statistics(tmp_path: Path) -> None:
+    """Statistics match NumPy's; PNG text chunks are listed as properties."""
+    pixels = np.random.default_rng(7).integers(0, 256, (40, 30, 4), dtype=np.uint8)
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Comment", "CTF{identify}")
+    upload = tmp_path / "rgba.png"
+    Image.fromarray(pixels, "RGBA").save(upload, pnginfo=info)
+    output_dir = tmp_path / "out"
+    IdentifyAnalyzer.execute(upload, output_dir)
+    result = _read_results(output_dir)["identify"]
+    table = result["output"]
+    assert table["Format"].startswith("PNG")
+    assert (table["Geometry"], table["Mode"], table["Depth"]) == (
+        "30x40",
+        "RGBA",
+        "8 bits per channel",
+    )
+    assert table["Property Comment"] == "CTF{identify}"
+    alpha = pixels[..., 3].astype(np.float64)
+    assert table["Alpha"] == (
+        f"min {alpha.min():g}, max {alpha.max():g}, "
+        f"mean {alpha.mean():.2f}, std dev {alpha.std():.2f}"
+    )
+    assert int(table["Colors"]) == len(np.unique(pixels.reshape(-1, 4), axis=0))
+    assert set(result["histogram"]) == {"Red", "Green", "Blue", "Alpha"}
+    assert result["histogram"]["Red"] == np.bincount(pixels[..., 0].ravel(), minlength=256).tolist()
+
+
+@pytest.mark.parametrize("channels", [1, 3, 4, 5])
+def test_identify_counts_unique_colors(monkeypatch: pytest.MonkeyPatch, channels: int) -> None:
+    """Bitmap, packed-sort and generic counting agree with np.unique."""
+    monkeypatch.setattr(identify, "SLICE_PIXELS", 64)
+    pixels = np.random.default_rng(channels).integers(0, 4, (500, channels), dtype=np.uint8)
+    assert unique_colors(pixels) == len(np.unique(pixels, axis=0))
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_identify_statistics_sum_histograms_over_slices(
+    monkeypatch: pytest.MonkeyPatch,
+    dtype: type[np.unsignedinteger],
+) -> None:
+    """Slice-wise histograms give the whole-channel statistics."""
+    monkeypatch.setattr(identify, "SLICE_PIXELS", 64)
+    pixels = np.random.default_rng(5).integers(3, 200, (500, 2), dtype=dtype)
+    stats, histogram = channel_statistics(pixels[:, 1])
+    column = pixels[:, 1].astype(np.float64)
+    assert stats["min"] == column.min()
+    assert stats["max"] == column.max()
+    assert stats["mean"] == pytest.approx(column.mean())
+    assert stats["std"] == pytest.approx(column.std())
+    assert (histogram is not None) == (dtype == np.uint8)
+
+
+def test_identify_handles_16_bit_and_bilevel_images(tmp_path: Path) -> None:
+    """16-bit channels are reduced by histogram too, without a histogram in the result."""
+    deep = tmp_path / "deep.png"
+    Image.fromarray(np.array([[0, 65535], [1000, 2000]], dtype=np.uint16)).save(deep)
+    IdentifyAnalyzer.execute(deep, tmp_path / "deep")
+    result = _read_results(tmp_path / "deep")["identify"]
+    assert result["output"]["Gray"].startswith("min 0, max 65535, mean 17133.75")
+    assert "histogram" not in result
+
+    bilevel = tmp_path / "bilevel.png"
+    Image.new("1", (8, 8), 1).save(bilevel)
+    IdentifyAnalyzer.execute(bilevel, tmp_path / "bilevel")
+    table = _read_results(tmp_path / "bilevel")["identify"]["output"]
+    assert (table["Depth"], table["Colors"]) == ("1 bits per channel", "1")
+
+
+def _truncated_png(path: Path) -> None:
+    pixels = np.random.default_rng(5).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "PNG")
+    path.write_bytes(buffer.getvalue()[: len(buffer.getvalue()) // 2])
+
+
+@pytest.mark.parametrize("name", ["odd.xcf", "truncated.png"])
+def test_identify_falls_back_to_graphicsmagick(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    name: str,
+) -> None:
+    """Files Pillow cannot decode, truncated ones included, go through identify -verbose."""
+    commands: list[list[str]] = []
+
+    def _identify(
+        _self: IdentifyAnalyzer,
+        cmd: list[str],
+        cwd: Path | None = None,
+    ) -> subprocess.CompletedProcess[str]:
+        _ = cwd
+        commands.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, "Image: odd.xcf\n  Format: XCF\n", "")
+
+    monkeypatch.setattr(IdentifyAnalyzer, "run_command", _identify)
+    upload = tmp_path / name
+    if name == "truncated.png":
+        _truncated_png(upload)
+    else:
+        upload.write_bytes(b"gimp xcf v011" + bytes(64))
+    IdentifyAnalyzer.execute(upload, tmp_path / "out")
+    assert [cmd[:2] for cmd in commands] == [["identify", "-verbose"]]
+    assert _read_results(tmp_path / "out")["identify"]["output"] == [
+        "Image: odd.xcf",
+        "  Format: XCF",
+    ]
+
+
 @pytest.mark.skipif(shutil.which("strings") is None, reason="strings binary not installed")
 def test_strings_extracts_text(tmp_path: Path) -> None:
     """The strings analyzer returns lines without error."""
@@ -163,6 +338,57 @@ def test_spectrogram_renders_for_pcm_wav(
             assert img.mode == "RGB", (name, img.mode)
 
 
+@pytest.mark.parametrize("n_samples", [1, 7, 900, 5000])
+def test_waveform_envelope_covers_every_column(n_samples: int) -> None:
+    """Each column spans its segment's min..max, even for clips shorter than the plot."""
+    signal = np.sin(np.linspace(0, 40, n_samples)).astype(np.float32)
+    canvas = _waveform_plot(signal)
+    height, width = canvas.shape[:2]
+    starts = np.linspace(0, n_samples, width + 1, dtype=np.int64)
+    for x in (0, width // 2, width - 1):
+        seg = signal[starts[x] : max(starts[x + 1], starts[x] + 1)]
+        y_hi = int((1.0 - (seg.max() + 1.0) / 2.0) * (height - 1))
+        y_lo = int((1.0 - (seg.min() + 1.0) / 2.0) * (height - 1))
+        drawn = np.flatnonzero((canvas[:, x] != 255).any(axis=1))
+        assert drawn.min() == y_hi
+        assert drawn.max() == y_lo
+
+
+def test_stft_stream_ignores_block_boundaries() -> None:
+    """Feeding samples in odd-sized blocks yields the same heatmap as one block."""
+    samples = np.random.default_rng(0).standard_normal((20000, 2)).astype(np.float32)
+    whole = _StftStream(2)
+    whole.push(samples)
+    pieces = _StftStream(2)
+    for start in range(0, len(samples), 777):
+        pieces.push(samples[start : start + 777])
+    assert np.array_equal(whole.heatmaps(), pieces.heatmaps())
+
+
+def test_spectrogram_renders_long_clips_in_full(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Clips wider than the column budget are pooled, not truncated."""
+    monkeypatch.setattr(spectrogram, "_BLOCK_FRAMES", 1000)
+    monkeypatch.setattr(spectrogram, "_POOL_COLUMNS", 8)
+    wav = tmp_path / "long.wav"
+    frames = 20 * _WAV_FRAMES
+    tone = np.sin(2.0 * np.pi * _WAV_FREQ * np.arange(frames) / _WAV_RATE)
+    with wave.open(str(wav), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(_WAV_RATE)
+        out.writeframes(_pack_pcm(tone, 2))
+    SpectrogramAnalyzer.execute(wav, tmp_path)
+
+    entry = _read_results(tmp_path)["spectrogram"]
+    assert entry["status"] == "ok", entry
+    assert "note" not in entry
+    assert entry["output"]["Frames"] == str(frames)
+    assert entry["output"]["Duration"] == f"{frames / _WAV_RATE:.2f} s"
+
+
 def test_spectrogram_errors_on_non_audio(tmp_path: Path) -> None:
     """Running the audio analyzer on an image records an error, never an exception."""
     SpectrogramAnalyzer.execute(FIXTURES / "openstego.png", tmp_path)
@@ -170,6 +396,102 @@ def test_spectrogram_errors_on_non_audio(tmp_path: Path) -> None:
     assert entry["status"] == "error", entry
 
 
+@pytest.mark.parametrize("sampwidth", [1, 2, 3, 4], ids=["8bit", "16bit", "24bit", "32bit"])
+def test_audio_lsb_finds_text_in_one_channel(tmp_path: Path, sampwidth: int) -> None:
+    """A message in the right channel's sample LSBs is found whatever the width."""
+    wav = tmp_path / "stego.wav"
+    _write_sine_wav(wav, sampwidth=sampwidth, n_channels=2)
+    frames = bytearray(wav.read_bytes())
+    message = b"flag{lsb_in_the_samples}"
+    bits = np.unpackbits(np.frombuffer(message, dtype=np.uint8))
+    data_start = len(frames) - _WAV_FRAMES * 2 * sampwidth
+    for i, bit in enumerate(bits):
+        low = data_start + (2 * i + 1) * sampwidth  # right channel, low byte
+        frames[low] = (frames[low] & ~1) | int(bit)
+    wav.write_bytes(bytes(frames))
+    AudioLsbAnalyzer.execute(wav, tmp_path)
+
+    entry = _read_results(tmp_path)["audio_lsb"]
+    assert entry["status"] == "ok", entry
+    # The sine's own LSBs after the message may extend the printable run.
+    prefix = f"Right, 1 bit/sample, MSB first, offset 0: text {message.decode()!r}"[:-1]
+    assert any(line.startswith(prefix) for line in entry["output"]), entry["output"]
+    assert len(entry["images"]["LSB plane"]) == 2
+    with Image.open(tmp_path / "audio_lsb_plane_2.png") as plane:
+        assert plane.mode == "1"
+        assert plane.size == (PLANE_WIDTH, _WAV_FRAMES // PLANE_WIDTH)
+
+
+def test_audio_lsb_ignores_repetitive_lsbs() -> None:
+    """Constant or periodic LSBs re-pack to printable runs that are not text."""
+    assert classify(b"UUUUUUUUUUUUUUUUUUUU") is None
+    assert classify(b"\x89PNG\r\n\x1a\n\x00") == "PNG image"
+
+
+def test_video_metadata_table_lists_streams_and_tags() -> None:
+    """Container, streams (cover art flagged) and container tags are tabulated."""
+    probe = {
+        "format": {
+            "format_long_name": "QuickTime / MOV",
+            "duration": "12.5",
+            "bit_rate": "128000",
+            "tags": {"comment": "look closer"},
+        },
+        "streams": [
+            {
+                "index": 0,
+                "codec_type": "video",
+                "codec_name": "h264",
+                "width": 640,
+                "height": 360,
+                "avg_frame_rate": "30000/1001",
+            },
+            {
+                "index": 1,
+                "codec_type": "audio",
+                "codec_name": "aac",
+                "sample_rate": "44100",
+                "channels": 2,
+            },
+            {
+                "index": 2,
+                "codec_type": "video",
+                "codec_name": "mjpeg",
+                "width": 64,
+                "height": 64,
+                "disposition": {"attached_pic": 1},
+            },
+        ],
+    }
+    assert describe_container(probe) == {
+        "Container": "QuickTime / MOV",
+        "Duration": "12.50 s",
+        "Bit rate": "128 kb/s",
+        "Stream 0": "video, h264, 640x360, 30 fps",
+        "Stream 1": "audio, aac, 44100 Hz, 2 ch",
+        "Stream 2": "video, mjpeg, 64x64, cover art",
+        "Tag comment": "look closer",
+    }
+
+
+def test_video_samples_are_bounded_by_the_frame_budget() -> None:
+    """Long videos get MAX_FRAMES samples, short ones one per frame."""
+    assert len(sample_times(3600.0, 108000)) == MAX_FRAMES
+    assert sample_times(1.5, 3) == [0.0, 0.5, 1.0]
+    assert sample_times(0.0, 0) == [0.0]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg binary not installed")
+def test_video_finds_lsb_text_in_first_frame(tmp_path: Path) -> None:
+    """The uncompressed AVI fixture hides a flag in its first frame's RGB LSBs."""
+    VideoAnalyzer.execute(FIXTURES / "frames.avi", tmp_path)
+    entry = _read_results(tmp_path)["video"]
+    assert entry["status"] == "ok", entry
+    assert entry["output"]["Stream 0"].startswith("video, rawvideo, 64x48")
+    assert "flag{frames_hide_bits_too}" in entry["output"]["Frame 1 (0.00 s) LSB"]
+    assert len(entry["images"]["Frame"]) == 3
+
+
 @pytest.mark.skipif(shutil.which("pdfinfo") is None, reason="pdfinfo binary not installed")
 def test_pdfinfo_reports_metadata(tmp_path: Path) -> None:
     """Poppler's pdfinfo returns metadata lines for the sample PDF."""
@@ -284,7 +606,7 @@ def _synthetic_image(path: Path, mode: str, size: tuple[int, int] = (16, 16)) ->
 
 @pytest.mark.parametrize(
     ("mode", "expected_out_mode"),
-    [("L", "RGB"), ("RGB", "RGB"), ("RGBA", "RGBA"), ("P", "RGB")],
+    [("L", "RGB"), ("RGB", "RGB"), ("RGBA", "RGBA"), ("P", "P")],
 )
 def test_color_remapping_supports_common_modes(
     tmp_path: Path,
@@ -293,8 +615,9 @@ def test_color_remapping_supports_common_modes(
 ) -> None:
     """Grayscale, RGB, RGBA and palette inputs each yield the full set of PNGs.
 
-    RGBA keeps its alpha channel (output stays RGBA); every other mode is
-    emitted as RGB, exercising both branches of ``_create_remapped_image``.
+    RGBA keeps its alpha channel (output stays RGBA); palettes are remapped
+    by swapping the palette (output stays P); every other mode is emitted as
+    RGB, exercising both branches of ``_create_remapped_image``.
     """
     src = tmp_path / f"{mode.lower()}.png"
     _synthetic_image(src, mode)
@@ -312,8 +635,8 @@ def test_color_remapping_supports_common_modes(
             assert img.mode == expected_out_mode, (png.name, img.mode)
 
 
-def test_color_remapping_notes_palette_conversion(tmp_path: Path) -> None:
-    """A palette (mode 'P') input is converted to RGB and carries the note."""
+def test_color_remapping_keeps_palette_indices(tmp_path: Path) -> None:
+    """A palette (mode 'P') input is remapped through its palette, not converted."""
     src = tmp_path / "palette.png"
     _synthetic_image(src, "P")
     ColorRemappingAnalyzer.execute(src, tmp_path)
@@ -321,6 +644,75 @@ def test_color_remapping_notes_palette_conversion(tmp_path: Path) -> None:
     entry = _read_results(tmp_path)["color_remapping"]
     assert entry["status"] == "ok", entry
     assert entry["note"] == PALETTE_NOTE
+    with Image.open(src) as original, Image.open(tmp_path / "color_remapping_00.png") as out:
+        assert np.array_equal(np.asarray(original), np.asarray(out))
+
+
+def test_decomposer_palette_planes_use_indices(tmp_path: Path) -> None:
+    """Palette images get index planes and colour planes via the palette."""
+    indices = np.arange(64, dtype=np.uint8).reshape(8, 8)
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    palette[:, 0] = np.arange(256)[::-1]
+    src = tmp_path / "palette.png"
+    img = Image.fromarray(indices, mode="P")
+    img.putpalette(palette.tobytes())
+    img.save(src, transparency=bytes([0] + [255] * 255))
+    DecomposerAnalyzer.execute(src, tmp_path)
+
+    entry = _read_results(tmp_path)["decomposer"]
+    assert entry["status"] == "ok", entry
+    assert entry["note"] == PALETTE_NOTE
+    assert set(entry["images"]) == {"Superimposed", "Red", "Green", "Blue", "Alpha", "Index"}
+    with Image.open(tmp_path / "Index_bit_1.png") as plane:
+        assert plane.mode == "P"
+        assert np.array_equal(np.asarray(plane.convert("L")), ((indices >> 1) & 1) * 255)
+    with Image.open(tmp_path / "Red_bit_0.png") as plane:
+        expected = ((palette[indices, 0] >> 0) & 1) * 255
+        assert np.array_equal(np.asarray(plane.convert("L")), expected)
+    with Image.open(tmp_path / "Alpha_bit_7.png") as plane:
+        assert np.asarray(plane.convert("L"))[0, 0] == 0
+        assert np.asarray(plane.convert("L"))[0, 1] == 255
+
+
+@pytest.mark.parametrize("analyzer", [DecomposerAnalyzer, ColorRemappingAnalyzer])
+def test_client_rendering_skips_server_pngs(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    analyzer: type[DecomposerAnalyzer | ColorRemappingAnalyzer],
+) -> None:
+    """With CLIENT_RENDERING on, a lossless RGB PNG yields a spec, not PNGs."""
+    monkeypatch.setattr(pil_utils, "CLIENT_RENDERING", True)
+    src = tmp_path / "rgb.png"
+    _synthetic_image(src, "RGB")
+    output_dir = tmp_path / ("5" * 32)
+    analyzer.execute(src, output_dir)
+
+    entry = _read_results(output_dir)[analyzer.name]
+    assert entry["status"] == "ok", entry
+    assert "images" not in entry
+    spec = entry["client_render"]
+    assert spec["source"] == "/image/rgb.png"
+    assert spec["transform"] == f"/transform/{'5' * 32}"
+    assert spec["channels"] == ["Red", "Green", "Blue"]
+    assert not list(output_dir.glob("*.png"))
+
+
+@pytest.mark.parametrize("mode", ["P", "RGBA"])
+def test_client_rendering_keeps_server_path_for_lossy_modes(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    mode: str,
+) -> None:
+    """Palette and alpha images still render server-side in client mode."""
+    monkeypatch.setattr(pil_utils, "CLIENT_RENDERING", True)
+    src = tmp_path / f"{mode.lower()}.png"
+    _synthetic_image(src, mode)
+    DecomposerAnalyzer.execute(src, tmp_path)
+
+    entry = _read_results(tmp_path)["decomposer"]
+    assert entry["status"] == "ok", entry
+    assert "client_render" not in entry
+    assert entry["images"]
 
 
 def test_color_remapping_errors_on_undecodable_input(tmp_path: Path) -> None:
@@ -0,0 +1,128 @@
+"""Tests for the ZIP archives assembled at download time."""
+
+import io
+import os
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from aperisolve import app as app_module
+from aperisolve import blobstore
+from aperisolve.archives import LEFT_OUT_NAME, archive_file, compress_type, stream_zip
+from aperisolve.blobstore import MANIFEST_SUFFIX, store_tree, write_manifest
+from aperisolve.models import Image, Submission, db
+
+IMG_HASH = "c" * 32
+SUB_HASH = "d" * 32
+
+
+@pytest.fixture(autouse=True)
+def blob_folder(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Point the store at an isolated folder."""
+    folder = tmp_path / "blobs"
+    monkeypatch.setattr(blobstore, "BLOB_FOLDER", folder)
+    return folder
+
+
+def _files(directory: Path) -> dict[str, bytes]:
+    contents = {
+        "notes.txt": b"CTF{deflated} " * 200,
+        "png/00000001.png": os.urandom(4096),
+        "tiny.bin": b"x",
+    }
+    for name, data in contents.items():
+        (directory / name).parent.mkdir(parents=True, exist_ok=True)
+        (directory / name).write_bytes(data)
+    return contents
+
+
+def _unzip(data: bytes) -> dict[str, bytes]:
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.testzip() is None
+        return {name: zip_file.read(name) for name in zip_file.namelist()}
+
+
+def test_compression_is_chosen_per_entry(tmp_path: Path) -> None:
+    """Text is deflated; random and tiny files are stored as they are."""
+    contents = _files(tmp_path / "in")
+    data = b"".join(stream_zip(store_tree(tmp_path / "in")))
+    assert _unzip(data) == contents
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        types = {info.filename: info.compress_type for info in zip_file.infolist()}
+    assert types == {
+        "notes.txt": zipfile.ZIP_DEFLATED,
+        "png/00000001.png": zipfile.ZIP_STORED,
+        "tiny.bin": zipfile.ZIP_STORED,
+    }
+    assert compress_type(tmp_path / "in" / "notes.txt") == zipfile.ZIP_DEFLATED
+
+
+def test_archives_are_reproducible_and_capped(tmp_path: Path) -> None:
+    """Same files, same bytes; files past the size cap are listed instead."""
+    _files(tmp_path / "in")
+    manifest = store_tree(tmp_path / "in")
+    first = b"".join(stream_zip(manifest))
+    time.sleep(0.01)
+    assert b"".join(stream_zip(manifest)) == first
+
+    capped = _unzip(b"".join(stream_zip(manifest, max_bytes=3000)))
+    assert sorted(capped) == [LEFT_OUT_NAME, "notes.txt", "tiny.bin"]
+    assert capped[LEFT_OUT_NAME].endswith(b"png/00000001.png")
+
+
+@pytest.fixture
+def output_dir(app: Flask, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Create a submission whose binwalk and foremost extracted files."""
+    monkeypatch.setattr(app_module, "RESULT_FOLDER", tmp_path)
+    output_dir = tmp_path / IMG_HASH / SUB_HASH
+    for tool, name in (("binwalk", "0.txt"), ("foremost", "zip/00000001.zip")):
+        extracted = output_dir / tool
+        (extracted / name).parent.mkdir(parents=True)
+        (extracted / name).write_bytes(f"{tool} output".encode())
+        write_manifest(output_dir / f"{tool}{MANIFEST_SUFFIX}", store_tree(extracted))
+    with app.app_context():
+        db.session.add(Image(hash=IMG_HASH, file=str(tmp_path / "x.png"), size=1, upload_count=1))
+        db.session.add(
+            Submission(hash=SUB_HASH, filename="x.png", date=time.time(), image_hash=IMG_HASH),
+        )
+        db.session.commit()
+    return output_dir
+
+
+def test_download_streams_then_serves_the_stored_zip(
+    client: FlaskClient,
+    output_dir: Path,
+) -> None:
+    """The first download assembles the ZIP; the next one is a plain file."""
+    assert archive_file(output_dir, "binwalk") is None
+    first = client.get(f"/download/{SUB_HASH}/binwalk")
+    assert first.content_length is None
+    assert first.headers["Content-Disposition"] == 'attachment; filename="binwalk.zip"'
+    assert _unzip(first.data) == {"0.txt": b"binwalk output"}
+    assert archive_file(output_dir, "binwalk") == output_dir / "binwalk.zip"
+
+    second = client.get(f"/download/{SUB_HASH}/binwalk")
+    assert second.content_length == len(first.data)
+    assert second.data == first.data
+
+
+def test_download_all_bundles_every_tool(client: FlaskClient, output_dir: Path) -> None:
+    """/download/<hash>/all holds each tool's files under its name."""
+    response = client.get(f"/download/{SUB_HASH}/all")
+    assert _unzip(response.data) == {
+        "binwalk/0.txt": b"binwalk output",
+        "foremost/zip/00000001.zip": b"foremost output",
+    }
+    assert (output_dir / "all.zip").is_file()
+
+
+def test_download_serves_7z_archives_and_404s(client: FlaskClient, output_dir: Path) -> None:
+    """A 7z built at analysis time is served as is; unknown tools are not found."""
+    (output_dir / "steghide.7z").write_bytes(b"7z archive")
+    assert client.get(f"/download/{SUB_HASH}/steghide").data == b"7z archive"
+    assert client.get(f"/download/{SUB_HASH}/outguess").status_code == 404
+    assert client.get(f"/download/{SUB_HASH}/unknown").status_code == 404
@@ -0,0 +1,134 @@
+"""Tests for the content-addressed blob store and archive reuse."""
+
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from aperisolve import archives, blobstore, workers
+from aperisolve.analyzers.base_analyzer import SubprocessAnalyzer
+from aperisolve.blobstore import (
+    MANIFEST_SUFFIX,
+    file_digest,
+    manifest_key,
+    object_path,
+    store_file,
+    store_tree,
+    sweep,
+)
+
+
+@pytest.fixture(autouse=True)
+def blob_folder(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Point the store at an isolated folder."""
+    folder = tmp_path / "blobs"
+    monkeypatch.setattr(blobstore, "BLOB_FOLDER", folder)
+    return folder
+
+
+class _ArchivingAnalyzer(SubprocessAnalyzer):
+    """Analyzer whose extracted files are archived by a counted fake 7z."""
+
+    name = "archiving"
+    has_archive = True
+    register = False
+    runs = 0
+
+    def run_command(
+        self,
+        cmd: list[str],
+        cwd: Path | None = None,
+    ) -> subprocess.CompletedProcess[str]:
+        """Write the archive 7z would, and count the run."""
+        assert cwd is not None
+        type(self).runs += 1
+        names = ",".join(sorted(path.name for path in cwd.iterdir()))
+        (cwd / cmd[2]).write_text(f"7z archive of {names}", encoding="utf-8")
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+
+def test_identical_files_share_one_blob(tmp_path: Path) -> None:
+    """Storing a second copy turns it into a link to the first."""
+    first, second = tmp_path / "a.png", tmp_path / "b.png"
+    first.write_bytes(b"same bytes")
+    second.write_bytes(b"same bytes")
+    digest = store_file(first)
+    assert store_file(second) == digest == file_digest(object_path(digest))
+    assert first.stat().st_ino == second.stat().st_ino == object_path(digest).stat().st_ino
+    assert object_path(digest).stat().st_nlink == 3
+    assert second.read_bytes() == b"same bytes"
+
+
+def test_store_tree_lists_regular_files_only(tmp_path: Path) -> None:
+    """The manifest maps relative paths to digests and ignores symlinks."""
+    (tmp_path / "out" / "zip").mkdir(parents=True)
+    (tmp_path / "out" / "zip" / "00000001.zip").write_bytes(b"PK")
+    (tmp_path / "out" / "audit.txt").write_text("log", encoding="utf-8")
+    (tmp_path / "out" / "escape").symlink_to("/etc/passwd")
+    manifest = store_tree(tmp_path / "out")
+    assert list(manifest) == ["audit.txt", "zip/00000001.zip"]
+    assert manifest["audit.txt"] == file_digest(tmp_path / "out" / "audit.txt")
+    assert manifest_key(manifest) == manifest_key(dict(reversed(manifest.items())))
+
+
+def test_sweep_deletes_unreferenced_blobs_only(tmp_path: Path) -> None:
+    """A blob survives while any result folder still links to it."""
+    kept, dropped = tmp_path / "kept.png", tmp_path / "dropped.png"
+    kept.write_bytes(b"kept")
+    dropped.write_bytes(b"dropped")
+    kept_digest, dropped_digest = store_file(kept), store_file(dropped)
+    dropped.unlink()
+    assert sweep() == 1
+    assert object_path(kept_digest).exists()
+    assert not object_path(dropped_digest).exists()
+
+
+def test_identical_extractions_are_archived_once(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A second submission extracting the same files reuses the stored 7z archive."""
+    monkeypatch.setattr(archives, "ARCHIVE_FORMAT", "7z")
+    _ArchivingAnalyzer.runs = 0
+    built = []
+    for submission in ("first", "second"):
+        output_dir = tmp_path / submission
+        analyzer = _ArchivingAnalyzer(tmp_path / "upload.png", output_dir)
+        extracted = analyzer.get_extracted_dir()
+        extracted.mkdir(parents=True)
+        (extracted / "flag.txt").write_text("CTF{once}", encoding="utf-8")
+        analyzer.generate_archive()
+        built.append(output_dir / "archiving.7z")
+        manifest = json.loads((output_dir / f"archiving{MANIFEST_SUFFIX}").read_text())
+        assert manifest == {"flag.txt": file_digest(extracted / "flag.txt")}
+    assert _ArchivingAnalyzer.runs == 1
+    assert built[0].read_bytes() == built[1].read_bytes()
+    assert built[0].stat().st_ino == built[1].stat().st_ino
+
+
+def test_zip_archives_wait_for_a_download(tmp_path: Path) -> None:
+    """By default analyzers only list their files; no archive is built."""
+    _ArchivingAnalyzer.runs = 0
+    analyzer = _ArchivingAnalyzer(tmp_path / "upload.png", tmp_path / "out")
+    extracted = analyzer.get_extracted_dir()
+    extracted.mkdir(parents=True)
+    (extracted / "flag.txt").write_text("CTF{lazy}", encoding="utf-8")
+    assert analyzer.generate_archive() == ""
+    assert _ArchivingAnalyzer.runs == 0
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == [
+        "archiving",
+        f"archiving{MANIFEST_SUFFIX}",
+    ]
+
+
+def test_worker_shares_identical_derived_images(tmp_path: Path) -> None:
+    """Blank bit planes of two images end up as one file on disk."""
+    result_path = tmp_path / "result"
+    result_path.mkdir()
+    for name in ("red_0.png", "green_0.png"):
+        (result_path / name).write_bytes(b"\x89PNG blank plane")
+    (result_path / "results.json").write_text("{}", encoding="utf-8")
+    workers._store_derived(result_path)  # noqa: SLF001
+    assert (result_path / "red_0.png").stat().st_ino == (result_path / "green_0.png").stat().st_ino
+    assert (result_path / "results.json").stat().st_nlink == 1
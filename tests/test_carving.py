@@ -0,0 +1,172 @@
+"""Tests for the in-process embedded-file carving scan and its analyzer."""
+
+import gzip
+import io
+import json
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from aperisolve import blobstore, workers
+from aperisolve.analyzers.carving import NOTHING_FOUND, CarvingAnalyzer
+from aperisolve.blobstore import MANIFEST_SUFFIX
+from aperisolve.utils import carving
+from aperisolve.utils.carving import (
+    EMBEDDED_TAG,
+    MAX_CARVE_SIZE,
+    Carve,
+    extents,
+    is_embedded,
+    scan,
+    scan_file,
+)
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+POLYGLOT = FIXTURES / "polyglot_zip.png"
+
+
+def _image(fmt: str, size: tuple[int, int] = (8, 6)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def _zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("flag.txt", "CTF{carved}" * 20)
+        archive.writestr("second.txt", "more")
+    return buffer.getvalue()
+
+
+def _7z(body: bytes) -> bytes:
+    next_header = struct.pack("<QQI", len(body), 0, 0)
+    return struct.pack("<6sBBI", b"7z\xbc\xaf\x27\x1c", 0, 4, zlib.crc32(next_header)) + (
+        next_header + body
+    )
+
+
+def _elf() -> bytes:
+    header = struct.pack("<HHIQQQIHHHHHH", 2, 62, 1, 0, 64, 200, 0, 64, 56, 1, 64, 3, 2)
+    ident = b"\x7fELF" + bytes([2, 1, 1]) + bytes(9)
+    return (ident + header).ljust(200 + 3 * 64, b"\0")
+
+
+def test_scan_finds_and_sizes_every_format() -> None:
+    """Each supported format is validated and sized from its own structure."""
+    parts = [
+        _image("PNG"),
+        _image("JPEG", (40, 30)),
+        _zip(),
+        gzip.compress(b"hidden" * 100),
+        _7z(b"payload"),
+        b"%PDF-1.7\n1 0 obj\n<<>>\nendobj\n%%EOF\n",
+        _elf(),
+    ]
+    data = b"".join(parts)
+    carves = scan(data)
+    assert [carve.kind for carve in carves] == ["png", "jpg", "zip", "gz", "7z", "pdf", "elf"]
+    offset = 0
+    for carve, part in zip(carves, parts, strict=True):
+        assert (carve.offset, carve.size) == (offset, len(part))
+        offset += len(part)
+    assert carves[0].description == "PNG image, 8 x 6"
+    assert carves[1].description == "JPEG image, 40 x 30"
+    assert carves[2].description == "Zip archive, first entry 'flag.txt'"
+    assert carves[5].description == "PDF document, version 1.7"
+    assert carves[6].description == "ELF 64-bit LSB executable"
+
+
+def test_scan_skips_members_of_a_sized_file() -> None:
+    """The second ZIP entry's local header belongs to the first carve."""
+    carves = scan(b"junk" + _zip())
+    assert [(carve.offset, carve.kind) for carve in carves] == [(4, "zip")]
+
+
+def test_scan_rejects_bare_magic_bytes() -> None:
+    """Magic bytes without a valid header behind them are not reported."""
+    data = b"\x89PNG\r\n\x1a\n" + bytes(20) + b"PK\x03\x04" + bytes(30) + b"\x1f\x8b\x08\xff"
+    assert scan(data) == []
+    assert scan(b"\xff\xd8\xff") == []
+
+
+def test_unknown_sizes_run_to_the_next_carve() -> None:
+    """A RAR (no size in its header) is carved up to the next signature."""
+    rar = b"Rar!\x1a\x07\x01\x00" + bytes(50)
+    png = _image("PNG")
+    carves = scan(rar + png)
+    assert carves[0] == Carve(0, "rar", None, "RAR archive, version 5")
+    assert extents(carves, len(rar + png)) == [len(rar), len(png)]
+
+
+def test_extents_are_capped() -> None:
+    """No carve extends past the end of the upload or MAX_CARVE_SIZE."""
+    carves = [Carve(0, "rar", None, ""), Carve(10, "zip", 2 * MAX_CARVE_SIZE, "")]
+    assert extents(carves, 3 * MAX_CARVE_SIZE) == [10, MAX_CARVE_SIZE]
+    assert extents(carves, 100) == [10, 90]
+
+
+def test_polyglot_fixture_is_embedded(tmp_path: Path) -> None:
+    """The fixture's appended ZIP is found through the memory-mapped scan."""
+    carves = scan_file(POLYGLOT)
+    assert [carve.kind for carve in carves] == ["png", "zip"]
+    assert is_embedded(carves)
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    assert scan_file(empty) == ()
+    assert scan_file(tmp_path / "missing.bin") == ()
+
+
+def test_worker_tags_only_uploads_embedding_files(tmp_path: Path) -> None:
+    """The worker adds the embedded tag that lets binwalk and foremost run."""
+    plain = tmp_path / "plain.png"
+    plain.write_bytes(_image("PNG"))
+    assert EMBEDDED_TAG not in workers._detect_tags(plain)  # noqa: SLF001
+    assert EMBEDDED_TAG in workers._detect_tags(POLYGLOT)  # noqa: SLF001
+
+
+def test_carving_analyzer_lists_the_host_file(tmp_path: Path) -> None:
+    """A file embedding nothing is listed without an archive."""
+    upload = tmp_path / "plain.png"
+    upload.write_bytes(_image("PNG"))
+    out = tmp_path / "out"
+    CarvingAnalyzer.execute(upload, out)
+    result = json.loads((out / "results.json").read_text(encoding="utf-8"))["carving"]
+    assert result["output"] == {"0x0 (0)": f"PNG image, 8 x 6, {upload.stat().st_size} bytes"}
+    assert "download" not in result
+
+
+def test_carving_analyzer_without_signatures(tmp_path: Path) -> None:
+    """Unrecognized data reports that nothing was found."""
+    upload = tmp_path / "noise.bin"
+    upload.write_bytes(b"nothing to see here")
+    out = tmp_path / "out"
+    CarvingAnalyzer.execute(upload, out)
+    result = json.loads((out / "results.json").read_text(encoding="utf-8"))["carving"]
+    assert result == {"status": "ok", "output": NOTHING_FOUND}
+
+
+def test_carving_analyzer_archives_embedded_files(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """The appended ZIP is extracted and listed for the download."""
+    monkeypatch.setattr(blobstore, "BLOB_FOLDER", tmp_path / "blobs")
+    out = tmp_path / "out"
+    CarvingAnalyzer.execute(POLYGLOT, out)
+    result = json.loads((out / "results.json").read_text(encoding="utf-8"))["carving"]
+    assert result["download"] == "/download/out/carving"
+    manifest = json.loads((out / f"carving{MANIFEST_SUFFIX}").read_text(encoding="utf-8"))
+    assert list(manifest) == [f"{scan_file(POLYGLOT)[1].offset:X}.zip"]
+
+
+def test_gzip_hits_share_one_inflate_budget(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Streams past the scan's inflate budget are rejected, not carved unsized."""
+    monkeypatch.setattr(carving, "MAX_INFLATED_SIZE", 3 << 20)
+    stream = gzip.compress(bytes(2 << 20))
+    carves = scan(b"host" + stream + stream + gzip.compress(bytes(4 << 20)))
+    assert [(carve.kind, carve.size) for carve in carves] == [("gz", len(stream))]
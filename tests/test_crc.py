@@ -0,0 +1,57 @@
+"""Tests for the GF(2) CRC-32 field solver."""
+
+import zlib
+
+import numpy as np
+
+from aperisolve.utils.crc import crc32_u32_fields, solve_insertions, solve_u32, solve_u32_batch
+
+
+def test_solve_u32_matches_any_checksum() -> None:
+    """Every field position and checksum has a solution, across the 32-bit range."""
+    rng = np.random.default_rng(1234)
+    for _ in range(200):
+        message = bytearray(rng.integers(0, 256, size=int(rng.integers(4, 40)), dtype=np.uint8))
+        offset = int(rng.integers(0, len(message) - 3))
+        target = int(rng.integers(0, 1 << 32))
+        value = solve_u32(bytes(message), offset, target)
+        message[offset : offset + 4] = value.to_bytes(4, "big")
+        assert zlib.crc32(message) == target
+
+
+def test_solve_u32_recovers_the_original_field() -> None:
+    """The solution is unique, so it is the value that produced the checksum."""
+    message = b"IHDR" + (0xDEADBEEF).to_bytes(4, "big") + bytes(9)
+    assert solve_u32(message[:4] + bytes(13), 4, zlib.crc32(message)) == 0xDEADBEEF
+
+
+def test_solve_u32_batch_agrees_with_single_solves() -> None:
+    """Batch solving over a second field equals one solve per value."""
+    message = b"IHDR" + bytes(8) + b"\x08\x02\x00\x00\x00"
+    target = 0x12345678
+    heights = np.array([1, 2, 255, 256, 65535, 0xFFFFFFFF], dtype=np.uint32)
+    widths = solve_u32_batch(message, 4, 8, heights, target)
+    for height, width in zip(heights, widths, strict=True):
+        probe = message[:8] + int(height).to_bytes(4, "big") + message[12:]
+        assert int(width) == solve_u32(probe, 4, target)
+
+
+def test_crc32_u32_fields_matches_zlib() -> None:
+    """Bulk checksums over two broadcast fields equal zlib's, one message at a time."""
+    message = b"IHDR" + bytes(8) + b"\x08\x06\x00\x00\x01"
+    widths = np.array([[1], [640], [0xFFFFFFFF]], dtype=np.uint32)
+    heights = np.array([1, 480, 65536], dtype=np.uint32)
+    crcs = crc32_u32_fields(message, {4: widths, 8: heights})
+    assert crcs.shape == (3, 3)
+    for (i, j), crc in np.ndenumerate(crcs):
+        probe = message[:4] + int(widths[i, 0]).to_bytes(4, "big")
+        probe += int(heights[j]).to_bytes(4, "big") + message[12:]
+        assert zlib.crc32(probe) == crc
+
+
+def test_solve_insertions_yields_subsets_with_equal_differences() -> None:
+    """Subsets whose CRC differences are equal are all yielded, not just the first."""
+    # A CR inserted before the CR or before the LF makes the same message.
+    message = b"xx\r\ny"
+    crc = zlib.crc32(b"xx\r\r\ny")
+    assert sorted(solve_insertions(message, [0, 2, 3], 1, crc)) == [(2,), (3,)]
@@ -0,0 +1,111 @@
+"""Tests for outputs too large for results.json, served by /output."""
+
+import gzip
+import json
+import time
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from aperisolve import app as app_module
+from aperisolve.analyzers import base_analyzer
+from aperisolve.analyzers.base_analyzer import FULL_OUTPUT_SUFFIX, SubprocessAnalyzer
+from aperisolve.models import Image, Submission, db
+
+IMG_HASH = "e" * 32
+SUB_HASH = "f" * 32
+
+
+class _VerboseAnalyzer(SubprocessAnalyzer):
+    """Analyzer stand-in for strings, whose output can run to megabytes."""
+
+    name = "strings"
+    register = False
+
+    def get_results(self, password: str | None = None) -> dict[str, object]:
+        """Return nothing; the tests write results directly."""
+        _ = password
+        return {}
+
+
+@pytest.fixture
+def output_dir(app: Flask, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Create a submission with small inline and preview limits."""
+    monkeypatch.setattr(app_module, "RESULT_FOLDER", tmp_path)
+    monkeypatch.setattr(base_analyzer, "OUTPUT_INLINE_BYTES", 1000)
+    monkeypatch.setattr(base_analyzer, "OUTPUT_PREVIEW_LINES", 10)
+    output_dir = tmp_path / IMG_HASH / SUB_HASH
+    output_dir.mkdir(parents=True)
+    with app.app_context():
+        db.session.add(Image(hash=IMG_HASH, file=str(tmp_path / "x.png"), size=1, upload_count=1))
+        db.session.add(
+            Submission(hash=SUB_HASH, filename="x.png", date=time.time(), image_hash=IMG_HASH),
+        )
+        db.session.commit()
+    return output_dir
+
+
+def _results(output_dir: Path) -> dict[str, dict[str, object]]:
+    return json.loads((output_dir / "results.json").read_text())
+
+
+def test_large_outputs_keep_a_preview_and_a_url(output_dir: Path) -> None:
+    """results.json holds the first lines; the whole output is gzipped beside it."""
+    lines = [f"line {index}" for index in range(500)]
+    _VerboseAnalyzer(output_dir / "x.png", output_dir).update_result(
+        {"status": "ok", "output": lines},
+    )
+    result = _results(output_dir)["strings"]
+    assert result["output"] == lines[:10]
+    assert result["full_output"] == {
+        "url": f"/output/{SUB_HASH}/strings",
+        "lines": 500,
+        "bytes": len(json.dumps(lines)),
+    }
+    stored = output_dir / f"strings{FULL_OUTPUT_SUFFIX}"
+    assert json.loads(gzip.decompress(stored.read_bytes())) == lines
+
+
+@pytest.mark.parametrize(
+    ("output", "preview"),
+    [
+        ("small", "small"),
+        ("\n".join("x" * 50 for _ in range(100)), "\n".join("x" * 50 for _ in range(10))),
+        (
+            {f"key {index}": "value" for index in range(100)},
+            {f"key {index}": "value" for index in range(10)},
+        ),
+    ],
+)
+def test_previews_follow_the_output_type(
+    output_dir: Path,
+    output: object,
+    preview: object,
+) -> None:
+    """Strings keep their first lines, tables their first rows; small outputs stay whole."""
+    _VerboseAnalyzer(output_dir / "x.png", output_dir).update_result(
+        {"status": "ok", "output": output},
+    )
+    result = _results(output_dir)["strings"]
+    assert result["output"] == preview
+    assert ("full_output" in result) == (output != preview)
+
+
+def test_output_route_serves_gzip_or_plain_json(client: FlaskClient, output_dir: Path) -> None:
+    """Gzip-capable clients get the stored file; others get it decompressed."""
+    lines = ["CTF{hidden}"] * 300
+    _VerboseAnalyzer(output_dir / "x.png", output_dir).update_result(
+        {"status": "ok", "output": lines},
+    )
+    zipped = client.get(f"/output/{SUB_HASH}/strings", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(zipped.data)) == lines
+
+    plain = client.get(f"/output/{SUB_HASH}/strings")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_json() == lines
+
+    assert client.get(f"/output/{SUB_HASH}/binwalk").status_code == 404
+    assert client.get(f"/output/{SUB_HASH}/unknown").status_code == 404
@@ -1,12 +1,17 @@
 """Tests for the July 2026 hardening: env parsing and decompression bombs."""
 
+import json
 import struct
+import sys
 import zlib
 from pathlib import Path
 
 import pytest
 
+from aperisolve.analyzers import base_analyzer
+from aperisolve.analyzers.decomposer import DecomposerAnalyzer
 from aperisolve.analyzers.pil_utils import load_image_array
+from aperisolve.analyzers.spectrogram import SpectrogramAnalyzer
 from aperisolve.config import _int_env
 from aperisolve.filetype import _mime_from_pillow
 from aperisolve.utils.sentry import _float_env
@@ -70,6 +75,15 @@ def test_oversized_image_rejected_before_decode(tmp_path: Path) -> None:
     assert "megapixel" in loaded.error["error"]
 
 
+def test_decomposer_pixel_cap(tmp_path: Path) -> None:
+    """The strip-wise decomposer shares the megapixel cap, checked pre-decode."""
+    png = _png_with_declared_size(tmp_path / "huge.png", 12_000, 12_000)
+    DecomposerAnalyzer.execute(png, tmp_path)
+    result = json.loads((tmp_path / "results.json").read_text(encoding="utf-8"))
+    assert result["decomposer"]["status"] == "error"
+    assert "64 megapixel" in result["decomposer"]["error"]
+
+
 def test_decompression_bomb_rejected(tmp_path: Path) -> None:
     """Sizes past Pillow's own bomb threshold error cleanly instead of raising."""
     png = _png_with_declared_size(tmp_path / "bomb.png", 25_000, 25_000)
@@ -82,3 +96,31 @@ def test_filetype_probe_survives_decompression_bomb(tmp_path: Path) -> None:
     """detect_file_type's Pillow probe must not blow up the RQ job on a bomb."""
     png = _png_with_declared_size(tmp_path / "bomb.png", 25_000, 25_000)
     assert _mime_from_pillow(png) == ""
+
+
+def _python(code: str) -> list[str]:
+    return [sys.executable, "-c", code]
+
+
+def test_stream_command_yields_fixed_chunks(tmp_path: Path) -> None:
+    """Stdout arrives in chunk_size pieces, with a short tail."""
+    analyzer = SpectrogramAnalyzer(tmp_path / "in.wav", tmp_path)
+    code = "import sys; sys.stdout.buffer.write(bytes(2500))"
+    chunks = list(analyzer.stream_command(_python(code), chunk_size=1000))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+
+
+def test_stream_command_raises_on_failure(tmp_path: Path) -> None:
+    """A non-zero exit surfaces as RuntimeError carrying the captured stderr."""
+    analyzer = SpectrogramAnalyzer(tmp_path / "in.wav", tmp_path)
+    code = "import sys; sys.stderr.write('boom'); sys.exit(3)"
+    with pytest.raises(RuntimeError, match="status 3: boom"):
+        list(analyzer.stream_command(_python(code)))
+
+
+def test_stream_command_times_out(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A stalled producer is killed once SUBPROCESS_TIMEOUT elapses."""
+    monkeypatch.setattr(base_analyzer, "SUBPROCESS_TIMEOUT", 0.2)
+    analyzer = SpectrogramAnalyzer(tmp_path / "in.wav", tmp_path)
+    with pytest.raises(TimeoutError):
+        list(analyzer.stream_command(_python("import time; time.sleep(30)")))
@@ -0,0 +1,67 @@
+"""Tests for the sorted, memory-mapped IHDR CRC index."""
+
+import struct
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from aperisolve.utils import ihdr_index
+from aperisolve.utils.ihdr_index import (
+    CRC_ROW,
+    build_index,
+    ihdr_bytes,
+    load_index,
+    lookup,
+    write_index,
+)
+
+
+@pytest.fixture
+def shipped_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """Compile the index to a temporary file and load it from there."""
+    path = tmp_path / "ihdr_index.npy"
+    monkeypatch.setattr(ihdr_index, "IHDR_INDEX_FILE", path)
+    load_index.cache_clear()
+    write_index(path)
+    yield path
+    load_index.cache_clear()
+
+
+def test_index_is_sorted_by_crc() -> None:
+    """Row 0 holds every CRC in ascending order, as searchsorted requires."""
+    index = build_index()
+    assert index.dtype == np.uint32
+    assert index.shape[0] == 4
+    assert np.all(np.diff(index[CRC_ROW].astype(np.int64)) >= 0)
+
+
+def test_bulk_crcs_match_zlib() -> None:
+    """Every sampled entry carries the CRC zlib computes for its IHDR bytes."""
+    index = build_index()
+    rng = np.random.default_rng(0)
+    for crc, width, height, params in index[:, rng.integers(0, index.shape[1], 500)].T:
+        assert zlib.crc32(b"IHDR" + ihdr_bytes(int(width), int(height), int(params))) == crc
+
+
+def test_dense_grid_covers_small_sizes() -> None:
+    """Every size up to DENSE_GRID_MAX on both sides is indexed."""
+    data = struct.pack(">IIBBBBB", 37, 101, 1, 0, 0, 0, 1)
+    assert data in lookup(zlib.crc32(b"IHDR" + data))
+
+
+@pytest.mark.usefixtures("shipped_index")
+def test_lookup_reads_the_memory_mapped_file() -> None:
+    """A compiled index is mapped, not loaded, and finds common configurations."""
+    assert isinstance(load_index(), np.memmap)
+    data = struct.pack(">IIBBBBB", 1920, 1080, 8, 6, 0, 0, 0)
+    assert data in lookup(zlib.crc32(b"IHDR" + data))
+
+
+@pytest.mark.usefixtures("shipped_index")
+def test_lookup_misses_unknown_crcs() -> None:
+    """A CRC outside the corpus (here, of a 12345x7 image) has no match."""
+    data = struct.pack(">IIBBBBB", 12345, 7, 8, 6, 0, 0, 0)
+    assert lookup(zlib.crc32(b"IHDR" + data)) == []
@@ -0,0 +1,31 @@
+"""Tests for the deploy-time database initialization."""
+
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from sqlalchemy import inspect, text
+
+from aperisolve.models import db
+from aperisolve.utils import init_db
+
+
+def test_init_db_drops_the_legacy_ihdr_table(
+    app: Flask,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """The IHDR lookup table of earlier releases is dropped; model tables stay."""
+    monkeypatch.setattr(init_db, "create_app", lambda: app)
+    monkeypatch.setattr(init_db, "RESULT_FOLDER", tmp_path / "results")
+    with app.app_context():
+        db.session.execute(text("CREATE TABLE ihdr (iid INTEGER PRIMARY KEY, crc BIGINT)"))
+        db.session.commit()
+
+    init_db.main()
+
+    with app.app_context():
+        tables = set(inspect(db.engine).get_table_names())
+        assert "ihdr" not in tables
+        assert {"image", "submission"} <= tables
+        assert init_db.drop_legacy_tables() == []
@@ -0,0 +1,197 @@
+"""Tests for the nested analysis of extracted images and audio files."""
+
+import hashlib
+import io
+import json
+import time
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from PIL import Image as PILImage
+
+from aperisolve import blobstore, nested, workers
+from aperisolve.analyzers.base_analyzer import SubprocessAnalyzer
+from aperisolve.blobstore import MANIFEST_SUFFIX, store_tree, write_manifest
+from aperisolve.filetype import FileType
+from aperisolve.models import Image, Submission, db
+from aperisolve.nested import Artifact, find_artifacts
+
+IMG_HASH = "a" * 32
+SUB_HASH = "b" * 32
+
+EnqueueCall = tuple[tuple[object, ...], dict[str, object]]
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (4, 4), (0, 90, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class _ExtractingAnalyzer(SubprocessAnalyzer):
+    """Analyzer stand-in extracting a PNG and a text file, like binwalk would."""
+
+    name = "extractor"
+    register = False
+
+    def get_results(self, password: str | None = None) -> dict[str, object]:
+        """Extract the files and list them in a manifest."""
+        _ = password
+        extracted = self.get_extracted_dir()
+        extracted.mkdir(parents=True)
+        (extracted / "1F").write_bytes(_png())
+        (extracted / "notes.txt").write_text("nothing nested here", encoding="utf-8")
+        write_manifest(self.output_dir / f"{self.name}{MANIFEST_SUFFIX}", store_tree(extracted))
+        return {"status": "ok", "output": "extracted 2 files"}
+
+
+def _extracting_analyzers(**_kwargs: object) -> list[type]:
+    """Return the extracting stand-in only."""
+    return [_ExtractingAnalyzer]
+
+
+@pytest.fixture
+def enqueue_calls(
+    app: Flask,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> list[EnqueueCall]:
+    """Wire the worker to the test app and isolated folders; capture enqueues."""
+    monkeypatch.setattr(workers, "create_app", lambda: app)
+    monkeypatch.setattr(workers, "RESULT_FOLDER", tmp_path)
+    monkeypatch.setattr(nested, "RESULT_FOLDER", tmp_path)
+    monkeypatch.setattr(blobstore, "BLOB_FOLDER", tmp_path / "blobs")
+    monkeypatch.setattr(workers, "get_analyzers", _extracting_analyzers)
+    calls: list[EnqueueCall] = []
+
+    def _record(*args: object, **kwargs: object) -> None:
+        calls.append((args, kwargs))
+
+    monkeypatch.setattr(app.config["REDIS_QUEUE"], "enqueue", _record)
+    return calls
+
+
+def _seed(app: Flask, tmp_path: Path) -> None:
+    """Insert an upload and its pending submission."""
+    img_file = tmp_path / f"{IMG_HASH}.bin"
+    img_file.write_bytes(b"firmware blob")
+    with app.app_context():
+        db.session.add(Image(hash=IMG_HASH, file=str(img_file), size=13, upload_count=1))
+        db.session.add(
+            Submission(
+                hash=SUB_HASH,
+                filename="firmware.bin",
+                status="pending",
+                date=time.time(),
+                image_hash=IMG_HASH,
+            ),
+        )
+        db.session.commit()
+
+
+def _nested_entries(tmp_path: Path) -> object:
+    results = json.loads((tmp_path / IMG_HASH / SUB_HASH / "results.json").read_text())
+    return results["extractor"].get("nested")
+
+
+def test_extracted_png_becomes_a_linked_submission(
+    app: Flask,
+    enqueue_calls: list[EnqueueCall],
+    tmp_path: Path,
+) -> None:
+    """The PNG is submitted and queued one level down; the text file is not."""
+    _seed(app, tmp_path)
+    workers.analyze_image(SUB_HASH, 1, 60.0)
+
+    data = _png()
+    child_hash = hashlib.md5(data + b"1F.png", usedforsecurity=False).hexdigest()
+    assert _nested_entries(tmp_path) == [
+        {"file": "1F", "kind": "image", "submission": child_hash},
+    ]
+    [(args, kwargs)] = enqueue_calls
+    assert args[:3] == ("aperisolve.workers.analyze_image", child_hash, 0)
+    assert 0 < float(str(args[3])) <= 60.0
+    assert "job_timeout" in kwargs
+    with app.app_context():
+        child = db.session.get(Submission, child_hash)
+        assert child is not None
+        assert (child.filename, child.status, child.deep_analysis) == ("1F.png", "pending", False)
+        image = db.session.get(Image, child.image_hash)
+        assert image is not None
+        assert Path(str(image.file)).read_bytes() == data
+
+
+def test_known_files_are_linked_without_a_new_job(
+    app: Flask,
+    enqueue_calls: list[EnqueueCall],
+    tmp_path: Path,
+) -> None:
+    """Re-analyzing the upload links the existing nested submission."""
+    _seed(app, tmp_path)
+    workers.analyze_image(SUB_HASH, 1, 60.0)
+    workers.analyze_image(SUB_HASH, 1, 60.0)
+    assert len(enqueue_calls) == 1
+    assert _nested_entries(tmp_path) is not None
+
+
+@pytest.mark.parametrize(("depth", "cpu_budget"), [(0, 60.0), (1, 0.0)])
+def test_spent_budgets_submit_nothing(
+    app: Flask,
+    enqueue_calls: list[EnqueueCall],
+    tmp_path: Path,
+    depth: int,
+    cpu_budget: float,
+) -> None:
+    """No nested submission once the depth or the CPU budget is used up."""
+    _seed(app, tmp_path)
+    workers.analyze_image(SUB_HASH, depth, cpu_budget)
+    assert enqueue_calls == []
+    assert _nested_entries(tmp_path) is None
+
+
+def test_find_artifacts_lists_each_content_once(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A PNG two tools extracted is listed once, under the first tool."""
+    monkeypatch.setattr(blobstore, "BLOB_FOLDER", tmp_path / "blobs")
+    for tool, name in (("binwalk", "0.png"), ("foremost", "png/00000000.png")):
+        extracted = tmp_path / tool
+        (extracted / name).parent.mkdir(parents=True, exist_ok=True)
+        (extracted / name).write_bytes(_png())
+        write_manifest(tmp_path / f"{tool}{MANIFEST_SUFFIX}", store_tree(extracted))
+    assert [(a.tool, a.name, a.file_type.kind) for a in find_artifacts(tmp_path)] == [
+        ("binwalk", "0.png", "image"),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("name", "mime", "expected"),
+    [
+        ("00000123", "image/png", "00000123.png"),
+        ("out/steghide.out", "audio/x-wav", "steghide.out.wav"),
+        ("photo.jpeg", "image/jpeg", "photo.jpeg"),
+    ],
+)
+def test_nested_filenames_carry_an_extension(name: str, mime: str, expected: str) -> None:
+    """Extracted names without a matching extension get one from the detected type."""
+    artifact = Artifact("tool", name, Path(name), FileType(mime, "image", frozenset()))
+    assert nested._filename(artifact) == expected  # noqa: SLF001
+
+
+def test_files_over_the_upload_cap_are_not_submitted(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """An extracted image larger than MAX_CONTENT_LENGTH is skipped."""
+    monkeypatch.setattr(blobstore, "BLOB_FOLDER", tmp_path / "blobs")
+    data = _png()
+    monkeypatch.setattr(nested, "MAX_CONTENT_LENGTH", len(data) - 1)
+    extracted = tmp_path / "binwalk"
+    extracted.mkdir()
+    (extracted / "0.png").write_bytes(data)
+    write_manifest(tmp_path / f"binwalk{MANIFEST_SUFFIX}", store_tree(extracted))
+    assert find_artifacts(tmp_path) == []
+    monkeypatch.setattr(nested, "MAX_CONTENT_LENGTH", len(data))
+    assert [artifact.name for artifact in find_artifacts(tmp_path)] == ["0.png"]
@@ -1,14 +1,30 @@
-"""Tests for PNG repair, covering the bounded DOS->Unix search (GHSA fix).
+"""Tests for PNG repair: IHDR recovery and the bounded DOS->Unix search.
 
 A malformed IDAT chunk must not be able to force a combinatorial CRC search
-(C(len(pos_list), count)) whose size is taken straight from the uploaded file.
+(C(len(pos_list), count)) whose size is taken straight from the uploaded file
+(GHSA fix), and damaged IHDR fields are solved from the CRC, not searched.
 """
 
+import io
 import struct
 import time
 import zlib
+from collections.abc import Iterator
 
-from aperisolve.utils.png import MAX_DOS2UNIX_COMBINATIONS, PNG
+import numpy as np
+import pytest
+from PIL import Image
+
+from aperisolve.utils import png
+from aperisolve.utils.png import (
+    MAX_DOS2UNIX_COMBINATIONS,
+    PNG,
+    check_scanlines,
+    inflated_size,
+    raw_image_size,
+    scan_chunks,
+    scanline_layout,
+)
 
 
 def _crc(chunk_type: bytes, data: bytes) -> bytes:
@@ -31,8 +47,26 @@ def test_dos2unix_recovers_genuine_mangling() -> None:
     assert recovered == original
 
 
+def test_dos2unix_recovers_dozens_of_lost_carriage_returns() -> None:
+    """30 of 36 newlines lost their CR: C(36, 30) ~ 1.9M subsets, met in the middle."""
+    rng = np.random.default_rng(7)
+    body = bytearray(rng.integers(0x20, 0x7F, size=4000, dtype=np.uint8).tobytes())
+    newlines = rng.choice(len(body), size=36, replace=False).tolist()
+    for pos in newlines:
+        body[pos] = 0x0A
+    lost = sorted(rng.choice(newlines, size=30, replace=False).tolist())
+    original = bytearray(body)
+    for shift, pos in enumerate(lost):
+        original[pos + shift : pos + shift] = b"\x0d"
+
+    start = time.monotonic()
+    recovered = PNG(b"")._fix_dos2unix(b"IDAT", bytes(body), _crc(b"IDAT", original), 30)  # noqa: SLF001
+    assert time.monotonic() - start < 1.0
+    assert recovered == original
+
+
 def test_dos2unix_rejects_oversized_search_fast() -> None:
-    """The PoC-shaped chunk (C(28, 11) ~ 21M) is skipped without running it."""
+    """The PoC-shaped chunk (C(28, 11) ~ 21M) ends fast without a false match."""
     chunk_data = b"\x0a" * 28 + b"AB"
     bad_crc = struct.pack("!I", 0xDEADBEEF)
 
@@ -44,6 +78,33 @@ def test_dos2unix_rejects_oversized_search_fast() -> None:
     assert elapsed < 1.0  # would be tens of seconds without the cap
 
 
+def test_dos2unix_refuses_searches_where_the_crc_cannot_decide() -> None:
+    """C(36, 18) ~ 9e9 subsets: small half tables, but CRC coincidences are likely."""
+    start = time.monotonic()
+    result = PNG(b"")._fix_dos2unix(b"IDAT", b"\x0a" * 36, b"\x00\x00\x00\x00", 18)  # noqa: SLF001
+    assert result is None
+    assert time.monotonic() - start < 0.1
+
+
+def test_dos2unix_refuses_ambiguous_matches(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Two subsets matching the CRC leave the chunk unrepaired."""
+
+    def _two_matches(*_args: object) -> Iterator[tuple[int, ...]]:
+        yield (4,)
+        yield (6,)
+
+    monkeypatch.setattr(png, "solve_insertions", _two_matches)
+    assert PNG(b"")._fix_dos2unix(b"IDAT", b"AB\x0aCD\x0a", b"\x00" * 4, 1) is None  # noqa: SLF001
+
+
+def test_dos2unix_skips_tables_past_the_cap() -> None:
+    """Hundreds of newlines around a mid-sized count are refused up front."""
+    start = time.monotonic()
+    result = PNG(b"")._fix_dos2unix(b"IDAT", b"\x0a" * 300, b"\x00\x00\x00\x00", 40)  # noqa: SLF001
+    assert result is None
+    assert time.monotonic() - start < 0.1
+
+
 def test_dos2unix_rejects_excessive_insertion_count() -> None:
     """A count larger than the allowed insertions is refused up front."""
     chunk_data = b"\x0a" * 200
@@ -76,3 +137,202 @@ def test_repair_on_malicious_idat_returns_quickly() -> None:
 def test_combination_cap_is_small() -> None:
     """Guard against a future edit quietly raising the cap to an unsafe value."""
     assert MAX_DOS2UNIX_COMBINATIONS <= 1_000_000
+
+
+def _png_with_ihdr(stored: bytes, crc_of: bytes, raw_size: int = 16) -> bytes:
+    """Build a PNG whose IHDR holds ``stored`` but the CRC of ``crc_of``.
+
+    The IDAT stream inflates to ``raw_size`` zero bytes.
+    """
+    sig = b"\x89PNG\r\n\x1a\x0a"
+    ihdr = struct.pack(">I", 13) + b"IHDR" + stored + _crc(b"IHDR", crc_of)
+    payload = zlib.compress(bytes(raw_size))
+    idat = struct.pack(">I", len(payload)) + b"IDAT" + payload + _crc(b"IDAT", payload)
+    iend = struct.pack(">I", 0) + b"IEND" + _crc(b"IEND", b"")
+    return sig + ihdr + idat + iend
+
+
+@pytest.mark.parametrize(
+    "damaged",
+    [
+        struct.pack(">IIBBBBB", 1920, 1, 8, 6, 0, 0, 0),  # height zeroed (classic CTF)
+        struct.pack(">IIBBBBB", 0xFFFF_FFFF, 1080, 8, 6, 0, 0, 0),  # width out of range
+        struct.pack(">IIBBBBB", 1920, 1080, 8, 2, 0, 0, 0),  # colour type flipped
+        struct.pack(">IIBBBBB", 100, 100, 8, 6, 0, 0, 0),  # both dimensions wrong
+    ],
+    ids=["height", "width", "color-type", "both"],
+)
+def test_ihdr_recovered_from_crc(damaged: bytes) -> None:
+    """Damaged IHDR fields are solved from the stored CRC in milliseconds."""
+    original = struct.pack(">IIBBBBB", 1920, 1080, 8, 6, 0, 0, 0)
+    png = PNG(_png_with_ihdr(damaged, original))
+
+    start = time.monotonic()
+    assert png.check_ihdr()
+    assert time.monotonic() - start < 1.0
+    assert png.repaired_data[8:21] == original
+    assert (png.width, png.height) == (1920, 1080)
+
+
+@pytest.mark.parametrize(
+    ("dims", "bit_depth", "color_type", "interlace", "expected"),
+    [
+        ((3, 2), 8, 2, 0, 2 * (1 + 9)),
+        ((5, 1), 1, 0, 0, 1 + 1),
+        ((9, 1), 1, 0, 0, 1 + 2),
+        ((8, 8), 8, 0, 1, 2 + 2 + 3 + 2 * 3 + 2 * 5 + 4 * 5 + 4 * 9),
+    ],
+)
+def test_raw_image_size(
+    dims: tuple[int, int],
+    bit_depth: int,
+    color_type: int,
+    interlace: int,
+    expected: int,
+) -> None:
+    """Scanline sizes count a filter byte per row and every Adam7 pass."""
+    assert raw_image_size(*dims, bit_depth, color_type, interlace) == expected
+
+
+def test_inflated_size_stops_on_broken_streams() -> None:
+    """Complete streams are measured; truncated or corrupt ones are not."""
+    payload = zlib.compress(bytes(3 << 20))
+    assert inflated_size([payload]) == 3 << 20
+    assert inflated_size([payload[:5], memoryview(payload)[5:]]) == 3 << 20
+    assert inflated_size([payload[:-8]]) is None
+    assert inflated_size([b"not zlib"]) is None
+
+
+def test_ihdr_recovered_beyond_sweep_from_idat_size() -> None:
+    """Both dimensions damaged, height out of the sweep: the IDAT size pins it down."""
+    original = struct.pack(">IIBBBBB", 2, 20000, 8, 0, 0, 0, 0)
+    damaged = struct.pack(">IIBBBBB", 0, 0, 8, 0, 0, 0, 0)
+    png = PNG(_png_with_ihdr(damaged, original, raw_image_size(2, 20000, 8, 0, 0)))
+
+    assert png.check_ihdr()
+    assert png.repaired_data[8:21] == original
+    assert any("CRC and the IDAT size" in line for line in png.logs)
+
+
+def test_ihdr_recovered_from_idat_size_when_crc_tampered() -> None:
+    """A zeroed height is refitted to the IDAT stream and the CRC recomputed."""
+    original = struct.pack(">IIBBBBB", 640, 480, 8, 6, 0, 0, 0)
+    damaged = struct.pack(">IIBBBBB", 640, 0, 8, 6, 0, 0, 0)
+    png = PNG(_png_with_ihdr(damaged, b"tampered", raw_image_size(640, 480, 8, 6, 0)))
+
+    assert png.check_ihdr()
+    assert png.repaired_data[8:21] == original
+    assert png.repaired_data[21:25] == _crc(b"IHDR", original)
+
+
+def _chunk(chunk_type: bytes, data: bytes, length: int | None = None) -> bytes:
+    declared = len(data) if length is None else length
+    return struct.pack(">I", declared) + chunk_type + data + _crc(chunk_type, data)
+
+
+def test_chunk_table_resynchronises_after_damage() -> None:
+    """Junk between chunks is skipped and a wrong length ends at the next chunk."""
+    ihdr = _chunk(b"IHDR", struct.pack(">IIBBBBB", 2, 2, 8, 2, 0, 0, 0))
+    mangled = _chunk(b"IDAT", b"A\nB\nC", length=9)
+    data = (
+        b"\x89PNG\r\n\x1a\n"
+        + ihdr
+        + b"junk!"
+        + mangled
+        + _chunk(b"IDAT", b"xyz")
+        + _chunk(b"IEND", b"")
+        + b"trailer"
+    )
+
+    chunks = scan_chunks(data)
+
+    assert [c.type for c in chunks] == [b"IHDR", b"IDAT", b"IDAT", b"IEND"]
+    assert (chunks[1].length, bytes(chunks[1].data), chunks[1].crc_ok) == (9, b"A\nB\nC", True)
+    assert bytes(chunks[2].data) == b"xyz"
+    assert data[chunks[3].end :] == b"trailer"
+
+
+def test_repair_fixes_one_mangled_idat_among_many() -> None:
+    """Only the chunk whose length disagrees goes through the DOS->Unix search."""
+    original = b"row\r\nrow\r\nrow"
+    ihdr = _chunk(b"IHDR", struct.pack(">IIBBBBB", 2, 2, 8, 2, 0, 0, 0))
+    idats = [_chunk(b"IDAT", bytes([i]) * 100) for i in range(3)]
+    mangled = struct.pack(">I", len(original)) + b"IDAT"
+    mangled += original.replace(b"\r\n", b"\n") + _crc(b"IDAT", original)
+    sig = b"\x89PNG\r\n\x1a\n"
+    iend = _chunk(b"IEND", b"")
+    png = PNG(sig + ihdr + idats[0] + mangled + idats[1] + idats[2] + iend)
+
+    fixed, extra = png.repair()
+
+    assert fixed
+    assert not extra
+    expected = idats[0] + _chunk(b"IDAT", original) + idats[1] + idats[2]
+    assert bytes(png.repaired_data) == sig + ihdr + expected + iend
+
+
+def _gradient_png(width: int, height: int) -> tuple[np.ndarray, bytes]:
+    pixels = (np.arange(width * height * 3) % 251).astype(np.uint8).reshape(height, width, 3)
+    out = io.BytesIO()
+    Image.fromarray(pixels, "RGB").save(out, "PNG")
+    return pixels, out.getvalue()
+
+
+def test_truncated_idat_yields_partial_image() -> None:
+    """A stream cut mid-image gives a PNG of exactly the rows that decode."""
+    pixels, data = _gradient_png(40, 30)
+    idat = next(c for c in scan_chunks(data) if c.type == b"IDAT")
+    cut = bytes(idat.data[: len(idat.data) // 2])
+    sig_ihdr = data[: idat.offset]
+    png = PNG(sig_ihdr + _chunk(b"IDAT", cut) + _chunk(b"IEND", b""))
+
+    png.repair()
+
+    assert png.partial_data is not None
+    assert any("IDAT stream damaged" in line for line in png.logs)
+    with Image.open(io.BytesIO(png.partial_data)) as partial:
+        rows = partial.height
+        assert 0 < rows < 30
+        assert np.array_equal(np.asarray(partial.convert("RGB")), pixels[:rows])
+
+
+def test_healthy_idat_is_checked_without_re_encoding(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A stream that decodes is inflated once, with no sink re-encoding its rows."""
+    _, data = _gradient_png(40, 30)
+    sinks: list[object] = []
+
+    def _check(*args: object, **kwargs: object) -> object:
+        sinks.append(args[2] if len(args) > 2 else kwargs.get("sink"))
+        return check_scanlines(*args, **kwargs)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(png, "check_scanlines", _check)
+    repaired = PNG(data)
+    repaired.repair()
+    assert sinks == [None]
+    assert repaired.partial_data is None
+
+
+def test_scanline_check_stops_at_a_bad_filter_byte() -> None:
+    """Rows before an unknown filter type are kept; the diagnostic names the row."""
+    stride = 1 + 4
+    rows = [bytes([1]) + bytes(4)] * 5 + [bytes([9]) + bytes(4)] + [bytes(stride)] * 4
+    kept: list[bytes] = []
+    result = check_scanlines(
+        [zlib.compress(b"".join(rows))],
+        scanline_layout(4, 10, 8, 0, 0),
+        kept.append,
+    )
+
+    assert (result.good_rows, result.total_rows) == (5, 10)
+    assert result.problem == "unknown filter type 9 on scanline 6"
+    assert b"".join(kept) == b"".join(rows[:5])
+
+
+def test_scanline_check_bounds_a_decompression_bomb() -> None:
+    """A stream far larger than its IHDR is not inflated past one extra slice."""
+    bomb = zlib.compress(bytes(64 << 20), 9)
+    start = time.monotonic()
+    result = check_scanlines([bomb], scanline_layout(16, 16, 8, 0, 0))
+    assert result.problem is None
+    assert result.trailing <= 2 << 20
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,53 @@
+"""Tests for the incremental PNG encoder."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from aperisolve.utils.png_writer import StreamingPNGWriter, row_bytes
+
+
+def test_streaming_writer_round_trips_strips(tmp_path: Path) -> None:
+    """Rows written in uneven strips decode to the original 8-bit image."""
+    pixels = np.random.default_rng(2).integers(0, 256, size=(50, 31), dtype=np.uint8)
+    out = tmp_path / "gray.png"
+    with StreamingPNGWriter(out, 31, 50) as writer:
+        for top in range(0, 50, 7):
+            writer.write_rows(pixels[top : top + 7])
+    with Image.open(out) as img:
+        assert img.mode == "L"
+        assert np.array_equal(np.asarray(img), pixels)
+
+
+def test_streaming_writer_packs_palette_and_bit_depth(tmp_path: Path) -> None:
+    """1-bit palette rows use the packed stride and the given palette."""
+    bits = np.array([[1, 0, 1], [0, 1, 0]], dtype=np.uint8)
+    assert row_bytes(3, 1) == 1
+    out = tmp_path / "pal.png"
+    with StreamingPNGWriter(out, 3, 2, bit_depth=1, palette=b"\x00\x00\x00\xff\x00\x00") as writer:
+        writer.write_rows(np.packbits(bits, axis=1))
+    with Image.open(out) as img:
+        rgb = np.asarray(img.convert("RGB"))
+    assert np.array_equal(rgb[..., 0], bits * 255)
+    assert not rgb[..., 1:].any()
+
+
+def test_streaming_writer_rejects_short_images(tmp_path: Path) -> None:
+    """Closing before every declared row is written is an error."""
+    writer = StreamingPNGWriter(tmp_path / "short.png", 4, 4)
+    writer.write_rows(np.zeros((2, 4), dtype=np.uint8))
+    with pytest.raises(ValueError, match="2 of 4 rows"):
+        writer.close()
+    assert not (tmp_path / "short.png").exists()
+
+
+def test_streaming_writer_deletes_files_on_error(tmp_path: Path) -> None:
+    """A block that raises leaves no half-written PNG behind."""
+    out = tmp_path / "partial.png"
+    writer = StreamingPNGWriter(out, 4, 4)
+    writer.write_rows(np.zeros((2, 4), dtype=np.uint8))
+    error = OSError("image file is truncated")
+    writer.__exit__(OSError, error, None)
+    assert not out.exists()
@@ -6,16 +6,20 @@ from aperisolve.analyzers.registry import (
     get_analyzers,
     tool_order,
 )
+from aperisolve.utils.carving import EMBEDDED_TAG
 
 # The historical frontend rendering order; new analyzers must be added here.
 EXPECTED_TOOL_ORDER = [
     "decomposer",
     "spectrogram",
+    "audio_lsb",
+    "video",
     "color_remapping",
     "file",
     "pdfinfo",
     "pdfid",
     "exiftool",
+    "carving",
     "binwalk",
     "foremost",
     "outguess",
@@ -31,6 +35,7 @@ EXPECTED_TOOL_ORDER = [
 ]
 
 EXPECTED_ARCHIVE_TOOLS = {
+    "carving",
     "binwalk",
     "foremost",
     "steghide",
@@ -45,11 +50,14 @@ EXPECTED_PASSWORD_TOOLS = {"steghide", "openstego", "jpseek", "outguess"}
 EXPECTED_DEEP_ONLY_TOOLS = {"outguess"}
 
 # Analyzers grouped by their ``accepts`` gate (see aperisolve.filetype tags).
-AGNOSTIC_TOOLS = {"file", "exiftool", "binwalk", "foremost", "strings"}
+AGNOSTIC_TOOLS = {"file", "exiftool", "carving", "binwalk", "foremost", "strings"}
+EMBEDDED_ONLY_TOOLS = {"binwalk", "foremost"}
 IMAGE_ONLY_TOOLS = {"decomposer", "color_remapping", "identify", "openstego"}
 PNG_ONLY_TOOLS = {"pngcheck", "pcrt", "zsteg"}
 JPEG_ONLY_TOOLS = {"jsteg", "jpseek", "outguess"}
 AUDIO_ONLY_TOOLS = {"spectrogram"}
+WAV_ONLY_TOOLS = {"audio_lsb"}
+VIDEO_ONLY_TOOLS = {"video"}
 PDF_ONLY_TOOLS = {"pdfinfo", "pdfid"}
 
 
@@ -110,12 +118,19 @@ def test_tags_jpeg_runs_jpeg_and_steghide_no_png() -> None:
 
 
 def test_tags_wav_runs_spectrogram_and_steghide_beyond_agnostic() -> None:
-    """A WAV upload gates spectrogram (audio) + steghide (wav/au), no image tools."""
+    """A WAV upload gates spectrogram (audio) + audio LSB and steghide (wav), no image tools."""
     names = {cls.name for cls in get_analyzers(deep=True, tags=frozenset({"wav", "audio"}))}
-    assert names == AGNOSTIC_TOOLS | AUDIO_ONLY_TOOLS | {"steghide"}
+    assert names == AGNOSTIC_TOOLS | AUDIO_ONLY_TOOLS | WAV_ONLY_TOOLS | {"steghide"}
     assert names.isdisjoint(IMAGE_ONLY_TOOLS | PNG_ONLY_TOOLS | JPEG_ONLY_TOOLS | PDF_ONLY_TOOLS)
 
 
+def test_tags_video_runs_video_and_spectrogram_beyond_agnostic() -> None:
+    """A video upload gates the video analyzer and the spectrogram of its audio track."""
+    names = {cls.name for cls in get_analyzers(deep=True, tags=frozenset({"mp4", "video"}))}
+    assert names == AGNOSTIC_TOOLS | VIDEO_ONLY_TOOLS | {"spectrogram"}
+    assert names.isdisjoint(IMAGE_ONLY_TOOLS | WAV_ONLY_TOOLS | {"steghide"})
+
+
 def test_tags_pdf_runs_pdf_tools_only_beyond_agnostic() -> None:
     """A PDF upload gates the pdf tools in, but no image/audio/png/jpeg tools."""
     names = {cls.name for cls in get_analyzers(deep=True, tags=frozenset({"pdf"}))}
@@ -131,6 +146,18 @@ def test_tags_empty_runs_only_agnostic() -> None:
     assert names == AGNOSTIC_TOOLS
 
 
+def test_carvers_wait_for_embedded_files() -> None:
+    """Outside deep analyses, binwalk and foremost only run when the scan found something."""
+    plain = {cls.name for cls in get_analyzers(deep=False, tags=frozenset({"png", "image"}))}
+    assert plain.isdisjoint(EMBEDDED_ONLY_TOOLS)
+    assert "carving" in plain
+    embedded = {
+        cls.name
+        for cls in get_analyzers(deep=False, tags=frozenset({"png", "image", EMBEDDED_TAG}))
+    }
+    assert embedded - plain == EMBEDDED_ONLY_TOOLS
+
+
 def test_tags_none_matches_legacy() -> None:
     """tags=None disables the gate, preserving the pre-gate (deep-only) behavior."""
     for deep in (False, True):
@@ -0,0 +1,129 @@
+"""Tests for the deep-zoom spectrogram store and its tile route."""
+
+import io
+import json
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from PIL import Image as PILImage
+
+from aperisolve import app as app_module
+from aperisolve.analyzers import spectrogram
+from aperisolve.analyzers.spectrogram import (
+    TILE_SIZE,
+    ZOOM_META_NAME,
+    ZOOM_NAME,
+    SpectrogramAnalyzer,
+)
+from aperisolve.models import Image, Submission, db
+
+IMG_HASH = "6" * 32
+SUB_HASH = "7" * 32
+RATE = 8000
+TONE_HZ = 3000
+
+
+@pytest.fixture
+def result_dir(app: Flask, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Analyze a 2 s stereo tone (left channel only) into an isolated result folder."""
+    results = tmp_path / "results"
+    monkeypatch.setattr(app_module, "RESULT_FOLDER", results)
+    output_dir = results / IMG_HASH / SUB_HASH
+    output_dir.mkdir(parents=True)
+    upload = results / IMG_HASH / f"{IMG_HASH}.wav"
+    t = np.arange(2 * RATE) / RATE
+    left = np.sin(2 * np.pi * TONE_HZ * t) * 20000
+    samples = np.stack([left, np.zeros_like(left)], axis=1).astype("<i2")
+    with wave.open(str(upload), "wb") as out:
+        out.setnchannels(2)
+        out.setsampwidth(2)
+        out.setframerate(RATE)
+        out.writeframes(samples.tobytes())
+    SpectrogramAnalyzer.execute(upload, output_dir)
+
+    with app.app_context():
+        db.session.add(Image(hash=IMG_HASH, file=str(upload), size=1, upload_count=1))
+        db.session.add(
+            Submission(
+                hash=SUB_HASH,
+                filename="t.wav",
+                status="completed",
+                date=time.time(),
+                image_hash=IMG_HASH,
+            ),
+        )
+        db.session.commit()
+    return output_dir
+
+
+def test_analyzer_stores_every_column(result_dir: Path) -> None:
+    """The zoom store is a loadable (columns, channels, bins) uint8 array."""
+    entry = json.loads((result_dir / "results.json").read_text(encoding="utf-8"))["spectrogram"]
+    zoom = entry["zoom"]
+    assert zoom["tiles"] == f"/spectrogram/{SUB_HASH}"
+    assert zoom["channels"] == ["Left", "Right"]
+    levels = np.load(result_dir / ZOOM_NAME, mmap_mode="r")
+    assert levels.dtype == np.uint8
+    assert levels.shape == ((2 * RATE - 2048) // 512 + 1, 2, 1025)
+
+
+def test_tile_route_renders_and_caches(client: FlaskClient, result_dir: Path) -> None:
+    """A whole-clip tile shows the tone at its height and is cached on disk."""
+    response = client.get(f"/spectrogram/{SUB_HASH}/0/0/0/0.png")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    tile = PILImage.open(io.BytesIO(response.data))
+    assert tile.size == (TILE_SIZE, TILE_SIZE)
+    brightness = np.asarray(tile.convert("L"), dtype=np.int64).mean(axis=1)
+    expected_row = round((1 - TONE_HZ / (RATE / 2)) * TILE_SIZE)
+    assert abs(int(brightness.argmax()) - expected_row) <= 2
+    assert (result_dir / "spectrogram-tiles" / "0-0-0-0.png").exists()
+
+
+@pytest.mark.usefixtures("result_dir")
+@pytest.mark.parametrize(
+    "path",
+    ["2/0/0/0", "0/9/0/0", "0/1/2/0", "0/99999999/0/0"],
+)
+def test_tile_route_rejects_out_of_range_tiles(client: FlaskClient, path: str) -> None:
+    """Unknown channels, zoom levels beyond the data and off-grid tiles are 404."""
+    assert client.get(f"/spectrogram/{SUB_HASH}/{path}.png").status_code == 404
+
+
+def test_zoom_store_pools_columns_under_its_byte_cap(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Past the cap the store holds max-pooled columns covering the whole clip."""
+    upload = tmp_path / "tone.wav"
+    t = np.arange(3 * RATE) / RATE
+    samples = (np.sin(2 * np.pi * TONE_HZ * t * t) * 20000).astype("<i2")
+    with wave.open(str(upload), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(RATE)
+        out.writeframes(samples.tobytes())
+    full_dir = tmp_path / "full"
+    full_dir.mkdir()
+    SpectrogramAnalyzer.execute(upload, full_dir)
+    full = np.load(full_dir / ZOOM_NAME)
+
+    cap = 10 * 1025
+    monkeypatch.setattr(spectrogram, "ZOOM_MAX_BYTES", cap)
+    capped_dir = tmp_path / "capped"
+    capped_dir.mkdir()
+    SpectrogramAnalyzer.execute(upload, capped_dir)
+    capped = np.load(capped_dir / ZOOM_NAME)
+    pool = json.loads((capped_dir / ZOOM_META_NAME).read_text(encoding="utf-8"))["pool"]
+
+    assert capped.nbytes <= cap
+    assert pool > 1
+    assert len(capped) == -(-len(full) // pool)
+    padded = np.zeros((len(capped) * pool, *full.shape[1:]), dtype=np.uint8)
+    padded[: len(full)] = full
+    np.testing.assert_array_equal(capped, padded.reshape(len(capped), pool, 1, 1025).max(axis=1))
@@ -0,0 +1,156 @@
+"""Tests for derived-image thumbnails and original previews."""
+
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from PIL import Image as PILImage
+
+from aperisolve import app as app_module
+from aperisolve.models import Image, Submission, db
+from aperisolve.thumbnails import (
+    PREVIEW_MAX_SIDE,
+    THUMB_MAX_SIDE,
+    generate_preview,
+    generate_thumbnails,
+    preview_path,
+    thumb_path,
+)
+
+IMG_HASH = "6" * 32
+SUB_HASH = "7" * 32
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _noise(path: Path, width: int, height: int) -> Path:
+    pixels = np.random.default_rng(3).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    PILImage.fromarray(pixels).save(path)
+    return path
+
+
+def test_thumbnails_only_for_large_images(tmp_path: Path) -> None:
+    """Tiles already small enough are left alone; large ones are downscaled."""
+    _noise(tmp_path / "big.png", THUMB_MAX_SIDE * 2, 100)
+    _noise(tmp_path / "small.png", 64, 64)
+    (tmp_path / "notes.txt").write_text("not an image")
+
+    assert generate_thumbnails(tmp_path) == 1
+    with PILImage.open(thumb_path(tmp_path, "big.png")) as thumb:
+        assert max(thumb.size) == THUMB_MAX_SIDE
+    assert not thumb_path(tmp_path, "small.png").exists()
+    assert generate_thumbnails(tmp_path) == 0  # idempotent
+
+
+def test_preview_for_non_browser_formats(tmp_path: Path) -> None:
+    """TIFF originals get a preview; small browser formats do not."""
+    tiff = tmp_path / "scan.tiff"
+    PILImage.fromarray(np.zeros((40, 60, 3), dtype=np.uint8)).save(tiff)
+    png = _noise(tmp_path / "plain.png", 40, 40)
+
+    assert generate_preview(png, tmp_path / "png_dir") is None
+    preview = generate_preview(tiff, tmp_path)
+    assert preview == preview_path(tmp_path)
+    with PILImage.open(preview) as img:
+        assert img.size == (60, 40)
+
+
+def test_preview_downscales_large_originals(tmp_path: Path) -> None:
+    """Originals beyond the preview size are shrunk to fit it."""
+    png = _noise(tmp_path / "huge.png", PREVIEW_MAX_SIDE + 100, 10)
+    preview = generate_preview(png, tmp_path)
+    assert preview is not None
+    with PILImage.open(preview) as img:
+        assert img.width == PREVIEW_MAX_SIDE
+
+
+@pytest.fixture
+def seeded(app: Flask, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Seed a running submission with one large and one small derived image."""
+    results = tmp_path / "results"
+    monkeypatch.setattr(app_module, "RESULT_FOLDER", results)
+    original = _noise(tmp_path / f"{IMG_HASH}.png", 32, 32)
+    result_path = results / IMG_HASH / SUB_HASH
+    result_path.mkdir(parents=True)
+    _noise(result_path / "Red_bit_0.png", THUMB_MAX_SIDE * 2, 32)
+    _noise(result_path / "Red_bit_1.png", 32, 32)
+    with app.app_context():
+        db.session.add(Image(hash=IMG_HASH, file=str(original), size=1, upload_count=1))
+        db.session.add(
+            Submission(
+                hash=SUB_HASH,
+                filename="t.png",
+                status="running",
+                date=time.time(),
+                image_hash=IMG_HASH,
+            ),
+        )
+        db.session.commit()
+    return result_path
+
+
+def test_image_route_serves_thumbnails_inline(client: FlaskClient, seeded: Path) -> None:
+    """size=thumb serves the thumbnail once it exists, the full file before."""
+    url = f"/image/{SUB_HASH}/Red_bit_0.png?size=thumb"
+    before = client.get(url)
+    assert before.status_code == 200
+    assert before.headers["Cache-Control"] == "public, max-age=60"
+
+    generate_thumbnails(seeded)
+    after = client.get(url)
+    assert after.status_code == 200
+    assert "attachment" not in after.headers.get("Content-Disposition", "")
+    assert after.headers["Cache-Control"] == IMMUTABLE
+    assert after.data == thumb_path(seeded, "Red_bit_0.png").read_bytes()
+
+    full = client.get(f"/image/{SUB_HASH}/Red_bit_0.png")
+    assert "attachment" in full.headers["Content-Disposition"]
+
+
+@pytest.mark.usefixtures("seeded")
+def test_images_without_downscaled_copies_cache_forever(client: FlaskClient, app: Flask) -> None:
+    """Small tiles and originals, or finished submissions, never get a copy later."""
+    assert (
+        client.get(f"/image/{SUB_HASH}/Red_bit_1.png?size=thumb").headers["Cache-Control"]
+        == IMMUTABLE
+    )
+    assert client.get(f"/image/{IMG_HASH}.png?size=preview").headers["Cache-Control"] == IMMUTABLE
+
+    with app.app_context():
+        submission = db.session.get(Submission, SUB_HASH)
+        assert submission is not None
+        submission.status = "completed"
+        db.session.commit()
+    assert (
+        client.get(f"/image/{SUB_HASH}/Red_bit_0.png?size=thumb").headers["Cache-Control"]
+        == IMMUTABLE
+    )
+
+
+@pytest.mark.usefixtures("seeded")
+def test_image_route_rejects_unknown_sizes(client: FlaskClient) -> None:
+    """Only thumb and preview are accepted size variants."""
+    assert client.get(f"/image/{IMG_HASH}.png?size=huge").status_code == 400
+    assert client.get(f"/image/{IMG_HASH}.png?size=preview").status_code == 200
+
+
+@pytest.mark.parametrize("size", ["preview", "thumb"])
+def test_non_image_originals_are_never_served_inline(
+    app: Flask,
+    client: FlaskClient,
+    tmp_path: Path,
+    size: str,
+) -> None:
+    """An uploaded HTML file asked for as a preview is still a download."""
+    html_hash = "8" * 32
+    page = tmp_path / f"{html_hash}.html"
+    page.write_text("<script>alert(document.domain)</script>")
+    with app.app_context():
+        db.session.add(Image(hash=html_hash, file=str(page), size=1, upload_count=1))
+        db.session.commit()
+
+    response = client.get(f"/image/{html_hash}.html?size={size}")
+    assert response.status_code == 200
+    assert "attachment" in response.headers["Content-Disposition"]
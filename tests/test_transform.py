@@ -0,0 +1,139 @@
+"""Tests for the Stegsolve-style /transform endpoint."""
+
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from PIL import Image as PILImage
+
+from aperisolve import app as app_module
+from aperisolve.models import Image, Submission, db
+from aperisolve.transform import TransformError, evaluate, parse_transform
+
+IMG_HASH = "3" * 32
+SUB_HASH = "4" * 32
+
+
+@pytest.fixture
+def storage(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Isolate the result folder in a temp dir."""
+    results = tmp_path / "results"
+    monkeypatch.setattr(app_module, "RESULT_FOLDER", results)
+    return results
+
+
+def _seed(app: Flask, tmp_path: Path, pixels: np.ndarray) -> Path:
+    """Store ``pixels`` as the submission's upload; return its path."""
+    img_file = tmp_path / f"{IMG_HASH}.png"
+    PILImage.fromarray(pixels).save(img_file)
+    with app.app_context():
+        db.session.add(Image(hash=IMG_HASH, file=str(img_file), size=1, upload_count=1))
+        db.session.add(
+            Submission(
+                hash=SUB_HASH,
+                filename="t.png",
+                status="completed",
+                date=time.time(),
+                image_hash=IMG_HASH,
+            ),
+        )
+        db.session.commit()
+    return img_file
+
+
+def _rgb() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(12, 16, 3), dtype=np.uint8)
+
+
+def test_parse_transform_canonicalizes_commutative_operands() -> None:
+    """Swapped XOR operands map to the same cache key."""
+    first = parse_transform({"op": "xor", "a": "R3", "b": "g3"})
+    second = parse_transform({"op": "XOR", "a": "G3", "b": "R3"})
+    assert first == second
+    assert first.key == "xor-G3-R3"
+    assert parse_transform({"op": "planes", "mask": "01FF00"}).key == "planes-01ff00"
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        {"op": "eval"},
+        {"op": "xor", "a": "R3"},
+        {"op": "plane", "a": "R8"},
+        {"op": "plane", "a": "X1"},
+        {"op": "planes", "mask": "zz"},
+        {"op": "planes", "mask": "0102030405"},
+        {"op": "remap", "seed": "-1"},
+        {"op": "remap", "seed": "100000"},
+        {"op": "remap", "seed": "\u00b2"},
+    ],
+)
+def test_parse_transform_rejects_unknown_input(args: dict[str, str]) -> None:
+    """Anything outside the allow-list is a TransformError."""
+    with pytest.raises(TransformError):
+        parse_transform(args)
+
+
+def test_evaluate_xor_matches_numpy() -> None:
+    """XOR of two planes is computed on the right bits."""
+    pixels = _rgb()
+    out = np.asarray(evaluate(pixels, parse_transform({"op": "xor", "a": "R3", "b": "G3"})))
+    expected = (((pixels[..., 0] >> 3) ^ (pixels[..., 1] >> 3)) & 1) * 255
+    assert np.array_equal(out, expected)
+
+
+def test_evaluate_remap_is_seeded_and_keeps_alpha() -> None:
+    """A remap is reproducible per seed and never touches the alpha channel."""
+    pixels = np.dstack([_rgb(), np.full((12, 16), 7, dtype=np.uint8)])
+    op = parse_transform({"op": "remap", "seed": "3"})
+    first = np.asarray(evaluate(pixels, op))
+    assert np.array_equal(first, np.asarray(evaluate(pixels, op)))
+    assert (first[..., 3] == 7).all()
+    assert op.key == "remap-3"
+
+
+def test_evaluate_rejects_missing_channel() -> None:
+    """An alpha plane on an RGB image is reported, not silently zero."""
+    with pytest.raises(TransformError, match="not present"):
+        evaluate(_rgb(), parse_transform({"op": "plane", "a": "A0"}))
+
+
+def test_transform_route_serves_and_caches(
+    app: Flask,
+    client: FlaskClient,
+    storage: Path,
+    tmp_path: Path,
+) -> None:
+    """The route returns an inline PNG and stores it under the canonical key."""
+    pixels = _rgb()
+    _seed(app, tmp_path, pixels)
+    response = client.get(f"/transform/{SUB_HASH}?op=planes&mask=010000")
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert "immutable" in response.headers["Cache-Control"]
+    out = np.asarray(PILImage.open(io.BytesIO(response.data)))
+    assert np.array_equal(out[..., 0] != 0, (pixels[..., 0] & 1) != 0)
+    assert not out[..., 1:].any()
+
+    cache_dir = storage / IMG_HASH / "transforms"
+    assert (cache_dir / "planes-010000.png").exists()
+    assert (cache_dir / "decoded.npy").exists()
+
+
+@pytest.mark.usefixtures("storage")
+def test_transform_route_reports_bad_requests(
+    app: Flask,
+    client: FlaskClient,
+    tmp_path: Path,
+) -> None:
+    """Bad ops are 400; ops the image cannot satisfy are 422."""
+    _seed(app, tmp_path, _rgb())
+    assert client.get(f"/transform/{SUB_HASH}?op=eval").status_code == 400
+    assert client.get(f"/transform/{SUB_HASH}?op=remap&seed=%C2%B2").status_code == 400
+    assert client.get(f"/transform/{SUB_HASH}?op=plane&a=A0").status_code == 422
+    assert client.get(f"/transform/{'5' * 32}?op=plane&a=R0").status_code == 404
@@ -78,6 +78,7 @@ OPENSTEGO = Upload(FIXTURES / "openstego.png", password=STEGO_PASSWORD)
 JPSEEK = Upload(FIXTURES / "jphide.jpg", password=STEGO_PASSWORD)
 OUTGUESS = Upload(FIXTURES / "outguess.jpg", password=STEGO_PASSWORD, deep=True)
 TONE_WAV = Upload(FIXTURES / "tone.wav")
+FRAMES_AVI = Upload(FIXTURES / "frames.avi")
 SAMPLE_PDF = Upload(FIXTURES / "sample.pdf")
 
 
@@ -101,6 +102,7 @@ CASES = [
     AnalyzerCase("pngcheck", PLAIN),
     AnalyzerCase("pcrt", PLAIN),
     AnalyzerCase("zsteg", ZSTEG),
+    AnalyzerCase("carving", POLYGLOT, expect_download=True),
     AnalyzerCase("binwalk", POLYGLOT, expect_download=True),
     AnalyzerCase("foremost", POLYGLOT, expect_download=True),
     AnalyzerCase("steghide", STEGHIDE, expect_download=True),
@@ -109,6 +111,8 @@ CASES = [
     AnalyzerCase("jpseek", JPSEEK, expect_download=True),
     AnalyzerCase("outguess", OUTGUESS, expect_download=True),
     AnalyzerCase("spectrogram", TONE_WAV),
+    AnalyzerCase("audio_lsb", TONE_WAV),
+    AnalyzerCase("video", FRAMES_AVI),
     AnalyzerCase("pdfinfo", SAMPLE_PDF),
     AnalyzerCase("pdfid", SAMPLE_PDF),
 ]